@@ -18,6 +18,10 @@ from . import operators
 from . import ui
 from . import properties
 from . import node
+from . import pixel_cache
+from . import cold_storage
+from . import font_cache
+from . import anim_metadata
 
 def register():
     try:
@@ -29,12 +33,28 @@ def register():
         ui.register()
         logger.debug("Registering node")
         node.register()
+        logger.debug("Registering pixel cache")
+        pixel_cache.register()
+        logger.debug("Registering cold storage")
+        cold_storage.register()
+        logger.debug("Registering font cache")
+        font_cache.register()
+        logger.debug("Registering animated image metadata")
+        anim_metadata.register()
     except Exception as e:
         logger.error(f"Registration failed: {e}")
         raise
 
 def unregister():
     try:
+        logger.debug("Unregistering animated image metadata")
+        anim_metadata.unregister()
+        logger.debug("Unregistering font cache")
+        font_cache.unregister()
+        logger.debug("Unregistering cold storage")
+        cold_storage.unregister()
+        logger.debug("Unregistering pixel cache")
+        pixel_cache.unregister()
         logger.debug("Unregistering node")
         node.unregister()
         logger.debug("Unregistering ui")
@@ -0,0 +1,169 @@
+# anim_metadata.py
+# -*- coding: utf-8 -*-
+import bpy
+import os
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 保持するファイル情報の数
+DEFAULT_MAX_ENTRIES = 64
+# 読み込み中のファイルの完了を確認する間隔（秒）
+POLL_INTERVAL = 0.2
+
+class AnimatedInfo:
+    """アニメーション画像のフレーム数・フレームサイズ・各フレームの表示時間（ミリ秒）・ループ回数"""
+    __slots__ = ("is_animated", "frame_count", "width", "height", "durations", "loop", "format", "error")
+
+    def __init__(self, is_animated=False, frame_count=0, width=0, height=0, durations=(), loop=None, format="", error=""):
+        self.is_animated = is_animated
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.durations = durations
+        self.loop = loop
+        self.format = format
+        self.error = error
+
+    @property
+    def total_duration(self):
+        return sum(self.durations)
+
+def read_animated_info(filepath):
+    """ファイルを一度だけ先頭から読み、AnimatedInfo を返す（GIF はフレーム数を数えるために全体を走査する）"""
+    try:
+        with Image.open(filepath) as pil_img:
+            is_animated = bool(getattr(pil_img, "is_animated", False))
+            frame_count = getattr(pil_img, "n_frames", 1)
+            durations = []
+            for index in range(frame_count if is_animated else 0):
+                pil_img.seek(index)
+                durations.append(int(pil_img.info.get("duration", 0) or 0))
+            return AnimatedInfo(
+                is_animated=is_animated,
+                frame_count=frame_count,
+                width=pil_img.size[0],
+                height=pil_img.size[1],
+                durations=tuple(durations),
+                loop=pil_img.info.get("loop"),
+                format=pil_img.format or "",
+            )
+    except Exception as e:
+        return AnimatedInfo(error=str(e))
+
+def file_key(filepath):
+    """(絶対パス, サイズ, 更新時刻)。ファイルがなければ None"""
+    filepath = os.path.abspath(filepath)
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return filepath, stat.st_size, stat.st_mtime
+
+class AnimatedInfoCache:
+    """アニメーション画像の情報を (パス, サイズ, 更新時刻) ごとに保持し、パネルとインポートで共有する
+
+    パネルからは request でバックグラウンドに読み込みを依頼し、終わるまで None を返す
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # キー -> AnimatedInfo
+        self._pending = {}  # キー -> Future
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _store(self, key, info):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
+
+    def peek(self, filepath):
+        """読み込み済みの情報を返す（未読み込みなら None）"""
+        key = file_key(filepath)
+        if key is None:
+            return None
+        with self._lock:
+            return self._entries.get(key)
+
+    def request(self, filepath):
+        """読み込み済みなら情報を返し、そうでなければバックグラウンドの読み込みを始めて None を返す"""
+        key = file_key(filepath)
+        if key is None:
+            return None
+        with self._lock:
+            info = self._entries.get(key)
+            if info is not None:
+                self._entries.move_to_end(key)
+                return info
+            if key in self._pending:
+                return None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uvas-anim-info")
+            self._pending[key] = self._executor.submit(self._load, key)
+        if not bpy.app.timers.is_registered(_poll_pending):
+            bpy.app.timers.register(_poll_pending, first_interval=POLL_INTERVAL)
+        return None
+
+    def _load(self, key):
+        return self._store(key, read_animated_info(key[0]))
+
+    def get(self, filepath):
+        """情報を返す。読み込み中なら完了を待ち、未読み込みならその場で読む"""
+        key = file_key(filepath)
+        if key is None:
+            return AnimatedInfo(error=f"File not found: {filepath}")
+        with self._lock:
+            info = self._entries.get(key)
+            future = self._pending.get(key)
+        if info is not None:
+            return info
+        if future is not None:
+            return future.result()
+        return self._store(key, read_animated_info(key[0]))
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def shutdown(self):
+        executor = self._executor
+        self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.clear()
+
+anim_info_cache = AnimatedInfoCache()
+
+def _poll_pending():
+    """読み込みが終わるまで待ち、終わったら画像エディターを再描画してパネルに結果を出す"""
+    if anim_info_cache.busy:
+        return POLL_INTERVAL
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.tag_redraw()
+    return None
+
+def register():
+    pass
+
+def unregister():
+    if bpy.app.timers.is_registered(_poll_pending):
+        bpy.app.timers.unregister(_poll_pending)
+    anim_info_cache.shutdown()
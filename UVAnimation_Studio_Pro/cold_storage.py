@@ -0,0 +1,236 @@
+# cold_storage.py
+# -*- coding: utf-8 -*-
+import bpy
+import time
+import logging
+from bpy.app.handlers import persistent
+import numpy as np
+from .pixel_io import read_pixels, write_pixels, convert_pixels
+from .pixel_cache import pixel_cache, image_key
+from .core.pixel_codec import encode_pixels, decode_pixels
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 使われていない画像を調べる間隔（秒）
+SWEEP_INTERVAL = 30.0
+
+# 冷蔵の対象外とする画像名のプレフィックス
+_EXCLUDED_PREFIXES = ("UVAS_TEXT_PREVIEW_",)
+
+def resident_bytes(img):
+    """画像のピクセルバッファが Blender 上で占めるおおよそのバイト数"""
+    width, height = img.size
+    return width * height * 4 * (4 if img.is_float else 1)
+
+class _ColdEntry:
+    """冷蔵中の画像の圧縮済みピクセルと元の大きさ"""
+    __slots__ = ("size", "encoded")
+
+    def __init__(self, size, encoded):
+        self.size = size
+        self.encoded = encoded
+
+class ColdStorage:
+    """しばらく使われていない UVAS_ 画像のピクセルを圧縮して保持し、データブロックを 1x1 に縮める
+
+    ピクセルキャッシュ経由で読み書きされた時点で、自動的に元の大きさへ戻す
+    """
+    def __init__(self):
+        self._entries = {}  # キー -> _ColdEntry
+        self._last_access = {}  # キー -> 最後に使われた時刻（time.monotonic）
+
+    @property
+    def count(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return sum(entry.encoded.nbytes for entry in self._entries.values())
+
+    def is_cold(self, img):
+        return image_key(img) in self._entries
+
+    def touch(self, img):
+        """画像が使われたことを記録"""
+        self._last_access[image_key(img)] = time.monotonic()
+
+    def on_access(self, img):
+        """ピクセルキャッシュからの読み書き通知。冷蔵中なら元に戻す"""
+        self.touch(img)
+        if image_key(img) in self._entries:
+            self.thaw(img)
+
+    def ensure_resident(self, img):
+        """冷蔵中であれば元に戻す（ピクセルキャッシュを経由しない処理の前に呼ぶ）"""
+        if img is not None:
+            self.on_access(img)
+        return img
+
+    def idle_seconds(self, img, now=None):
+        """最後に使われてからの秒数（初めて見た画像は今使われたものとみなす）"""
+        now = time.monotonic() if now is None else now
+        return now - self._last_access.setdefault(image_key(img), now)
+
+    def freeze(self, img):
+        """画像のピクセルを圧縮して保持し、データブロックを 1x1 に縮める。解放したバイト数を返す"""
+        key = image_key(img)
+        if key in self._entries:
+            return 0
+        size = tuple(img.size)
+        if size[0] <= 1 and size[1] <= 1:
+            return 0
+        freed = resident_bytes(img)
+        # Memory Explorer のアイコンを失わないよう、縮める前にプレビューを作っておく
+        img.preview_ensure()
+        # 8 ビット画像は量子化しても値が変わらないため、float32 の 1/4 の大きさから圧縮する
+        encoded = encode_pixels(read_pixels(img), quantize=not img.is_float)
+        self._entries[key] = _ColdEntry(size, encoded)
+        pixel_cache.bump(img)
+        img.scale(1, 1)
+        logger.debug(f"Froze '{img.name}' ({freed} -> {encoded.nbytes} bytes)")
+        return freed
+
+    def thaw(self, img):
+        """冷蔵中の画像を元の大きさとピクセルに戻す"""
+        entry = self._entries.pop(image_key(img), None)
+        if entry is None:
+            return False
+        img.scale(*entry.size)
+        pixels = convert_pixels(decode_pixels(entry.encoded), np.float32, consume=True)
+        write_pixels(img, pixels)
+        # 戻した内容を最新世代として登録し、直後の読み込みを省く
+        pixel_cache.store(img, pixels)
+        logger.debug(f"Thawed '{img.name}' ({entry.size[0]}x{entry.size[1]})")
+        return True
+
+    def thaw_all(self):
+        """冷蔵中の画像をすべて元に戻す"""
+        images = {image_key(img): img for img in bpy.data.images}
+        for key in list(self._entries.keys()):
+            img = images.get(key)
+            if img is None:
+                self._entries.pop(key, None)
+            else:
+                self.thaw(img)
+
+    def discard(self, img):
+        """削除される画像の圧縮データを破棄"""
+        key = image_key(img)
+        self._entries.pop(key, None)
+        self._last_access.pop(key, None)
+
+    def drop_restored(self):
+        """グローバルアンドゥなどで元の大きさに戻った画像の圧縮データを捨てる"""
+        images = {image_key(img): img for img in bpy.data.images}
+        for key in list(self._entries.keys()):
+            img = images.get(key)
+            if img is None or tuple(img.size) == self._entries[key].size:
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._last_access.clear()
+
+    def candidates(self, scene):
+        """冷蔵してよい画像（UVAS_ 画像のうち、シーンやエディター、マテリアルから参照されていないもの）"""
+        protected = {
+            getattr(scene, name, None)
+            for name in ("image_reference", "tile_reference", "text_preview", "gif_image_reference")
+        }
+        images = []
+        for img in bpy.data.images:
+            if not img.name.startswith("UVAS_") or img.name.startswith(_EXCLUDED_PREFIXES):
+                continue
+            if img in protected or img.users > int(img.use_fake_user) or img.source != 'GENERATED':
+                continue
+            if image_key(img) in self._entries or img.size[0] * img.size[1] <= 1:
+                continue
+            images.append(img)
+        return images
+
+    def collect(self, scene, idle_limit, budget_bytes, force=False):
+        """idle_limit 秒以上使われていない画像と、予算を超えた分の古い画像を冷蔵し、冷蔵した数を返す
+
+        force=True なら使われていない時間に関わらず対象の画像をすべて冷蔵する
+        """
+        # 削除済みの画像の記録を捨てる
+        live_keys = {image_key(img) for img in bpy.data.images}
+        for store in (self._entries, self._last_access):
+            for key in [key for key in store if key not in live_keys]:
+                del store[key]
+
+        now = time.monotonic()
+        images = sorted(self.candidates(scene), key=lambda img: -self.idle_seconds(img, now))
+        resident = sum(resident_bytes(img) for img in bpy.data.images
+                       if img.name.startswith("UVAS_") and image_key(img) not in self._entries)
+        frozen = 0
+        for img in images:
+            # 古い順に見て、予算超過中または一定時間使われていない画像を冷蔵する
+            if not (force or resident > budget_bytes or self.idle_seconds(img, now) >= idle_limit):
+                continue
+            try:
+                resident -= self.freeze(img)
+                frozen += 1
+            except Exception as e:
+                self._entries.pop(image_key(img), None)
+                logger.warning(f"Failed to freeze '{img.name}': {str(e)}")
+        return frozen
+
+cold_storage = ColdStorage()
+
+def collect_scene(scene, force=False):
+    """シーンの設定に従って冷蔵を行う"""
+    return cold_storage.collect(
+        scene,
+        idle_limit=getattr(scene, "cold_storage_idle_minutes", 5) * 60,
+        budget_bytes=getattr(scene, "cold_storage_budget_mb", 1024) * 1024 * 1024,
+        force=force,
+    )
+
+def _sweep():
+    scene = bpy.context.scene
+    if scene is not None and getattr(scene, "cold_storage_enabled", False):
+        try:
+            frozen = collect_scene(scene)
+            if frozen:
+                logger.info(f"Moved {frozen} inactive images to cold storage")
+        except Exception as e:
+            logger.error(f"Cold storage sweep failed: {str(e)}")
+    return SWEEP_INTERVAL
+
+@persistent
+def _on_save_pre(*args):
+    # 縮めたままの画像を .blend に保存しないよう、保存前にすべて戻す
+    cold_storage.thaw_all()
+
+@persistent
+def _on_undo_redo(*args):
+    cold_storage.drop_restored()
+
+@persistent
+def _on_load_pre(*args):
+    cold_storage.clear()
+
+def register():
+    pixel_cache.access_hook = cold_storage.on_access
+    pixel_cache.discard_hook = cold_storage.discard
+    bpy.app.handlers.save_pre.append(_on_save_pre)
+    bpy.app.handlers.undo_post.append(_on_undo_redo)
+    bpy.app.handlers.redo_post.append(_on_undo_redo)
+    bpy.app.handlers.load_pre.append(_on_load_pre)
+    if not bpy.app.timers.is_registered(_sweep):
+        bpy.app.timers.register(_sweep, first_interval=SWEEP_INTERVAL, persistent=True)
+
+def unregister():
+    if bpy.app.timers.is_registered(_sweep):
+        bpy.app.timers.unregister(_sweep)
+    bpy.app.handlers.load_pre.remove(_on_load_pre)
+    bpy.app.handlers.redo_post.remove(_on_undo_redo)
+    bpy.app.handlers.undo_post.remove(_on_undo_redo)
+    bpy.app.handlers.save_pre.remove(_on_save_pre)
+    # アドオンを無効化しても画像が 1x1 のまま残らないよう戻す
+    cold_storage.thaw_all()
+    pixel_cache.access_hook = None
+    pixel_cache.discard_hook = None
@@ -0,0 +1,3 @@
+# core/__init__.py
+# -*- coding: utf-8 -*-
+# bpy に依存しない NumPy のみのカーネル群（Blender を起動せずに実行・計測できる）
@@ -0,0 +1,104 @@
+# core/atlas_gen.py
+# -*- coding: utf-8 -*-
+import numpy as np
+
+# 1 回に生成するストリップの目安の大きさ（バイト）
+STRIP_BYTES = 64 * 1024 * 1024
+
+GENERATE_MODES = ("FILL", "GRID")
+
+class AtlasSpec:
+    """FILL/GRID テンプレートアトラスの寸法と配色。ピクセルは下の行から、行のストリップ単位で生成する
+
+    タイルは左上から行優先に並び、割り切れずに余った右端と下端は FILL では白、GRID では透明になる
+    GRID の枠線は各セルの内側 border_width ピクセル（OUTER ではセル自体を枠線の分だけ大きくする）
+    """
+    def __init__(self, mode, resolution_x, resolution_y, split_x, split_y, border_width=0, outer=False, rng=None):
+        if mode not in GENERATE_MODES:
+            raise ValueError(f"Unknown generate mode: {mode}")
+        self.mode = mode
+        self.split_x = int(split_x)
+        self.split_y = int(split_y)
+        self.border_width = int(border_width) if mode == "GRID" else 0
+        outer = outer and mode == "GRID"
+        self.tile_width = int(resolution_x) // self.split_x
+        self.tile_height = int(resolution_y) // self.split_y
+        self.width = int(resolution_x)
+        self.height = int(resolution_y)
+        if outer:
+            self.width += 2 * self.border_width * self.split_x
+            self.height += 2 * self.border_width * self.split_y
+            self.tile_width += 2 * self.border_width
+            self.tile_height += 2 * self.border_width
+        if self.tile_width <= 0 or self.tile_height <= 0:
+            raise ValueError(f"Invalid tile dimensions: {self.tile_width}x{self.tile_height}")
+
+        rng = rng if rng is not None else np.random.default_rng()
+        # タイルごとの色（上から行優先）。余白用に白い行と列を一つずつ足しておく
+        self.colors = np.ones((self.split_y + 1, self.split_x + 1, 3), dtype=np.float32)
+        if mode == "FILL":
+            self.colors[:self.split_y, :self.split_x] = rng.random((self.split_y, self.split_x, 3), dtype=np.float32)
+
+        # 列ごとのタイル列番号と枠線かどうかは、全ストリップ共通なので一度だけ作る
+        columns = np.arange(self.width)
+        self._column_tile = np.minimum(columns // self.tile_width, self.split_x)
+        self._column_border = self._border_mask(columns, self.tile_width, self.split_x)
+
+    @property
+    def nbytes(self):
+        return self.width * self.height * 4 * 4
+
+    def strip_rows(self, max_bytes=STRIP_BYTES):
+        """1 ストリップの行数"""
+        return max(1, min(self.height, max_bytes // max(1, self.width * 16)))
+
+    def _border_mask(self, positions, cell_size, split):
+        local = positions % cell_size
+        border = (local < self.border_width) | (local >= cell_size - self.border_width)
+        return border & (positions < cell_size * split)
+
+    def _row_positions(self, y0, y1):
+        """配列上の行（下から）を、上から数えた行の位置に変換"""
+        return self.height - 1 - np.arange(y0, y1)
+
+    def strip(self, y0, y1, out=None):
+        """配列上の行 y0..y1（下から）のピクセルを (y1-y0, 幅, 4) の float32 で返す"""
+        rows = self._row_positions(y0, y1)
+        if out is None:
+            out = np.empty((y1 - y0, self.width, 4), dtype=np.float32)
+        if self.mode == "FILL":
+            row_tile = np.minimum(rows // self.tile_height, self.split_y)
+            out[..., :3] = self.colors[row_tile[:, None], self._column_tile[None, :]]
+            out[..., 3] = 1.0
+        else:
+            row_border = self._border_mask(rows, self.tile_height, self.split_y)
+            row_inside = rows < self.tile_height * self.split_y
+            column_inside = self._column_tile < self.split_x
+            border = (row_border[:, None] & column_inside[None, :]) | (row_inside[:, None] & self._column_border[None, :])
+            out[...] = border[..., None]
+        return out
+
+    def iter_strips(self, max_bytes=STRIP_BYTES, top_down=False):
+        """(y0, y1, ストリップ) を下の行から順に返す。ストリップの配列は再利用するため、呼び出し側で保持しないこと
+
+        top_down=True なら上の行から順に返し、y0..y1 は上から数えた行、ストリップの行も上から並ぶ（ファイル書き出し用）
+        """
+        rows = self.strip_rows(max_bytes)
+        buffer = np.empty((rows, self.width, 4), dtype=np.float32)
+        for start in range(0, self.height, rows):
+            end = min(self.height, start + rows)
+            if top_down:
+                strip = self.strip(self.height - end, self.height - start, out=buffer[:end - start])
+                yield start, end, strip[::-1]
+            else:
+                yield start, end, self.strip(start, end, out=buffer[:end - start])
+
+    def render(self, out=None, max_bytes=STRIP_BYTES):
+        """アトラス全体を (高さ, 幅, 4) の float32 配列に、ストリップ単位でその場に書き込む"""
+        if out is None:
+            out = np.empty((self.height, self.width, 4), dtype=np.float32)
+        rows = self.strip_rows(max_bytes)
+        for y0 in range(0, self.height, rows):
+            y1 = min(self.height, y0 + rows)
+            self.strip(y0, y1, out=out[y0:y1])
+        return out
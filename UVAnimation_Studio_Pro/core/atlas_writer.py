@@ -0,0 +1,117 @@
+# core/atlas_writer.py
+# -*- coding: utf-8 -*-
+import struct
+import zlib
+import numpy as np
+from .atlas_gen import STRIP_BYTES
+
+try:
+    import OpenImageIO as oiio
+except ImportError:
+    oiio = None
+
+FILE_FORMATS = ("PNG", "EXR")
+
+def available_formats():
+    """この環境でストリーム書き出しできる形式"""
+    return tuple(fmt for fmt in FILE_FORMATS if fmt != "EXR" or oiio is not None)
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+class PngStripWriter:
+    """RGBA 8 ビット PNG を上の行からストリップ単位で書き出す（画像全体をメモリに置かない）
+
+    各行は Sub フィルタで差分を取り、一つの zlib ストリームへ順に流し込む
+    """
+    def __init__(self, filepath, width, height, level=6):
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._file = open(filepath, "wb")
+        self._compressor = zlib.compressobj(level)
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._file.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+
+    def write(self, strip):
+        """上から並んだ (行数, 幅, 4) の float 配列を 1 ストリップ分書き込む"""
+        rows = strip.shape[0]
+        encoded = np.empty((rows, self.width * 4 + 1), dtype=np.uint8)
+        encoded[:, 0] = 1  # Sub フィルタ
+        line = encoded[:, 1:]
+        quantized = np.multiply(strip, 255.0, dtype=np.float32)
+        np.clip(quantized, 0.0, 255.0, out=quantized)
+        np.rint(quantized, out=quantized)
+        line[...] = quantized.reshape(rows, -1)
+        # 左隣の画素との差（uint8 の桁あふれがそのまま PNG の mod 256 演算になる）
+        line[:, 4:] -= quantized.reshape(rows, -1)[:, :-4].astype(np.uint8)
+        data = self._compressor.compress(encoded.tobytes())
+        if data:
+            self._file.write(_png_chunk(b"IDAT", data))
+        self.rows_written += rows
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self._file.write(_png_chunk(b"IDAT", self._compressor.flush()))
+            self._file.write(_png_chunk(b"IEND", b""))
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ExrStripWriter:
+    """OpenImageIO で RGBA half の EXR を上の行からスキャンライン単位で書き出す"""
+    def __init__(self, filepath, width, height):
+        if oiio is None:
+            raise RuntimeError("OpenImageIO is not available; EXR cannot be streamed")
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._output = oiio.ImageOutput.create(filepath)
+        if self._output is None:
+            raise RuntimeError(f"Cannot create EXR writer: {oiio.geterror()}")
+        spec = oiio.ImageSpec(width, height, 4, "half")
+        spec.attribute("compression", "zip")
+        if not self._output.open(filepath, spec):
+            raise RuntimeError(f"Cannot open '{filepath}': {self._output.geterror()}")
+
+    def write(self, strip):
+        rows = strip.shape[0]
+        y0 = self.rows_written
+        if not self._output.write_scanlines(y0, y0 + rows, 0, np.ascontiguousarray(strip, dtype=np.float32)):
+            raise RuntimeError(f"EXR write failed: {self._output.geterror()}")
+        self.rows_written += rows
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_strip_writer(filepath, width, height, file_format="PNG"):
+    if file_format == "PNG":
+        return PngStripWriter(filepath, width, height)
+    if file_format == "EXR":
+        return ExrStripWriter(filepath, width, height)
+    raise ValueError(f"Unsupported file format: {file_format}")
+
+def write_atlas_file(spec, filepath, file_format="PNG", max_bytes=STRIP_BYTES):
+    """AtlasSpec のピクセルをストリップ単位でファイルへ直接書き出し、書き込んだ行数を返す"""
+    with open_strip_writer(filepath, spec.width, spec.height, file_format) as writer:
+        for _, _, strip in spec.iter_strips(max_bytes, top_down=True):
+            writer.write(strip)
+    if writer.rows_written != spec.height:
+        raise RuntimeError(f"Incomplete image: wrote {writer.rows_written} of {spec.height} rows")
+    return writer.rows_written
@@ -0,0 +1,102 @@
+# core/auto_layout.py
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from .tile_picker import MAX_SPLIT
+from ..pixel_io import UINT8_TO_FLOAT32
+
+# 作業バッファ（float32 RGBA）の 1 ピクセルあたりのバイト数
+BYTES_PER_PIXEL = 16
+
+class AtlasLayout:
+    """自動で選んだグリッドとタイルの大きさ。scale は元のフレームに対する縮小率（1 以下）"""
+    __slots__ = ("split_x", "split_y", "tile_width", "tile_height", "scale")
+
+    def __init__(self, split_x, split_y, tile_width, tile_height, scale):
+        self.split_x = split_x
+        self.split_y = split_y
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.scale = scale
+
+    @property
+    def width(self):
+        return self.split_x * self.tile_width
+
+    @property
+    def height(self):
+        return self.split_y * self.tile_height
+
+    @property
+    def resized(self):
+        return self.scale < 1.0
+
+def choose_layout(frame_count, frame_width, frame_height, max_size=4096, max_bytes=0):
+    """frame_count 枚のフレームが最大辺 max_size と容量 max_bytes（0 なら無制限）に収まるグリッドを選ぶ
+
+    各 split_x について収まる最大の縮小率を求め、タイルが最も大きくなるもの、
+    同じなら空きセルが少なくアトラスが正方形に近いものを選ぶ
+    """
+    if frame_count <= 0 or frame_width <= 0 or frame_height <= 0:
+        raise ValueError("Nothing to lay out")
+    if frame_count > MAX_SPLIT * MAX_SPLIT:
+        raise ValueError(f"{frame_count} frames exceed the {MAX_SPLIT}x{MAX_SPLIT} grid limit")
+    best = None
+    for split_x in range(1, min(frame_count, MAX_SPLIT) + 1):
+        split_y = math.ceil(frame_count / split_x)
+        if split_y > MAX_SPLIT:
+            continue
+        scale = min(1.0, max_size / (split_x * frame_width), max_size / (split_y * frame_height))
+        if max_bytes:
+            scale = min(scale, math.sqrt(max_bytes / (BYTES_PER_PIXEL * split_x * split_y * frame_width * frame_height)))
+        tile_width = min(frame_width, math.floor(frame_width * scale + 1e-9))
+        tile_height = min(frame_height, math.floor(frame_height * scale + 1e-9))
+        if tile_width < 1 or tile_height < 1:
+            continue
+        width, height = split_x * tile_width, split_y * tile_height
+        rank = (tile_width * tile_height, -(split_x * split_y - frame_count), -abs(width - height))
+        if best is None or rank > best[0]:
+            best = (rank, AtlasLayout(split_x, split_y, tile_width, tile_height, min(tile_width / frame_width, tile_height / frame_height)))
+    if best is None:
+        raise ValueError(f"{frame_count} frames of {frame_width}x{frame_height} cannot fit in {max_size}px")
+    return best[1]
+
+def _area_weights(source, target):
+    """source 画素を target 画素へ面積平均で縮める (target, source) の重み行列"""
+    edges = np.linspace(0.0, source, target + 1)
+    pixels = np.arange(source)
+    low = np.maximum(edges[:-1, None], pixels[None, :])
+    high = np.minimum(edges[1:, None], pixels[None, :] + 1)
+    weights = np.clip(high - low, 0.0, None) / np.diff(edges)[:, None]
+    return weights.astype(np.float32)
+
+class Resampler:
+    """同じ大きさのフレームを面積平均で縮小し、行が下からのタイルへ書き込む
+
+    縦と横の重み行列は一度だけ作り、各フレームは 2 回の行列積で縮める（上下反転も縦の重みに含める）。
+    縁の色がにじまないよう、アルファを掛けた状態で平均してから戻す
+    """
+    def __init__(self, source_width, source_height, target_width, target_height):
+        self.source_size = (source_width, source_height)
+        self.target_size = (target_width, target_height)
+        self._rows = np.ascontiguousarray(_area_weights(source_height, target_height)[::-1])
+        self._columns_t = np.ascontiguousarray(_area_weights(source_width, target_width).T)
+
+    def place(self, tile, frame):
+        """上の行から並んだ (h, w, 4) フレームを縮小してタイルに書き込む"""
+        if frame.shape[1::-1] != self.source_size:
+            raise ValueError(f"Frame size mismatch: expected {self.source_size[0]}x{self.source_size[1]}, got {frame.shape[1]}x{frame.shape[0]}")
+        if frame.dtype == np.uint8:
+            pixels = UINT8_TO_FLOAT32[frame]
+        elif np.issubdtype(frame.dtype, np.integer):
+            pixels = frame.astype(np.float32) / np.iinfo(frame.dtype).max
+        else:
+            pixels = np.array(frame, dtype=np.float32)
+        pixels[..., :3] *= pixels[..., 3:]
+        # (h, w, 4) -> (out_h, w, 4) -> (out_h, 4, w) @ (w, out_w) -> (out_h, out_w, 4)
+        rows = np.tensordot(self._rows, pixels, axes=(1, 0))
+        result = np.matmul(rows.transpose(0, 2, 1), self._columns_t).transpose(0, 2, 1)
+        alpha = result[..., 3:]
+        np.divide(result[..., :3], alpha, out=result[..., :3], where=alpha > 0)
+        tile[...] = result
+        return tile
@@ -0,0 +1,199 @@
+# core/bitmap_font.py
+# -*- coding: utf-8 -*-
+import numpy as np
+from .text_composite import blend_over
+
+# 1 文字の大きさ（ピクセル）。最下段はディセンダー用
+GLYPH_WIDTH = 5
+GLYPH_HEIGHT = 8
+# 文字送り（字間 1 ピクセル）
+ADVANCE = GLYPH_WIDTH + 1
+
+# 印字可能な ASCII の 5x8 グリフ。各行を空白区切りで上から並べ、# が点灯（省略した下の行は空白）
+_GLYPH_ROWS = {
+    " ": "..... ..... ..... ..... ..... ..... .....",
+    "!": "..#.. ..#.. ..#.. ..#.. ..#.. ..... ..#..",
+    '"': ".#.#. .#.#. .#.#. ..... ..... ..... .....",
+    "#": ".#.#. .#.#. ##### .#.#. ##### .#.#. .#.#.",
+    "$": "..#.. .#### #.#.. .###. ..#.# ####. ..#..",
+    "%": "##... ##..# ...#. ..#.. .#... #..## ...##",
+    "&": ".##.. #..#. #.#.. .#... #.#.# #..#. .##.#",
+    "'": "..#.. ..#.. .#... ..... ..... ..... .....",
+    "(": "...#. ..#.. .#... .#... .#... ..#.. ...#.",
+    ")": ".#... ..#.. ...#. ...#. ...#. ..#.. .#...",
+    "*": "..... ..#.. #.#.# .###. #.#.# ..#.. .....",
+    "+": "..... ..#.. ..#.. ##### ..#.. ..#.. .....",
+    ",": "..... ..... ..... ..... .##.. ..#.. .#...",
+    "-": "..... ..... ..... ##### ..... ..... .....",
+    ".": "..... ..... ..... ..... ..... .##.. .##..",
+    "/": "..... ....# ...#. ..#.. .#... #.... .....",
+    "0": ".###. #...# #..## #.#.# ##..# #...# .###.",
+    "1": "..#.. .##.. ..#.. ..#.. ..#.. ..#.. .###.",
+    "2": ".###. #...# ....# ...#. ..#.. .#... #####",
+    "3": "##### ...#. ..#.. ...#. ....# #...# .###.",
+    "4": "...#. ..##. .#.#. #..#. ##### ...#. ...#.",
+    "5": "##### #.... ####. ....# ....# #...# .###.",
+    "6": "..##. .#... #.... ####. #...# #...# .###.",
+    "7": "##### ....# ...#. ..#.. .#... .#... .#...",
+    "8": ".###. #...# #...# .###. #...# #...# .###.",
+    "9": ".###. #...# #...# .#### ....# ...#. .##..",
+    ":": "..... .##.. .##.. ..... .##.. .##.. .....",
+    ";": "..... .##.. .##.. ..... .##.. ..#.. .#...",
+    "<": "...#. ..#.. .#... #.... .#... ..#.. ...#.",
+    "=": "..... ..... ##### ..... ##### ..... .....",
+    ">": ".#... ..#.. ...#. ....# ...#. ..#.. .#...",
+    "?": ".###. #...# ....# ...#. ..#.. ..... ..#..",
+    "@": ".###. #...# ....# .##.# #.#.# #.#.# .###.",
+    "A": ".###. #...# #...# ##### #...# #...# #...#",
+    "B": "####. #...# #...# ####. #...# #...# ####.",
+    "C": ".###. #...# #.... #.... #.... #...# .###.",
+    "D": "###.. #..#. #...# #...# #...# #..#. ###..",
+    "E": "##### #.... #.... ####. #.... #.... #####",
+    "F": "##### #.... #.... ####. #.... #.... #....",
+    "G": ".###. #...# #.... #.### #...# #...# .####",
+    "H": "#...# #...# #...# ##### #...# #...# #...#",
+    "I": ".###. ..#.. ..#.. ..#.. ..#.. ..#.. .###.",
+    "J": "..### ...#. ...#. ...#. ...#. #..#. .##..",
+    "K": "#...# #..#. #.#.. ##... #.#.. #..#. #...#",
+    "L": "#.... #.... #.... #.... #.... #.... #####",
+    "M": "#...# ##.## #.#.# #.#.# #...# #...# #...#",
+    "N": "#...# #...# ##..# #.#.# #..## #...# #...#",
+    "O": ".###. #...# #...# #...# #...# #...# .###.",
+    "P": "####. #...# #...# ####. #.... #.... #....",
+    "Q": ".###. #...# #...# #...# #.#.# #..#. .##.#",
+    "R": "####. #...# #...# ####. #.#.. #..#. #...#",
+    "S": ".#### #.... #.... .###. ....# ....# ####.",
+    "T": "##### ..#.. ..#.. ..#.. ..#.. ..#.. ..#..",
+    "U": "#...# #...# #...# #...# #...# #...# .###.",
+    "V": "#...# #...# #...# #...# #...# .#.#. ..#..",
+    "W": "#...# #...# #...# #.#.# #.#.# #.#.# .#.#.",
+    "X": "#...# #...# .#.#. ..#.. .#.#. #...# #...#",
+    "Y": "#...# #...# .#.#. ..#.. ..#.. ..#.. ..#..",
+    "Z": "##### ....# ...#. ..#.. .#... #.... #####",
+    "[": ".###. .#... .#... .#... .#... .#... .###.",
+    "\\": "..... #.... .#... ..#.. ...#. ....# .....",
+    "]": ".###. ...#. ...#. ...#. ...#. ...#. .###.",
+    "^": "..#.. .#.#. #...# ..... ..... ..... .....",
+    "_": "..... ..... ..... ..... ..... ..... #####",
+    "`": ".#... ..#.. ...#. ..... ..... ..... .....",
+    "a": "..... ..... .###. ....# .#### #...# .####",
+    "b": "#.... #.... #.##. ##..# #...# #...# ####.",
+    "c": "..... ..... .###. #.... #.... #...# .###.",
+    "d": "....# ....# .##.# #..## #...# #...# .####",
+    "e": "..... ..... .###. #...# ##### #.... .###.",
+    "f": "..##. .#..# .#... ###.. .#... .#... .#...",
+    "g": "..... ..... .#### #...# #...# .#### ....# .###.",
+    "h": "#.... #.... #.##. ##..# #...# #...# #...#",
+    "i": "..#.. ..... .##.. ..#.. ..#.. ..#.. .###.",
+    "j": "...#. ..... ..##. ...#. ...#. ...#. #..#. .##..",
+    "k": "#.... #.... #..#. #.#.. ##... #.#.. #..#.",
+    "l": ".##.. ..#.. ..#.. ..#.. ..#.. ..#.. .###.",
+    "m": "..... ..... ##.#. #.#.# #.#.# #...# #...#",
+    "n": "..... ..... #.##. ##..# #...# #...# #...#",
+    "o": "..... ..... .###. #...# #...# #...# .###.",
+    "p": "..... ..... ####. #...# #...# ####. #.... #....",
+    "q": "..... ..... .#### #...# #...# .#### ....# ....#",
+    "r": "..... ..... #.##. ##..# #.... #.... #....",
+    "s": "..... ..... .###. #.... .###. ....# ####.",
+    "t": ".#... .#... ###.. .#... .#... .#..# ..##.",
+    "u": "..... ..... #...# #...# #...# #..## .##.#",
+    "v": "..... ..... #...# #...# #...# .#.#. ..#..",
+    "w": "..... ..... #...# #...# #.#.# #.#.# .#.#.",
+    "x": "..... ..... #...# .#.#. ..#.. .#.#. #...#",
+    "y": "..... ..... #...# #...# #...# .#### ....# .###.",
+    "z": "..... ..... ##### ...#. ..#.. .#... #####",
+    "{": "...#. ..#.. ..#.. .#... ..#.. ..#.. ...#.",
+    "|": "..#.. ..#.. ..#.. ..#.. ..#.. ..#.. ..#..",
+    "}": ".#... ..#.. ..#.. ...#. ..#.. ..#.. .#...",
+    "~": "..... ..... .#... #.#.# ...#. ..... .....",
+}
+
+def _build_atlas():
+    """文字コード 0..127 のグリフを (128, GLYPH_HEIGHT, ADVANCE) の真偽値配列にまとめる（未定義の文字は ?）"""
+    atlas = np.zeros((128, GLYPH_HEIGHT, ADVANCE), dtype=bool)
+    for char, rows in _GLYPH_ROWS.items():
+        for y, row in enumerate(rows.split()):
+            atlas[ord(char), y, :GLYPH_WIDTH] = [c == "#" for c in row]
+    defined = np.zeros(128, dtype=bool)
+    defined[[ord(char) for char in _GLYPH_ROWS]] = True
+    atlas[~defined] = atlas[ord("?")]
+    return atlas
+
+GLYPH_ATLAS = _build_atlas()
+
+def encode_text(texts):
+    """文字列のリストを (n, 最大文字数) の文字コード配列に変換（短い文字列は空白で埋め、ASCII 以外は ?）"""
+    length = max((len(text) for text in texts), default=0)
+    codes = np.full((len(texts), length), ord(" "), dtype=np.intp)
+    for i, text in enumerate(texts):
+        if text:
+            encoded = np.frombuffer(text.encode("ascii", "replace"), dtype=np.uint8)
+            codes[i, :encoded.size] = np.minimum(encoded, 127)
+    return codes
+
+def text_masks(texts, scale=1):
+    """同じ文字数の文字列群を (n, 高さ, 幅) の真偽値マスク（行は上から）に一度で描く"""
+    codes = encode_text(texts)
+    count, length = codes.shape
+    if length == 0:
+        return np.zeros((count, 0, 0), dtype=bool)
+    glyphs = GLYPH_ATLAS[codes]  # (n, 文字数, 高さ, 文字送り)
+    masks = glyphs.transpose(0, 2, 1, 3).reshape(count, GLYPH_HEIGHT, length * ADVANCE)[:, :, :-1]
+    if scale > 1:
+        masks = masks.repeat(scale, axis=1).repeat(scale, axis=2)
+    return masks
+
+def text_size(text, scale=1):
+    """描画したときの (幅, 高さ)"""
+    return max(0, len(text) * ADVANCE - 1) * scale, GLYPH_HEIGHT * scale
+
+def fit_scale(labels, tile_width, tile_height, fraction=0.5):
+    """最長のラベルがタイルの幅・高さの fraction に収まる最大の整数倍率（最低 1）"""
+    width, height = text_size(max(labels, key=len, default=""))
+    if width == 0:
+        return 1
+    return max(1, int(min(tile_width * fraction / width, tile_height * fraction / height)))
+
+def _contrast_colors(region):
+    """各タイルの描画範囲の平均輝度から、白か黒の文字色を選ぶ"""
+    luminance = (region[..., :3] @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)).mean(axis=(1, 2))
+    return np.where(luminance[:, None] > 0.5, 0.0, 1.0).astype(np.float32).repeat(3, axis=1)
+
+def stamp_labels(tiles, labels, color=None, opacity=1.0, scale=0, offset=(0, 0)):
+    """(n, tile_h, tile_w, 4) のタイル群（行は下から）の中央に labels をその場で描き、tiles を返す
+
+    scale=0 ならタイルに収まる倍率を自動で選ぶ。color=None なら背景の明るさに応じて白か黒にする。
+    同じ文字数のラベルは描画位置も同じなので、文字数ごとにまとめて一度で合成する
+    """
+    count, tile_height, tile_width = tiles.shape[:3]
+    if count == 0:
+        return tiles
+    scale = scale or fit_scale(labels, tile_width, tile_height)
+    integer = np.issubdtype(tiles.dtype, np.integer)
+    lengths = np.array([len(label) for label in labels])
+    for length in np.unique(lengths):
+        if length == 0:
+            continue
+        group = np.flatnonzero(lengths == length)
+        masks = text_masks([labels[i] for i in group], scale)[:, ::-1]  # 行を下からに揃える
+        mask_height, mask_width = masks.shape[1:]
+        # 上から数えた位置で中央揃えし、オフセット（Y は上向きが正）を加えてから配列上の行に直す
+        left = (tile_width - mask_width) // 2 + offset[0]
+        top = (tile_height - mask_height) // 2 - offset[1]
+        bottom = tile_height - top - mask_height
+        x0, x1 = max(0, left), min(tile_width, left + mask_width)
+        y0, y1 = max(0, bottom), min(tile_height, bottom + mask_height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        alpha = masks[:, y0 - bottom:y1 - bottom, x0 - left:x1 - left].astype(np.float32)
+        if opacity != 1.0:
+            alpha *= opacity
+        region = tiles[group, y0:y1, x0:x1].astype(np.float32)
+        if integer:
+            region /= np.iinfo(tiles.dtype).max
+        colors = _contrast_colors(region) if color is None else np.broadcast_to(np.asarray(color, dtype=np.float32)[:3], (group.size, 3))
+        blend_over(region, alpha, colors[:, None, None, :])
+        if integer:
+            region = np.rint(np.clip(region, 0.0, 1.0) * np.iinfo(tiles.dtype).max)
+        tiles[group, y0:y1, x0:x1] = region
+    return tiles
@@ -0,0 +1,141 @@
+# core/frame_sources.py
+# -*- coding: utf-8 -*-
+import os
+import re
+import glob
+import numpy as np
+from PIL import Image
+
+try:
+    import OpenImageIO as oiio
+except ImportError:
+    oiio = None
+
+# フォルダーから連番として集める画像の拡張子
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tga", ".bmp", ".tif", ".tiff", ".webp", ".exr")
+# PIL では読めず OpenImageIO を使う拡張子
+_OIIO_EXTENSIONS = (".exr",)
+
+_DIGITS = re.compile(r"(\d+)")
+
+def natural_key(path):
+    """数字を数値として比較するソートキー（frame_2 が frame_10 より前になる）"""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS.split(os.path.basename(path))]
+
+def expand_frame_paths(pattern):
+    """フォルダーならその中の画像を、それ以外は glob パターンに一致するファイルを自然順で返す"""
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if name.lower().endswith(FRAME_EXTENSIONS)]
+    else:
+        paths = [path for path in glob.glob(pattern) if os.path.isfile(path)]
+    return sorted(paths, key=natural_key)
+
+def sequence_paths(filepath):
+    """連番の一枚（frame_0001.png など）から、同じ接頭辞・接尾辞で番号だけが違うファイルを番号順に返す"""
+    directory, name = os.path.split(filepath)
+    match = None
+    for match in _DIGITS.finditer(name):
+        pass
+    if match is None:
+        return [filepath] if os.path.isfile(filepath) else []
+    prefix, suffix = name[:match.start()], name[match.end():]
+    numbered = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$")
+    frames = []
+    for entry in os.listdir(directory or "."):
+        found = numbered.match(entry)
+        if found:
+            frames.append((int(found.group(1)), os.path.join(directory, entry)))
+    return [path for _, path in sorted(frames)]
+
+def _to_rgba(pixels):
+    """(h, w)、(h, w, 1..4) の配列を (h, w, 4) にそろえる（アルファがなければ不透明）"""
+    if pixels.ndim == 2:
+        pixels = pixels[..., None]
+    channels = pixels.shape[2]
+    if channels == 4:
+        return pixels
+    opaque = np.iinfo(pixels.dtype).max if np.issubdtype(pixels.dtype, np.integer) else 1.0
+    rgba = np.empty(pixels.shape[:2] + (4,), dtype=pixels.dtype)
+    if channels < 3:
+        rgba[..., :3] = pixels[..., :1]
+        rgba[..., 3] = pixels[..., 1] if channels == 2 else opaque
+    else:
+        rgba[..., :3] = pixels[..., :3]
+        rgba[..., 3] = opaque
+    return rgba
+
+def _require_oiio(path):
+    if oiio is None:
+        raise RuntimeError(f"OpenImageIO is required to read '{os.path.basename(path)}'")
+
+def load_frame(path):
+    """画像ファイルを行が上からの (h, w, 4) 配列で読む。通常は uint8、EXR は float32"""
+    if path.lower().endswith(_OIIO_EXTENSIONS):
+        _require_oiio(path)
+        image = oiio.ImageInput.open(path)
+        if image is None:
+            raise RuntimeError(f"Cannot open '{path}': {oiio.geterror()}")
+        try:
+            return _to_rgba(image.read_image(format="float"))
+        finally:
+            image.close()
+    with Image.open(path) as pil_img:
+        return np.asarray(pil_img.convert("RGBA"))
+
+def frame_size(path):
+    """画像のヘッダーだけを読み (幅, 高さ) を返す"""
+    if path.lower().endswith(_OIIO_EXTENSIONS):
+        _require_oiio(path)
+        image = oiio.ImageInput.open(path)
+        if image is None:
+            raise RuntimeError(f"Cannot open '{path}': {oiio.geterror()}")
+        try:
+            spec = image.spec()
+            return spec.width, spec.height
+        finally:
+            image.close()
+    with Image.open(path) as pil_img:
+        return pil_img.size
+
+class MovieReader:
+    """OpenImageIO（FFmpeg プラグイン）で動画を開き、各フレームをサブイメージとして読む"""
+    def __init__(self, path):
+        _require_oiio(path)
+        self.path = path
+        self._input = oiio.ImageInput.open(path)
+        if self._input is None:
+            raise RuntimeError(f"Cannot open movie '{path}': {oiio.geterror()}")
+        spec = self._input.spec()
+        self.width = spec.width
+        self.height = spec.height
+        self.frame_count = spec.get_int_attribute("oiio:subimages", 0) or self._count_subimages()
+
+    def _count_subimages(self):
+        count = 0
+        while self._input.seek_subimage(count, 0):
+            count += 1
+        self._input.seek_subimage(0, 0)
+        return count
+
+    def read(self, index):
+        """index 番目（0 始まり）のフレームを行が上からの (h, w, 4) の uint8 配列で返す"""
+        if not self._input.seek_subimage(index, 0):
+            raise RuntimeError(f"Cannot seek to frame {index} of '{self.path}'")
+        return _to_rgba(self._input.read_image(format="uint8"))
+
+    def iter_frames(self, frames):
+        """frames の各フレームを順に (番号, 配列) で返す（動画のデコードは前から順に進める）"""
+        for index in frames:
+            yield index, self.read(index)
+
+    def close(self):
+        if self._input is not None:
+            self._input.close()
+            self._input = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,115 @@
+# core/frame_stream.py
+# -*- coding: utf-8 -*-
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ..pixel_io import UINT8_TO_FLOAT32
+
+# フレーム間引きの比率と、何フレームごとに 1 枚使うか
+FRAME_STEPS = {"1/1": 1, "1/2": 2, "1/4": 4, "1/8": 8}
+
+# 読み込みを終えたことをワーカーに知らせる目印
+_DONE = object()
+
+def frame_step(ratio, reduce=True):
+    """間引きの設定から、何フレームごとに 1 枚使うかを返す"""
+    return FRAME_STEPS.get(ratio, 1) if reduce else 1
+
+def selected_frames(frame_count, step=1, limit=None):
+    """使うフレーム番号（0 始まり）の range。limit 枚に達したところで打ち切る"""
+    frames = range(0, frame_count, max(1, step))
+    return frames if limit is None else frames[:limit]
+
+def iter_animated_frames(pil_img, step=1, limit=None, frame_count=None):
+    """アニメーション画像を先頭から順にだけ読み進め、使うフレームの (番号, RGBA の uint8 配列) を返す
+
+    GIF/APNG は前のフレームに重ねて描くため、間引くフレームも seek で読み進めるが RGBA への変換はしない。
+    最後に使うフレームより後ろは読まない。frame_count を渡せば n_frames による全体の走査を省ける
+    """
+    if frame_count is None:
+        frame_count = getattr(pil_img, "n_frames", 1)
+    frames = selected_frames(frame_count, step, limit)
+    if not frames:
+        return
+    last = frames[-1]
+    for index in range(last + 1):
+        pil_img.seek(index)
+        if index % frames.step == 0:
+            yield index, np.asarray(pil_img.convert("RGBA"))
+
+def import_slot(position, split_x, split_y):
+    """取り込み順 position（0 始まり）のフレームを置くタイル番号。1 枚目は左下に置き、行は下から上へ並べる"""
+    row, column = divmod(position, split_x)
+    return (split_y - 1 - row) * split_x + column + 1
+
+def place_frame(tile, frame):
+    """上の行から並んだ (h, w, 4) フレームを、行が下からのタイル（float32 のビュー）へ変換しながら直接書き込む
+
+    uint8 は 256 要素の変換表で、float はそのまま上下反転してコピーする
+    """
+    if frame.shape != tile.shape:
+        raise ValueError(f"Frame size mismatch: expected {tile.shape[1]}x{tile.shape[0]}, got {frame.shape[1]}x{frame.shape[0]}")
+    if frame.dtype == np.uint8:
+        np.take(UINT8_TO_FLOAT32, frame[::-1], out=tile)
+    elif np.issubdtype(frame.dtype, np.integer):
+        np.multiply(frame[::-1], 1.0 / np.iinfo(frame.dtype).max, out=tile, casting="unsafe")
+    else:
+        tile[...] = frame[::-1]
+    return tile
+
+def default_workers():
+    """フレーム処理に使うスレッド数（デコード用のスレッドの分を一つ空ける）"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def run_pipeline(source, handle, workers=0, queue_size=0):
+    """source が返す (スロット, フレーム) を専用スレッドで読み、workers 本のスレッドで handle(スロット, フレーム) を並列に実行する
+
+    デコードは順にしか進められないため一本のスレッドで行い、変換・縮小・配置は各スロットが
+    アトラスの重ならない領域に書くので並列に実行できる。キューの長さを queue_size に制限し、
+    先読みしたフレームがメモリを使い切らないようにする。処理したフレーム数を返し、
+    どこかで例外が起きれば残りを捨ててその例外を送出する
+    """
+    workers = workers or default_workers()
+    frames = queue.Queue(maxsize=queue_size or workers * 2)
+    stop = threading.Event()
+    errors = []
+    processed = [0] * workers
+
+    def decode():
+        try:
+            for item in source:
+                if stop.is_set():
+                    break
+                frames.put(item)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                frames.put(_DONE)
+
+    def work(worker):
+        # 失敗後もキューは空になるまで受け取り、デコード側が put で止まらないようにする
+        while True:
+            item = frames.get()
+            if item is _DONE:
+                return
+            if stop.is_set():
+                continue
+            try:
+                handle(*item)
+                processed[worker] += 1
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+    decoder = threading.Thread(target=decode, name="uvas-frame-decoder", daemon=True)
+    decoder.start()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="uvas-frame") as pool:
+        list(pool.map(work, range(workers)))
+    decoder.join()
+    if errors:
+        raise errors[0]
+    return sum(processed)
@@ -0,0 +1,28 @@
+# core/pixel_codec.py
+# -*- coding: utf-8 -*-
+import zlib
+import numpy as np
+
+class EncodedPixels:
+    """zlib で圧縮した (H, W, 4) のピクセル配列"""
+    __slots__ = ("shape", "dtype", "data")
+
+    def __init__(self, shape, dtype, data):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.data = data
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+def encode_pixels(pixels, quantize=False, level=1):
+    """ピクセル配列を圧縮する。quantize=True なら 8 ビットに量子化してから圧縮（8 ビット画像では可逆）"""
+    if quantize:
+        pixels = np.rint(np.clip(pixels, 0.0, 1.0) * 255.0).astype(np.uint8)
+    pixels = np.ascontiguousarray(pixels)
+    return EncodedPixels(pixels.shape, pixels.dtype, zlib.compress(pixels.tobytes(), level))
+
+def decode_pixels(encoded):
+    """圧縮したピクセル配列を書き込み可能な配列に戻す（精度は圧縮時のまま）"""
+    return np.frombuffer(zlib.decompress(encoded.data), dtype=encoded.dtype).reshape(encoded.shape).copy()
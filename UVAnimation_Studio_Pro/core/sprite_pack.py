@@ -0,0 +1,98 @@
+# core/sprite_pack.py
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+
+def alpha_bounds(grid, threshold=0.0):
+    """全タイルのアルファの外接矩形を一度に求め、(n, 4) の (x, y, 幅, 高さ) 配列を返す
+
+    座標はタイル内の配列上の位置（y は下から）。完全に透明なタイルは幅・高さ 0
+    """
+    rows, cols = grid.cell_positions(np.arange(1, grid.tile_count + 1))
+    alpha = grid.tiles_view()[rows, :, cols, :, 3]
+    if np.issubdtype(alpha.dtype, np.integer):
+        threshold = threshold * np.iinfo(alpha.dtype).max
+    opaque = alpha > threshold
+    row_any = opaque.any(axis=2)
+    col_any = opaque.any(axis=1)
+    height, width = row_any.shape[1], col_any.shape[1]
+    y0 = row_any.argmax(axis=1)
+    y1 = height - row_any[:, ::-1].argmax(axis=1)
+    x0 = col_any.argmax(axis=1)
+    x1 = width - col_any[:, ::-1].argmax(axis=1)
+    bounds = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+    bounds[~row_any.any(axis=1)] = 0
+    return bounds
+
+def pack_rects(widths, heights, padding=1):
+    """矩形を高さの降順に棚詰めし、((n, 2) の配置位置, アトラス幅, アトラス高さ) を返す
+
+    アトラス幅は面積の平方根を目安にし、各矩形の右と上に padding ピクセルの隙間を空ける
+    """
+    widths = np.asarray(widths, dtype=np.intp)
+    heights = np.asarray(heights, dtype=np.intp)
+    positions = np.zeros((widths.size, 2), dtype=np.intp)
+    filled = (widths > 0) & (heights > 0)
+    if not filled.any():
+        return positions, 1, 1
+    area = int(((widths[filled] + padding) * (heights[filled] + padding)).sum())
+    atlas_width = max(int(widths.max()) + padding, math.ceil(math.sqrt(area)))
+
+    x = y = shelf_height = 0
+    for i in np.lexsort((-widths, -heights)):
+        if not filled[i]:
+            continue
+        if x + widths[i] > atlas_width:
+            y += shelf_height
+            x = shelf_height = 0
+        positions[i] = (x, y)
+        x += widths[i] + padding
+        shelf_height = max(shelf_height, heights[i] + padding)
+    return positions, atlas_width, y + shelf_height
+
+class SpriteSheet:
+    """透明部分を切り詰めたタイルを詰め直したアトラスと、フレームごとの矩形・オフセットの表
+
+    rects[i] はアトラス上の (x, y, 幅, 高さ)、offsets[i] は元のタイル内での切り詰め位置 (x, y)
+    """
+    def __init__(self, grid, threshold=0.0, padding=1):
+        self.tile_width = grid.tile_width
+        self.tile_height = grid.tile_height
+        self.split_x = grid.split_x
+        self.split_y = grid.split_y
+        bounds = alpha_bounds(grid, threshold)
+        positions, self.width, self.height = pack_rects(bounds[:, 2], bounds[:, 3], padding)
+        self.offsets = bounds[:, :2]
+        self.rects = np.concatenate([positions, bounds[:, 2:]], axis=1)
+
+        self.pixels = np.zeros((self.height, self.width, 4), dtype=grid.pixels.dtype)
+        for index, ((x, y, width, height), (offset_x, offset_y)) in enumerate(zip(self.rects, self.offsets), start=1):
+            if width and height:
+                tile = grid.tile(index)
+                self.pixels[y:y+height, x:x+width] = tile[offset_y:offset_y+height, offset_x:offset_x+width]
+
+    @property
+    def source_pixels(self):
+        return self.split_x * self.tile_width * self.split_y * self.tile_height
+
+    @property
+    def ratio(self):
+        """元のアトラスに対する縮小率（元の画素数 / 詰め直した画素数）"""
+        return self.source_pixels / max(1, self.width * self.height)
+
+def sprite_mapping(rect, offset, frame_size, atlas_size):
+    """UV がフレーム 1 のセル（左上）を覆う前提で、切り詰めたスプライトを表示する Mapping の値を返す
+
+    戻り値は (Scale, Location, (最小 u, 最大 u, 最小 v, 最大 v)) で、範囲外は隣のスプライトなので切り抜く
+    frame_size は (タイル幅, タイル高さ, split_x, split_y)、atlas_size は (幅, 高さ)
+    """
+    x, y, width, height = rect
+    offset_x, offset_y = offset
+    tile_width, tile_height, split_x, split_y = frame_size
+    atlas_width, atlas_height = atlas_size
+    source_width = tile_width * split_x
+    source_height = tile_height * split_y
+    scale = (source_width / atlas_width, source_height / atlas_height)
+    location = ((x - offset_x) / atlas_width, (y - offset_y - source_height + tile_height) / atlas_height)
+    clip = (x / atlas_width, (x + width) / atlas_width, y / atlas_height, (y + height) / atlas_height)
+    return scale, location, clip
@@ -0,0 +1,33 @@
+# core/text_composite.py
+# -*- coding: utf-8 -*-
+import numpy as np
+
+def blend_over(region, alpha, color):
+    """float の (..., h, w, 4) 領域に color（RGB）を alpha（(..., h, w) の 0..1）で重ねる（その場で書き換える）
+
+    ストレートアルファの over 合成。アルファは a + A(1 - a)、RGB は重ねた後のアルファに対する文字の寄与 a / A' で補間する
+    """
+    a = alpha[..., None]
+    out_alpha = a + region[..., 3:] * (1.0 - a)
+    weight = np.divide(a, out_alpha, out=np.zeros_like(out_alpha), where=out_alpha > 0)
+    region[..., :3] += (np.asarray(color, dtype=region.dtype)[..., :3] - region[..., :3]) * weight
+    region[..., 3:] = out_alpha
+    return region
+
+def composite_mask(tile, mask, left, top, color, opacity=1.0):
+    """行が下からのタイルに、行が上からのマスクを左上 (left, top) を基準に重ねる（その場で書き換える）
+
+    tile は float の (h, w, 4)、mask は 0..1 の (mh, mw)。タイルからはみ出す部分は切り捨てる
+    """
+    tile_height, tile_width = tile.shape[:2]
+    mask_height, mask_width = mask.shape
+    bottom = tile_height - top - mask_height
+    x0, x1 = max(0, left), min(tile_width, left + mask_width)
+    y0, y1 = max(0, bottom), min(tile_height, bottom + mask_height)
+    if x0 >= x1 or y0 >= y1:
+        return tile
+    alpha = mask[::-1][y0 - bottom:y1 - bottom, x0 - left:x1 - left]
+    if opacity != 1.0:
+        alpha = alpha * opacity
+    blend_over(tile[y0:y1, x0:x1], alpha, color)
+    return tile
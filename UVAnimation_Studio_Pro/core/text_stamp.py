@@ -0,0 +1,30 @@
+# core/text_stamp.py
+# -*- coding: utf-8 -*-
+import string
+
+# テンプレートで使えるフィールド
+TEMPLATE_FIELDS = ("index", "row", "col", "count", "frame")
+
+def label_fields(index, split_x, tile_count):
+    """タイル番号（1 始まり）からテンプレートに渡す値を作る。row, col も 1 始まり"""
+    return {
+        "index": index,
+        "row": (index - 1) // split_x + 1,
+        "col": (index - 1) % split_x + 1,
+        "count": tile_count,
+        "frame": index - 1,
+    }
+
+def validate_template(template):
+    """未知のフィールドを含むテンプレートなら ValueError"""
+    for _, field, _, _ in string.Formatter().parse(template):
+        if field is None:
+            continue
+        name = field.split(".")[0].split("[")[0]
+        if name not in TEMPLATE_FIELDS:
+            raise ValueError(f"Unknown template field '{{{field}}}' (use {', '.join('{' + f + '}' for f in TEMPLATE_FIELDS)})")
+
+def format_labels(template, indices, split_x, tile_count):
+    """各タイルのラベル文字列を返す（例: "{index}", "{row},{col}", "{index:03d}"）"""
+    validate_template(template)
+    return [template.format_map(label_fields(int(index), split_x, tile_count)) for index in indices]
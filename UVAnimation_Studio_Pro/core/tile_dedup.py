@@ -0,0 +1,125 @@
+# core/tile_dedup.py
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from .tile_engine import TileGrid
+
+# 近似一致の事前判定に使う、タイルあたりのブロック平均の分割数
+SIGNATURE_BLOCKS = 4
+# 近似一致の画素比較で一度に差を取るタイルの大きさの上限（バイト）
+COMPARE_BYTES = 64 * 1024 * 1024
+
+def compact_layout(count):
+    """count 枚のタイルを収める正方形に近いグリッド (split_x, split_y) を返す"""
+    split_x = max(1, math.ceil(math.sqrt(count)))
+    return split_x, max(1, math.ceil(count / split_x))
+
+def format_remap(remap):
+    """フレーム -> タイルの対応表を "1,1,2,3" 形式の文字列に変換"""
+    return ",".join(str(int(i)) for i in remap)
+
+def parse_remap(text):
+    """"1,1,2,3" 形式の文字列をフレーム -> タイルの対応表（1 始まり）に変換。不正な場合は空配列"""
+    try:
+        remap = np.array([int(part) for part in text.split(",") if part.strip()], dtype=np.intp)
+    except ValueError:
+        return np.empty(0, dtype=np.intp)
+    return remap if remap.size and remap.min() >= 1 else np.empty(0, dtype=np.intp)
+
+class TileDedupIndex:
+    """アトラスの全タイルを一度に比較して重複タイルを検出し、一意なタイルだけのアトラスと対応表を作る
+
+    tolerance > 0 なら、各チャンネルの差の最大値が tolerance 以下のタイルも重複とみなす
+    （tolerance は 0..1 の値で、uint8 の作業精度では 0..255 に換算する）
+    """
+    def __init__(self, grid, tolerance=0.0):
+        self.grid = grid
+        rows, cols = grid.cell_positions(np.arange(1, grid.tile_count + 1))
+        # 全タイルをタイル番号順の (n, tile_h, tile_w, 4) に一度で集める
+        self.tiles = grid.tiles_view()[rows, :, cols]
+        if np.issubdtype(self.tiles.dtype, np.integer):
+            tolerance = tolerance * np.iinfo(self.tiles.dtype).max
+        self.tolerance = float(tolerance)
+        # remap[i] は元の i+1 番目のタイルが使う一意なタイルの番号（1 始まり）、unique は一意なタイルの元の番号
+        self.remap, self.unique = self._build()
+
+    @property
+    def unique_count(self):
+        return int(self.unique.size)
+
+    @property
+    def duplicate_count(self):
+        return self.grid.tile_count - self.unique_count
+
+    def _exact_representatives(self):
+        """各タイルと内容が完全に一致する最初のタイルの位置。(n, h*w*4) の各行を一つのバイト列として np.unique で一度に分類する"""
+        rows = np.ascontiguousarray(self.tiles.reshape(self.grid.tile_count, -1))
+        keys = rows.view(np.dtype((np.void, rows.shape[1] * rows.itemsize))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        return first[inverse.ravel()]
+
+    def _build(self):
+        representative = self._exact_representatives()
+        exact_unique = np.flatnonzero(representative == np.arange(self.grid.tile_count))
+
+        if self.tolerance > 0 and exact_unique.size > 1:
+            merged = self._merge_near(exact_unique)
+            representative = merged[representative]
+
+        unique = np.flatnonzero(representative == np.arange(self.grid.tile_count))
+        position = np.zeros(self.grid.tile_count, dtype=np.intp)
+        position[unique] = np.arange(1, unique.size + 1)
+        return position[representative], unique + 1
+
+    def _signatures(self, indices):
+        """タイルを SIGNATURE_BLOCKS x SIGNATURE_BLOCKS のブロック平均に縮めた (n, by, bx, 4) 配列"""
+        tiles = self.tiles[indices]
+        height, width = tiles.shape[1:3]
+        ys = np.unique(np.linspace(0, height, SIGNATURE_BLOCKS, endpoint=False).astype(np.intp))
+        xs = np.unique(np.linspace(0, width, SIGNATURE_BLOCKS, endpoint=False).astype(np.intp))
+        sums = np.add.reduceat(np.add.reduceat(tiles, ys, axis=1, dtype=np.float64), xs, axis=2)
+        counts = np.diff(np.append(ys, height))[:, None] * np.diff(np.append(xs, width))[None, :]
+        return sums / counts[None, :, :, None]
+
+    def _max_differences(self, index, others):
+        """タイル index と others の各タイルの、各チャンネルの差の最大値。メモリを抑えるため区切って比較する"""
+        tile = self.tiles[index].astype(np.float32)
+        chunk = max(1, COMPARE_BYTES // max(1, tile.nbytes))
+        return np.concatenate([
+            np.abs(self.tiles[others[start:start + chunk]].astype(np.float32) - tile).max(axis=(1, 2, 3))
+            for start in range(0, others.size, chunk)
+        ])
+
+    def _merge_near(self, candidates):
+        """完全一致で残ったタイル同士を近似比較し、各タイルの代表（元のタイル配列上の位置）を返す
+
+        先頭から順に、まだ代表の決まっていないタイルを代表とし、それより後ろで差が tolerance 以下のタイルを
+        まとめてその代表に寄せる。ブロック平均の差は画素の差の最大値を超えないため、平均で候補を絞ってから画素を比較する
+        """
+        merged = np.arange(self.grid.tile_count)
+        signatures = self._signatures(candidates).reshape(candidates.size, -1)
+        pending = np.ones(candidates.size, dtype=bool)
+        position = 0
+        while position < candidates.size:
+            pending[position] = False
+            later = position + 1 + np.flatnonzero(pending[position + 1:])
+            close = later[np.abs(signatures[later] - signatures[position]).max(axis=1) <= self.tolerance]
+            if close.size:
+                hit = close[self._max_differences(candidates[position], candidates[close]) <= self.tolerance]
+                merged[candidates[hit]] = candidates[position]
+                pending[hit] = False
+            remaining = np.flatnonzero(pending[position + 1:])
+            position = position + 1 + remaining[0] if remaining.size else candidates.size
+        return merged
+
+    def build_atlas(self, split_x=None, split_y=None):
+        """一意なタイルだけを行優先で並べたアトラスを返す。(ピクセル, split_x, split_y)"""
+        if split_x is None or split_y is None:
+            split_x, split_y = compact_layout(self.unique_count)
+        if split_x * split_y < self.unique_count:
+            raise ValueError(f"A {split_x}x{split_y} grid cannot hold {self.unique_count} unique tiles")
+        pixels = np.zeros((split_y * self.grid.tile_height, split_x * self.grid.tile_width, 4), dtype=self.grid.pixels.dtype)
+        atlas = TileGrid(pixels, split_x, split_y)
+        rows, cols = atlas.cell_positions(np.arange(1, self.unique_count + 1))
+        atlas.tiles_view()[rows, :, cols] = self.tiles[self.unique - 1]
+        return pixels, split_x, split_y
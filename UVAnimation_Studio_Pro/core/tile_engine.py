@@ -0,0 +1,238 @@
+# core/tile_engine.py
+# -*- coding: utf-8 -*-
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+MIRROR_DIRECTIONS = ("LEFT_TO_RIGHT", "RIGHT_TO_LEFT", "TOP_TO_BOTTOM", "BOTTOM_TO_TOP")
+REORDER_MODES = ("REVERSE", "TRANSPOSE", "INTERLEAVE", "CUSTOM")
+
+def rect_indices(first, second, split_x, split_y):
+    """2 つのタイル番号（1 始まり）を対角とする矩形内のタイル番号を行優先で返す"""
+    first_col, first_row = (first - 1) % split_x, (first - 1) // split_x
+    second_col, second_row = (second - 1) % split_x, (second - 1) // split_x
+    rows = np.arange(min(first_row, second_row), min(max(first_row, second_row), split_y - 1) + 1)
+    cols = np.arange(min(first_col, second_col), max(first_col, second_col) + 1)
+    return (rows[:, None] * split_x + cols[None, :] + 1).ravel()
+
+def mirror_halves(pixels, direction):
+    """(..., H, W, 4) の配列の半分をもう半分へその場で鏡映コピー（奇数サイズでは中央の列/行を残す）"""
+    height, width = pixels.shape[-3:-1]
+    mid_x = width // 2
+    mid_y = height // 2
+    if direction == "LEFT_TO_RIGHT":
+        if mid_x:
+            pixels[..., width-mid_x:, :] = pixels[..., mid_x-1::-1, :]
+    elif direction == "RIGHT_TO_LEFT":
+        if mid_x:
+            pixels[..., :mid_x, :] = pixels[..., :width-mid_x-1:-1, :]
+    elif direction == "TOP_TO_BOTTOM":
+        if mid_y:
+            pixels[..., height-mid_y:, :, :] = pixels[..., mid_y-1::-1, :, :]
+    elif direction == "BOTTOM_TO_TOP":
+        if mid_y:
+            pixels[..., :mid_y, :, :] = pixels[..., :height-mid_y-1:-1, :, :]
+    else:
+        raise ValueError(f"Unknown mirror direction: {direction}")
+    return pixels
+
+def parse_order(text, tile_count):
+    """"4,3,2,1" や "1-8, 16-9" 形式の文字列を 1 始まりの並び順配列に変換"""
+    order = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part[1:]:
+                start, end = (int(v) for v in part.split("-", 1))
+                step = 1 if end >= start else -1
+                order.extend(range(start, end + step, step))
+            else:
+                order.append(int(part))
+        except ValueError:
+            raise ValueError(f"Invalid tile order entry: '{part}'")
+    return validate_order(order, tile_count)
+
+def validate_order(order, tile_count):
+    """並び順が 1..tile_count の置換であることを確認して配列で返す"""
+    order = np.asarray(order, dtype=np.intp)
+    if order.shape != (tile_count,):
+        raise ValueError(f"Tile order must list all {tile_count} tiles, got {order.size}")
+    if not np.array_equal(np.sort(order), np.arange(1, tile_count + 1)):
+        raise ValueError(f"Tile order must use each tile 1-{tile_count} exactly once")
+    return order
+
+def build_order(mode, split_x, split_y, custom=""):
+    """並べ替えモードから並び順を作る。order[i] は新しい i+1 番目に置く元のタイル番号"""
+    tile_count = split_x * split_y
+    indices = np.arange(1, tile_count + 1, dtype=np.intp)
+    if mode == "REVERSE":
+        return indices[::-1].copy()
+    if mode == "TRANSPOSE":
+        # 列優先で読んだ順に行優先で並べる（正方形グリッドでは転置）
+        return indices.reshape(split_y, split_x).T.ravel()
+    if mode == "INTERLEAVE":
+        # 前半と後半を交互に並べる（1, n/2+1, 2, n/2+2, ...）
+        half = (tile_count + 1) // 2
+        order = np.empty(tile_count, dtype=np.intp)
+        order[0::2] = indices[:half]
+        order[1::2] = indices[half:]
+        return order
+    if mode == "CUSTOM":
+        return parse_order(custom, tile_count)
+    raise ValueError(f"Unknown reorder mode: {mode}")
+
+class TileGrid:
+    """(H, W, 4) のピクセル配列をタイル分割して編集する bpy 非依存のエンジン
+
+    タイル番号は 1 始まりで、左上から行優先に数える。Blender の画像は下の行から
+    格納されるため、配列上のタイル行は上下が反転している。各操作は配列をその場で書き換える。
+    """
+    def __init__(self, pixels, split_x, split_y, record=False):
+        if pixels.ndim != 3 or pixels.shape[2] != 4:
+            raise ValueError(f"Pixels must have shape (H, W, 4), got {pixels.shape}")
+        self.pixels = pixels
+        self.split_x = int(split_x)
+        self.split_y = int(split_y)
+        self.height, self.width = pixels.shape[:2]
+        self.tile_width = self.width // self.split_x if self.split_x > 0 else 0
+        self.tile_height = self.height // self.split_y if self.split_y > 0 else 0
+        if self.tile_width <= 0 or self.tile_height <= 0:
+            raise ValueError(f"Invalid tile dimensions: {self.tile_width}x{self.tile_height}")
+        # record=True なら、各タイルを最初に書き換える直前の内容を保持する（履歴用）
+        self.pre_images = {} if record else None
+
+    @property
+    def tile_count(self):
+        return self.split_x * self.split_y
+
+    def _check_index(self, index):
+        if not 1 <= index <= self.tile_count:
+            raise ValueError(f"Tile index {index} out of range (1-{self.tile_count})")
+
+    def tile_rect(self, index):
+        """タイルの配列上の (x, y, 幅, 高さ) を返す"""
+        self._check_index(index)
+        i = index - 1
+        tile_x = (i % self.split_x) * self.tile_width
+        tile_y = (self.split_y - 1 - (i // self.split_x)) * self.tile_height
+        return tile_x, tile_y, self.tile_width, self.tile_height
+
+    def tile_region(self, index):
+        """タイル領域を表すスライスを返す"""
+        tile_x, tile_y, tile_width, tile_height = self.tile_rect(index)
+        return np.s_[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width]
+
+    def tile(self, index):
+        """タイルのビュー（コピーではない）を返す"""
+        return self.pixels[self.tile_region(index)]
+
+    def _save(self, indices):
+        """記録が有効なら、まだ保存していないタイルの変更前の内容を保存"""
+        if self.pre_images is None:
+            return
+        for index in np.atleast_1d(indices):
+            index = int(index)
+            if index not in self.pre_images:
+                self.pre_images[index] = self.tile(index).copy()
+
+    def touched_tiles(self):
+        """記録した (タイルの (x, y, 幅, 高さ), 変更前の内容) のリスト"""
+        if not self.pre_images:
+            return []
+        return [(self.tile_rect(index), pixels) for index, pixels in self.pre_images.items()]
+
+    def tiles_view(self):
+        """(split_y, tile_h, split_x, tile_w, 4) の 5 次元ビュー。第 0 軸は配列上の行（下から）"""
+        s0, s1, s2 = self.pixels.strides
+        return as_strided(
+            self.pixels,
+            shape=(self.split_y, self.tile_height, self.split_x, self.tile_width, 4),
+            strides=(self.tile_height * s0, s0, self.tile_width * s1, s1, s2),
+        )
+
+    def cell_positions(self, indices):
+        """タイル番号の配列を 5 次元ビュー上の (行, 列) 配列に変換"""
+        indices = np.asarray(indices, dtype=np.intp) - 1
+        if indices.size and (indices.min() < 0 or indices.max() >= self.tile_count):
+            raise ValueError(f"Tile indices out of range (1-{self.tile_count})")
+        return self.split_y - 1 - indices // self.split_x, indices % self.split_x
+
+    def rotate(self, index, k):
+        """タイルを 90 度単位で回転（np.rot90 の k）。非正方形タイルは 180 度のみ"""
+        if k % 2 and self.tile_width != self.tile_height:
+            raise ValueError("Non-square tiles can only be rotated by 180 degrees")
+        self._save(index)
+        tile = self.tile(index)
+        tile[...] = np.rot90(tile, k=k).copy()
+
+    def flip(self, index, axis):
+        """タイルを反転（axis=1 で水平、axis=0 で垂直）"""
+        self._save(index)
+        tile = self.tile(index)
+        tile[...] = np.flip(tile, axis=axis).copy()
+
+    def mirror(self, index, direction):
+        """タイルの半分をもう半分へ鏡映コピー（奇数サイズでは中央の列/行を残す）"""
+        self._save(index)
+        mirror_halves(self.tile(index), direction)
+
+    def transform_tiles(self, indices, func):
+        """複数タイルを (n, tile_h, tile_w, 4) に一度で集め、func の結果を一度で書き戻す"""
+        rows, cols = self.cell_positions(indices)
+        if not rows.size:
+            return
+        self._save(indices)
+        view = self.tiles_view()
+        view[rows, :, cols] = func(view[rows, :, cols])
+
+    def rotate_tiles(self, indices, k):
+        """複数タイルをまとめて 90 度単位で回転"""
+        if k % 2 and self.tile_width != self.tile_height:
+            raise ValueError("Non-square tiles can only be rotated by 180 degrees")
+        self.transform_tiles(indices, lambda block: np.rot90(block, k=k, axes=(1, 2)))
+
+    def flip_tiles(self, indices, axis):
+        """複数タイルをまとめて反転（axis はタイル単体での軸）"""
+        self.transform_tiles(indices, lambda block: np.flip(block, axis=axis + 1))
+
+    def mirror_tiles(self, indices, direction):
+        """複数タイルをまとめて鏡映コピー"""
+        self.transform_tiles(indices, lambda block: mirror_halves(block, direction))
+
+    def patch(self, index, tile_pixels):
+        """タイルを指定の (tile_h, tile_w, 4) 配列で置き換える"""
+        tile = self.tile(index)
+        if tile_pixels.shape != tile.shape:
+            raise ValueError(f"Tile size mismatch: expected {tile.shape[1]}x{tile.shape[0]}, got {tile_pixels.shape[1]}x{tile_pixels.shape[0]}")
+        self._save(index)
+        tile[...] = tile_pixels
+
+    def move_tiles(self, sources, targets):
+        """sources のタイルを targets の位置へ一括で移動（一度の gather と scatter）"""
+        src_rows, src_cols = self.cell_positions(sources)
+        dst_rows, dst_cols = self.cell_positions(targets)
+        self._save(targets)
+        view = self.tiles_view()
+        # 高度なインデックスがスライスで分断されるため、結果は (n, tile_h, tile_w, 4)
+        view[dst_rows, :, dst_cols] = view[src_rows, :, src_cols]
+
+    def permute(self, order):
+        """order[i] 番のタイルを i+1 番の位置へ置く。5 次元ビュー上の一度の gather で並べ替える"""
+        order = validate_order(order, self.tile_count)
+        targets = np.flatnonzero(order != np.arange(1, self.tile_count + 1)) + 1
+        if targets.size:
+            self.move_tiles(order[targets - 1], targets)
+        return targets
+
+    def swap(self, first, second):
+        """2 つのタイルを入れ替える"""
+        self.move_tiles([first, second], [second, first])
+
+    def shuffle(self, indices, rng=None):
+        """指定タイルをランダムに並べ替え、移動先のタイル番号を返す"""
+        rng = rng if rng is not None else np.random.default_rng()
+        indices = np.asarray(indices, dtype=np.intp)
+        targets = rng.permutation(indices)
+        self.move_tiles(indices, targets)
+        return targets
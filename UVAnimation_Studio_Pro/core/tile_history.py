@@ -0,0 +1,164 @@
+# core/tile_history.py
+# -*- coding: utf-8 -*-
+import zlib
+from collections import deque
+import numpy as np
+
+# 履歴全体で保持する変更前タイルの上限（バイト）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+class _TilePayload:
+    """一つのタイル領域の保存内容（zlib 圧縮または生の配列）"""
+    __slots__ = ("rect", "shape", "dtype", "data", "compressed")
+
+    def __init__(self, rect, pixels, compress):
+        self.rect = rect
+        self.shape = pixels.shape
+        self.dtype = pixels.dtype
+        self.compressed = compress
+        # 圧縮時は速度優先のレベル 1 で十分（タイルは平坦な領域が多い）
+        self.data = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 1) if compress else pixels
+
+    @property
+    def nbytes(self):
+        return len(self.data) if self.compressed else self.data.nbytes
+
+    def region(self):
+        tile_x, tile_y, tile_width, tile_height = self.rect
+        return np.s_[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width]
+
+    def decode(self):
+        if not self.compressed:
+            return self.data
+        return np.frombuffer(zlib.decompress(self.data), dtype=self.dtype).reshape(self.shape)
+
+class _HistoryEntry:
+    """一回の操作で変更されたタイルの、もう一方の状態（元に戻す前は変更前、やり直す前は変更後）"""
+    __slots__ = ("target", "label", "size", "payloads")
+
+    def __init__(self, target, label, size, payloads):
+        self.target = target
+        self.label = label
+        self.size = size
+        self.payloads = payloads
+
+    @property
+    def nbytes(self):
+        return sum(payload.nbytes for payload in self.payloads)
+
+    def swap(self, pixels, compress):
+        """保存内容と pixels の該当領域を入れ替え、書き換えた領域のスライスを返す"""
+        if pixels.shape[1::-1] != self.size:
+            raise ValueError(f"Image size changed: expected {self.size[0]}x{self.size[1]}, got {pixels.shape[1]}x{pixels.shape[0]}")
+        # 先にすべて復号してから書き込み、途中で失敗しても pixels を半端な状態にしない
+        restored = [payload.decode() for payload in self.payloads]
+        regions = []
+        payloads = []
+        for payload, tile_pixels in zip(self.payloads, restored):
+            region = payload.region()
+            payloads.append(_TilePayload(payload.rect, pixels[region].copy(), compress))
+            pixels[region] = tile_pixels
+            regions.append(region)
+        self.payloads = payloads
+        return regions
+
+class TileHistory:
+    """タイル単位の元に戻す/やり直す履歴。変更されたタイルだけを保持し、上限を超えたら古い順に捨てる"""
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, compress=False):
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._undo = deque()
+        self._redo = []
+        self._bytes = 0
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    @property
+    def undo_count(self):
+        return len(self._undo)
+
+    @property
+    def redo_count(self):
+        return len(self._redo)
+
+    def configure(self, max_bytes, compress):
+        """上限と圧縮設定を更新し、上限を超えていれば古い履歴を捨てる（既存の履歴は再圧縮しない）"""
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._evict()
+
+    def undo_target(self):
+        """次に元に戻す操作の対象画像名（なければ None）"""
+        return self._undo[-1].target if self._undo else None
+
+    def redo_target(self):
+        return self._redo[-1].target if self._redo else None
+
+    def push(self, target, touched_tiles, size, label="", source=None):
+        """操作の変更前タイル [(rect, pixels), ...] を記録し、やり直し履歴を破棄
+
+        source は操作の元になった画像名。新しい画像に結果を書いた場合、既存の履歴の対象を target に付け替える
+        """
+        if not touched_tiles:
+            return
+        if source is not None and source != target:
+            # target の内容は丸ごと置き換わったため、target に対する古い履歴は使えない
+            self.drop_target(target)
+            for entry in self._undo:
+                if entry.target == source:
+                    entry.target = target
+        self._clear_redo()
+        entry = _HistoryEntry(target, label, tuple(size), [_TilePayload(rect, pixels, self.compress) for rect, pixels in touched_tiles])
+        self._undo.append(entry)
+        self._bytes += entry.nbytes
+        self._evict()
+
+    def undo(self, pixels):
+        """直近の操作を pixels 上で元に戻し、(ラベル, 書き換えた領域) を返す"""
+        entry = self._undo[-1]
+        before = entry.nbytes
+        regions = entry.swap(pixels, self.compress)
+        self._undo.pop()
+        self._redo.append(entry)
+        self._bytes += entry.nbytes - before
+        return entry.label, regions
+
+    def redo(self, pixels):
+        """元に戻した操作を pixels 上でやり直し、(ラベル, 書き換えた領域) を返す"""
+        entry = self._redo[-1]
+        before = entry.nbytes
+        regions = entry.swap(pixels, self.compress)
+        self._redo.pop()
+        self._undo.append(entry)
+        self._bytes += entry.nbytes - before
+        self._evict()
+        return entry.label, regions
+
+    def drop_target(self, target):
+        """削除された画像の履歴を破棄"""
+        for stack in (self._undo, self._redo):
+            for entry in [entry for entry in stack if entry.target == target]:
+                stack.remove(entry)
+                self._bytes -= entry.nbytes
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+    def _clear_redo(self):
+        for entry in self._redo:
+            self._bytes -= entry.nbytes
+        self._redo.clear()
+
+    def _evict(self):
+        # やり直し履歴は直前の操作に依存するため、上限超過時は古い元に戻す履歴から捨てる
+        while self._bytes > self.max_bytes and self._undo:
+            entry = self._undo.popleft()
+            self._bytes -= entry.nbytes
+        if self._bytes > self.max_bytes:
+            self._clear_redo()
+
+tile_history = TileHistory()
@@ -0,0 +1,70 @@
+# core/tile_picker.py
+# -*- coding: utf-8 -*-
+import math
+import numpy as np
+from .tile_selection import TileSelection
+
+# グリッドの分割数の上限（64x64 = 4096 タイル）
+MAX_SPLIT = 64
+# タイルピッカーの 1 ページに並べるセル数の既定値（一辺）
+DEFAULT_PAGE_SIZE = 8
+
+def page_count(split, page_size):
+    """一辺 split のグリッドを page_size ずつ区切ったページ数"""
+    return max(1, math.ceil(split / max(1, page_size)))
+
+def page_window(split_x, split_y, page_x, page_y, page_size):
+    """表示するページの列範囲と行範囲 (x0, x1, y0, y1) を返す（ページ番号は範囲内に丸める）"""
+    page_x = min(max(0, page_x), page_count(split_x, page_size) - 1)
+    page_y = min(max(0, page_y), page_count(split_y, page_size) - 1)
+    x0 = page_x * page_size
+    y0 = page_y * page_size
+    return x0, min(split_x, x0 + page_size), y0, min(split_y, y0 + page_size)
+
+def page_of(index, split_x, page_size):
+    """タイル番号（1 始まり）を含むページ (page_x, page_y) を返す"""
+    return ((index - 1) % split_x) // page_size, ((index - 1) // split_x) // page_size
+
+def depressed_mask(mode, split_x, split_y, last_clicked=0, swap_first=-1, swap_second=-1, shuffle_second=-1, selection_hex=None):
+    """タイルピッカーで押下表示するセルの (split_y, split_x) の真偽値マスク（行は上から）"""
+    if selection_hex is not None:
+        return TileSelection.from_hex(selection_hex, split_x, split_y).mask.reshape(split_y, split_x)
+    mask = np.zeros(split_x * split_y, dtype=bool)
+
+    def mark(index):
+        if 1 <= index <= mask.size:
+            mask[index - 1] = True
+
+    if mode in ("EXTRACT", "MIRROR", "INSERT_TEXT"):
+        mark(last_clicked)
+    elif mode == "SWAP":
+        mark(swap_first)
+        mark(swap_second)
+    elif mode == "SHUFFLE" and swap_first != -1:
+        if shuffle_second == -1:
+            mark(swap_first)
+        else:
+            # 2 つのタイルを対角とする矩形（行列のスライスで一度に塗る）
+            grid = mask.reshape(split_y, split_x)
+            first_col, first_row = (swap_first - 1) % split_x, (swap_first - 1) // split_x
+            second_col, second_row = (shuffle_second - 1) % split_x, (shuffle_second - 1) // split_x
+            grid[min(first_row, second_row):max(first_row, second_row) + 1,
+                 min(first_col, second_col):max(first_col, second_col) + 1] = True
+    return mask.reshape(split_y, split_x)
+
+class PickerMaskCache:
+    """押下表示のマスクを状態ごとに一つだけ保持し、状態が変わらない再描画では作り直さない"""
+    def __init__(self):
+        self._key = None
+        self._mask = None
+
+    def get(self, *state, **named_state):
+        key = (state, tuple(sorted(named_state.items())))
+        if key != self._key:
+            self._mask = depressed_mask(*state, **named_state)
+            self._key = key
+        return self._mask
+
+    def clear(self):
+        self._key = None
+        self._mask = None
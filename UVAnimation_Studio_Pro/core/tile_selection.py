@@ -0,0 +1,74 @@
+# core/tile_selection.py
+# -*- coding: utf-8 -*-
+import numpy as np
+
+class TileSelection:
+    """タイルの複数選択をビットマスクで保持（タイル番号は 1 始まり、左上から行優先）
+
+    シーンには np.packbits した 16 進文字列として保存する
+    """
+    def __init__(self, split_x, split_y, mask=None):
+        self.split_x = int(split_x)
+        self.split_y = int(split_y)
+        self.mask = np.zeros(self.split_x * self.split_y, dtype=bool) if mask is None else mask
+
+    @classmethod
+    def from_hex(cls, text, split_x, split_y):
+        """16 進文字列から復元。グリッドの大きさが合わないビットは捨てる"""
+        selection = cls(split_x, split_y)
+        if text:
+            try:
+                bits = np.unpackbits(np.frombuffer(bytes.fromhex(text), dtype=np.uint8))
+            except ValueError:
+                return selection
+            count = min(bits.size, selection.mask.size)
+            selection.mask[:count] = bits[:count].astype(bool)
+        return selection
+
+    def to_hex(self):
+        """16 進文字列に変換（選択なしは空文字列）"""
+        if not self.mask.any():
+            return ""
+        return np.packbits(self.mask).tobytes().hex()
+
+    @property
+    def count(self):
+        return int(np.count_nonzero(self.mask))
+
+    def indices(self):
+        """選択中のタイル番号（1 始まり）の配列"""
+        return np.flatnonzero(self.mask) + 1
+
+    def contains(self, index):
+        return 1 <= index <= self.mask.size and bool(self.mask[index - 1])
+
+    def _grid(self):
+        return self.mask.reshape(self.split_y, self.split_x)
+
+    def toggle(self, index):
+        if 1 <= index <= self.mask.size:
+            self.mask[index - 1] = not self.mask[index - 1]
+
+    def select_all(self):
+        self.mask[:] = True
+
+    def clear(self):
+        self.mask[:] = False
+
+    def invert(self):
+        np.logical_not(self.mask, out=self.mask)
+
+    def select_row(self, index):
+        """index のタイルを含む行を選択"""
+        self._grid()[(index - 1) // self.split_x, :] = True
+
+    def select_column(self, index):
+        """index のタイルを含む列を選択"""
+        self._grid()[:, (index - 1) % self.split_x] = True
+
+    def select_box(self, first, second):
+        """2 つのタイルを対角とする矩形を選択"""
+        first_col, first_row = (first - 1) % self.split_x, (first - 1) // self.split_x
+        second_col, second_row = (second - 1) % self.split_x, (second - 1) // self.split_x
+        self._grid()[min(first_row, second_row):max(first_row, second_row) + 1,
+                     min(first_col, second_col):max(first_col, second_col) + 1] = True
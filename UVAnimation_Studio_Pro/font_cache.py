@@ -0,0 +1,132 @@
+# font_cache.py
+# -*- coding: utf-8 -*-
+import os
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 同時に保持するフォントの数
+DEFAULT_MAX_FONTS = 32
+# 保持するテキストマスクの数
+DEFAULT_MAX_MASKS = 256
+# フォント未指定時に最初に試すフォント
+FALLBACK_FONT = "cour.ttf"
+
+class FontCache:
+    """読み込み済みのフォントを (絶対パス, サイズ, 更新時刻) ごとに LRU で保持
+
+    フォント未指定時の代替フォント（cour.ttf か PIL の既定フォント）はセッション中に一度だけ決める
+    """
+    def __init__(self, max_fonts=DEFAULT_MAX_FONTS):
+        self.max_fonts = max_fonts
+        self._fonts = OrderedDict()  # キー -> ImageFont
+        self._failed = set()  # 読み込みに失敗したキー（同じファイルで警告を繰り返さない）
+        self._fallback_path = None  # None: 未解決, "": PIL の既定フォント
+
+    def _remember(self, key, font):
+        self._fonts[key] = font
+        while len(self._fonts) > self.max_fonts:
+            self._fonts.popitem(last=False)
+        return font
+
+    def _cached(self, key):
+        font = self._fonts.get(key)
+        if font is not None:
+            self._fonts.move_to_end(key)
+        return font
+
+    def get(self, path, size):
+        """path のフォントを size で返す。path が空か読み込めない場合は代替フォントを返す"""
+        if path:
+            path = os.path.abspath(path)
+            try:
+                key = (path, size, os.path.getmtime(path))
+            except OSError:
+                key = None
+            if key is not None and key not in self._failed:
+                font = self._cached(key)
+                if font is not None:
+                    return font
+                try:
+                    return self._remember(key, ImageFont.truetype(path, size))
+                except Exception as e:
+                    self._failed.add(key)
+                    logger.warning(f"Failed to load custom font '{path}': {str(e)}")
+        return self.fallback(size)
+
+    def fallback(self, size):
+        """代替フォントを size で返す"""
+        key = (None, size, 0)
+        font = self._cached(key)
+        if font is not None:
+            return font
+        if self._fallback_path is None:
+            try:
+                font = ImageFont.truetype(FALLBACK_FONT, size)
+                self._fallback_path = FALLBACK_FONT
+                return self._remember(key, font)
+            except Exception as e:
+                logger.warning(f"Failed to load Courier font, using the default font: {str(e)}")
+                self._fallback_path = ""
+        if self._fallback_path:
+            return self._remember(key, ImageFont.truetype(self._fallback_path, size))
+        return self._remember(key, ImageFont.load_default())
+
+    def clear(self):
+        self._fonts.clear()
+        self._failed.clear()
+        self._fallback_path = None
+
+def font_key(font):
+    """フォントを識別するキー（同じファイル・サイズの複製は同じキーになる）"""
+    return getattr(font, "path", None) or repr(getattr(font, "font", font)), getattr(font, "size", 0)
+
+class TextMaskCache:
+    """テキストを描いた L モードのマスクを (テキスト, フォント, サイズ) ごとに LRU で保持
+
+    マスクは 0..1 の float32 で行は上から。プレビューと適用、バッチ描画の各スレッドで共有する
+    """
+    def __init__(self, max_masks=DEFAULT_MAX_MASKS):
+        self.max_masks = max_masks
+        self._masks = OrderedDict()  # キー -> (マスク, textbbox)
+        self._lock = threading.Lock()
+
+    def get(self, text, font):
+        """(マスク, textbbox) を返す。textbbox は原点に描いたときのインクの範囲 (左, 上, 右, 下)"""
+        key = (text,) + font_key(font)
+        with self._lock:
+            entry = self._masks.get(key)
+            if entry is not None:
+                self._masks.move_to_end(key)
+                return entry
+        bbox = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
+        mask_img = Image.new("L", (max(1, bbox[2] - bbox[0]), max(1, bbox[3] - bbox[1])), 0)
+        ImageDraw.Draw(mask_img).text((-bbox[0], -bbox[1]), text, fill=255, font=font)
+        mask = np.asarray(mask_img, dtype=np.float32) / 255.0
+        mask.flags.writeable = False
+        entry = (mask, bbox)
+        with self._lock:
+            self._masks[key] = entry
+            while len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+
+font_cache = FontCache()
+text_mask_cache = TextMaskCache()
+
+def register():
+    pass
+
+def unregister():
+    text_mask_cache.clear()
+    font_cache.clear()
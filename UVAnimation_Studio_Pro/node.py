@@ -1,21 +1,101 @@
 # node.py
 # -*- coding: utf-8 -*-
 import bpy
+import math
 import time
 import logging
+from .core.tile_dedup import parse_remap
+from .core.sprite_pack import sprite_mapping
+from .core.tile_picker import MAX_SPLIT, DEFAULT_PAGE_SIZE, page_count, page_of, page_window
+from .utils import draw_page_controls
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 重複を取り除いたアトラスに保存する、フレーム -> タイルの対応表と分割数のカスタムプロパティ名
+FRAME_REMAP_KEY = "uvas_frame_remap"
+REMAP_SPLIT_KEY = "uvas_remap_split"
+# 透明部分を切り詰めたアトラスに保存する、フレームごとの矩形・オフセットと元のタイル寸法 (幅, 高さ, split_x, split_y)
+SPRITE_RECTS_KEY = "uvas_sprite_rects"
+SPRITE_OFFSETS_KEY = "uvas_sprite_offsets"
+SPRITE_FRAME_KEY = "uvas_sprite_frame"
+
+# 切り抜き用 Math ノードの名前（最小 u, 最大 u, 最小 v, 最大 v の順）と、切り抜かない場合の範囲
+CLIP_NODE_NAMES = ("ClipMinU", "ClipMaxU", "ClipMinV", "ClipMaxV")
+CLIP_UNBOUNDED = 1.0e6
+
 class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
     bl_label = "UVAS UV Animation Coordinates"
     bl_idname = "UVAS_UVAnimationCoordinatesNode"
 
     _updating = False
 
+    def remap_table(self):
+        """有効なフレーム -> タイルの対応表（1 始まり）。使わない場合は None"""
+        if not self.use_frame_remap or not self.frame_remap:
+            return None
+        remap = parse_remap(self.frame_remap)
+        return remap if remap.size else None
+
+    def frame_count(self):
+        """UV インデックスで選べるフレーム数（対応表があればその長さ、なければタイル数）"""
+        remap = self.remap_table()
+        return int(remap.size) if remap is not None else self.split_x * self.split_y
+
+    def sprite_params(self, index):
+        """切り詰めたアトラスなら、タイル index（0 始まり）の (Scale, Location, 切り抜き範囲) を返す。それ以外は None"""
+        if not self.image or SPRITE_RECTS_KEY not in self.image:
+            return None
+        rects = self.image[SPRITE_RECTS_KEY]
+        offsets = self.image[SPRITE_OFFSETS_KEY]
+        frame = self.image[SPRITE_FRAME_KEY]
+        if (index + 1) * 4 > len(rects):
+            return None
+        rect = tuple(rects[index * 4 + i] for i in range(4))
+        offset = (offsets[index * 2], offsets[index * 2 + 1])
+        return sprite_mapping(rect, offset, tuple(frame), tuple(self.image.size))
+
+    def page_counts(self):
+        """セル選択のページ数 (横, 縦)。対応表の使用中はフレーム番号を縦にだけページ送りする"""
+        if self.remap_table() is not None:
+            return 1, max(1, math.ceil(self.frame_count() / DEFAULT_PAGE_SIZE ** 2))
+        return page_count(self.split_x, DEFAULT_PAGE_SIZE), page_count(self.split_y, DEFAULT_PAGE_SIZE)
+
+    def follow_page(self, remap):
+        """現在の UV インデックスを含むページを表示する"""
+        if remap is not None:
+            page = (0, (self.uv_index - 1) // DEFAULT_PAGE_SIZE ** 2)
+        else:
+            page = page_of(self.uv_index, self.split_x, DEFAULT_PAGE_SIZE)
+        if (self.page_x, self.page_y) != page:
+            self.page_x, self.page_y = page
+
+    def clip_sockets(self):
+        """切り抜き範囲を入力する 4 つのソケット（キーフレーム用）"""
+        if not self.node_tree:
+            return []
+        nodes = [self.node_tree.nodes.get(name) for name in CLIP_NODE_NAMES]
+        return [node.inputs[1] for node in nodes if node]
+
+    def adopt_frame_remap(self):
+        """画像に保存された対応表と分割数を読み込む（ない画像なら対応表を外す）"""
+        remap_text = self.image.get(FRAME_REMAP_KEY, "") if self.image else ""
+        split = self.image.get(REMAP_SPLIT_KEY) if self.image else None
+        sprite_frame = self.image.get(SPRITE_FRAME_KEY) if self.image else None
+        if sprite_frame is not None:
+            # 切り詰めたアトラスは元のグリッドの分割数で再生する
+            self.split_x, self.split_y = int(sprite_frame[2]), int(sprite_frame[3])
+        elif remap_text and split is not None:
+            self.split_x, self.split_y = int(split[0]), int(split[1])
+        if remap_text != self.frame_remap:
+            self.frame_remap = remap_text
+            self.start_frame = 1
+            self.end_frame = max(1, self.frame_count())
+
     def update_node(self, context):
         """イメージプロパティ変更時のコールバック"""
+        self.adopt_frame_remap()
         if self.node_tree and self.image:
             self.setup_internal_nodes(context)
             try:
@@ -35,17 +115,30 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
                 return
             mapping = self.node_tree.nodes.get("Mapping")
             if mapping and self.split_x > 0 and self.split_y > 0:
-                max_index = self.split_x * self.split_y
+                tile_count = self.split_x * self.split_y
+                remap = self.remap_table()
+                max_index = int(remap.size) if remap is not None else tile_count
                 if self.uv_index > max_index:
                     self.uv_index = max_index
                 elif self.uv_index < 1:
                     self.uv_index = 1
-                index = max(0, min(self.uv_index - 1, max_index - 1))
-                cell_width = 1.0 / self.split_x
-                cell_height = 1.0 / self.split_y
-                x = (index % self.split_x) * cell_width
-                y = -(index // self.split_x) * cell_height
-                mapping.inputs["Location"].default_value = (x, y, 0)
+                # 対応表があれば UV インデックスはフレーム番号で、表示するタイルは表から引く
+                index = int(remap[self.uv_index - 1]) - 1 if remap is not None else self.uv_index - 1
+                index = max(0, min(index, tile_count - 1))
+                sprite = self.sprite_params(index)
+                if sprite is not None:
+                    scale, location, clip = sprite
+                else:
+                    cell_width = 1.0 / self.split_x
+                    cell_height = 1.0 / self.split_y
+                    scale = (1.0, 1.0)
+                    location = ((index % self.split_x) * cell_width, -(index // self.split_x) * cell_height)
+                    clip = (-CLIP_UNBOUNDED, CLIP_UNBOUNDED, -CLIP_UNBOUNDED, CLIP_UNBOUNDED)
+                self.follow_page(remap)
+                mapping.inputs["Scale"].default_value = (scale[0], scale[1], 1.0)
+                mapping.inputs["Location"].default_value = (location[0], location[1], 0)
+                for socket, value in zip(self.clip_sockets(), clip):
+                    socket.default_value = value
         except Exception as e:
             logger.warning(f"Error in update_mapping: {str(e)}")
         finally:
@@ -70,7 +163,7 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         """アニメーション範囲の更新"""
         if self.end_frame < self.start_frame:
             self.end_frame = self.start_frame
-        max_index = self.split_x * self.split_y
+        max_index = self.frame_count()
         if self.end_frame > max_index:
             self.end_frame = max_index
         if self.start_frame > max_index:
@@ -98,7 +191,7 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         name="Split X",
         default=1,
         min=1,
-        max=8,
+        max=MAX_SPLIT,
         update=update_mapping
     )
 
@@ -106,7 +199,7 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         name="Split Y",
         default=1,
         min=1,
-        max=8,
+        max=MAX_SPLIT,
         update=update_mapping
     )
 
@@ -117,6 +210,32 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         update=update_mapping
     )
 
+    frame_remap: bpy.props.StringProperty(
+        name="Frame Remap",
+        default="",
+        description="Tile used by each frame (1-based, comma separated), read from a deduplicated atlas",
+        update=update_mapping
+    )
+
+    use_frame_remap: bpy.props.BoolProperty(
+        name="Use Frame Remap",
+        default=True,
+        description="Play frames through the remap table of a deduplicated atlas",
+        update=update_mapping
+    )
+
+    page_x: bpy.props.IntProperty(
+        name="Page X",
+        default=0,
+        min=0
+    )
+
+    page_y: bpy.props.IntProperty(
+        name="Page Y",
+        default=0,
+        min=0
+    )
+
     show_preview: bpy.props.BoolProperty(
         name="Preview",
         default=True,
@@ -181,7 +300,7 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         if self.id_data.animation_data:
             self.id_data.animation_data_clear()
 
-        self.end_frame = max(1, self.split_x * self.split_y)
+        self.end_frame = max(1, self.frame_count())
         self.setup_internal_nodes(context)
 
     def setup_internal_nodes(self, context):
@@ -219,12 +338,51 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
             links.new(mapping.outputs["Vector"], image_tex.inputs["Vector"])
         if not any(link.to_socket.name == "Color" for link in image_tex.outputs["Color"].links):
             links.new(image_tex.outputs["Color"], output.inputs["Color"])
-        if not any(link.to_socket.name == "Alpha" for link in image_tex.outputs["Alpha"].links):
-            links.new(image_tex.outputs["Alpha"], output.inputs["Alpha"])
+        self.setup_clip_nodes(nodes, links, mapping, image_tex, output)
 
         if self.image:
             self.update_mapping(context)
 
+    def setup_clip_nodes(self, nodes, links, mapping, image_tex, output):
+        """切り詰めたスプライトの範囲外を透明にするため、アルファに範囲内判定のマスクを掛ける"""
+        separate = nodes.get("ClipSeparate") or nodes.new("ShaderNodeSeparateXYZ")
+        separate.name = "ClipSeparate"
+        if not separate.inputs[0].is_linked:
+            links.new(mapping.outputs["Vector"], separate.inputs[0])
+
+        compares = []
+        for name in CLIP_NODE_NAMES:
+            compare = nodes.get(name)
+            if compare is None:
+                compare = nodes.new("ShaderNodeMath")
+                compare.name = name
+                compare.operation = 'GREATER_THAN' if "Min" in name else 'LESS_THAN'
+                compare.inputs[1].default_value = -CLIP_UNBOUNDED if "Min" in name else CLIP_UNBOUNDED
+                links.new(separate.outputs["X" if name.endswith("U") else "Y"], compare.inputs[0])
+            compares.append(compare)
+
+        def multiply(name, first, second):
+            node = nodes.get(name)
+            if node is None:
+                node = nodes.new("ShaderNodeMath")
+                node.name = name
+                node.operation = 'MULTIPLY'
+                links.new(first, node.inputs[0])
+                links.new(second, node.inputs[1])
+            return node
+
+        mask_u = multiply("ClipMaskU", compares[0].outputs[0], compares[1].outputs[0])
+        mask_v = multiply("ClipMaskV", compares[2].outputs[0], compares[3].outputs[0])
+        mask = multiply("ClipMask", mask_u.outputs[0], mask_v.outputs[0])
+        alpha = multiply("ClipAlpha", image_tex.outputs["Alpha"], mask.outputs[0])
+
+        # 以前のバージョンで作られた、画像のアルファを直接出力するリンクを付け替える
+        for link in list(image_tex.outputs["Alpha"].links):
+            if link.to_node == output:
+                links.remove(link)
+        if not any(link.to_node == output for link in alpha.outputs[0].links):
+            links.new(alpha.outputs[0], output.inputs["Alpha"])
+
     def draw_buttons(self, context, layout):
         """ノードの UI 描画"""
         layout.template_ID(self, "image", new="image.new", open="image.open")
@@ -234,6 +392,12 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
         row.prop(self, "split_x")
         row.prop(self, "split_y")
 
+        if self.frame_remap:
+            remap = parse_remap(self.frame_remap)
+            layout.prop(self, "use_frame_remap", text=f"Remap {remap.size} Frames -> {int(remap.max()) if remap.size else 0} Tiles")
+        if self.image and SPRITE_RECTS_KEY in self.image:
+            layout.label(text=f"Trimmed sprites ({len(self.image[SPRITE_RECTS_KEY]) // 4} frames)", icon='IMAGE_RGB_ALPHA')
+
         row = layout.row(align=True)
         row.prop(self, "uv_index")
         row.operator("uvas.insert_keyframe_uv", text="", icon="KEY_HLT").node_name = self.name
@@ -272,25 +436,45 @@ class UVAS_UVAnimationCoordinatesNode(bpy.types.ShaderNodeCustomGroup):
                 if not self.image or self.split_x == 0 or self.split_y == 0:
                     layout.label(text="画像が選択されていないか、分割数が未設定です")
                 else:
-                    base_scale = 10.0
-                    scale_x = base_scale / self.split_x
-                    scale_y = base_scale / self.split_y
-
-                    grid = layout.grid_flow(
-                        row_major=True,
-                        columns=self.split_x,
-                        even_columns=True,
-                        even_rows=True,
-                        align=True
-                    )
-                    grid.scale_x = scale_x
-                    grid.scale_y = scale_y
-                    for y in range(self.split_y):
-                        for x in range(self.split_x):
-                            cell_index = y * self.split_x + x + 1
-                            op = grid.operator("uvas.set_uv_index", text=str(cell_index), depress=self.uv_index == cell_index)
+                    # 大きなグリッドでも一度に描くボタンは 1 ページ分だけにする
+                    pages_x, pages_y = self.page_counts()
+                    page_x = min(self.page_x, pages_x - 1)
+                    page_y = min(self.page_y, pages_y - 1)
+                    if pages_x > 1 or pages_y > 1:
+                        draw_page_controls(layout, page_x, pages_x, page_y, pages_y, node_name=self.name)
+
+                    if self.remap_table() is not None:
+                        # 対応表の使用中はタイルではなくフレーム番号を並べる
+                        frame_count = self.frame_count()
+                        first = page_y * DEFAULT_PAGE_SIZE ** 2 + 1
+                        last = min(frame_count, first + DEFAULT_PAGE_SIZE ** 2 - 1)
+                        columns = max(1, min(DEFAULT_PAGE_SIZE, math.ceil(math.sqrt(frame_count))))
+                        grid = layout.grid_flow(row_major=True, columns=columns, even_columns=True, even_rows=True, align=True)
+                        for frame in range(first, last + 1):
+                            op = grid.operator("uvas.set_uv_index", text=str(frame), depress=self.uv_index == frame)
                             op.node_name = self.name
-                            op.new_index = cell_index
+                            op.new_index = frame
+                    else:
+                        x0, x1, y0, y1 = page_window(self.split_x, self.split_y, page_x, page_y, DEFAULT_PAGE_SIZE)
+                        base_scale = 10.0
+                        scale_x = base_scale / (x1 - x0)
+                        scale_y = base_scale / (y1 - y0)
+
+                        grid = layout.grid_flow(
+                            row_major=True,
+                            columns=x1 - x0,
+                            even_columns=True,
+                            even_rows=True,
+                            align=True
+                        )
+                        grid.scale_x = scale_x
+                        grid.scale_y = scale_y
+                        for y in range(y0, y1):
+                            for x in range(x0, x1):
+                                cell_index = y * self.split_x + x + 1
+                                op = grid.operator("uvas.set_uv_index", text=str(cell_index), depress=self.uv_index == cell_index)
+                                op.node_name = self.name
+                                op.new_index = cell_index
 
                 layout.separator()
                 row = layout.row(align=True)
@@ -3,10 +3,39 @@
 import bpy
 import numpy as np
 import os
-import random
 from PIL import Image, ImageDraw
 from .tile.generation import UVAS_OT_SetTileIndex
 from ..utils import get_output_filepath
+from ..pixel_cache import pixel_cache
+from ..anim_metadata import anim_info_cache
+from ..pixel_io import allocate_buffer
+from ..core.atlas_gen import AtlasSpec
+from ..core.atlas_writer import write_atlas_file, available_formats
+from ..core.bitmap_font import stamp_labels
+from ..core.text_stamp import format_labels
+from ..core.tile_engine import TileGrid
+from ..core.frame_stream import frame_step, import_slot, iter_animated_frames, place_frame, run_pipeline, selected_frames
+from ..core.frame_sources import expand_frame_paths, sequence_paths, load_frame, frame_size, MovieReader
+from ..core.auto_layout import choose_layout, Resampler
+
+def get_generate_resolution(scene):
+    """テンプレート生成の解像度 (幅, 高さ) を返す（カスタム解像度が有効ならそちらを使う）"""
+    if getattr(scene, "use_custom_resolution", False):
+        return int(scene.custom_resolution_x), int(scene.custom_resolution_y)
+    return int(scene.resolution_x), int(scene.resolution_y)
+
+def _atlas_spec(scene, split_x, split_y):
+    resolution_x, resolution_y = get_generate_resolution(scene)
+    is_grid = scene.generate_mode == "GRID"
+    border_width = int(scene.border_width) if is_grid else 0
+    is_outer = scene.grid_border_type == "OUTER" if is_grid else False
+    return AtlasSpec(scene.generate_mode, resolution_x, resolution_y, split_x, split_y, border_width, is_outer)
+
+def _replace_image(name, width, height):
+    if name in bpy.data.images:
+        pixel_cache.discard(bpy.data.images[name])
+        bpy.data.images.remove(bpy.data.images[name])
+    return bpy.data.images.new(name, width=width, height=height)
 
 class UVAS_OT_GenerateFullImage(bpy.types.Operator):
     bl_idname = "uvas.generate_full_image"
@@ -17,68 +46,16 @@ class UVAS_OT_GenerateFullImage(bpy.types.Operator):
     def execute(self, context):
         scene = context.scene
         try:
-            resolution_x = int(scene.resolution_x)
-            resolution_y = int(scene.resolution_y)
-            split_x = int(scene.x_split)
-            split_y = int(scene.y_split)
-            border_width = int(scene.border_width) if scene.generate_mode == "GRID" else 0
-            is_outer = scene.grid_border_type == "OUTER" if scene.generate_mode == "GRID" else False
+            spec = _atlas_spec(scene, int(scene.x_split), int(scene.y_split))
         except Exception as e:
             self.report({'ERROR'}, f"Invalid settings: {str(e)}")
             return {'CANCELLED'}
 
-        tile_width = resolution_x // split_x
-        tile_height = resolution_y // split_y
-        full_width = resolution_x
-        full_height = resolution_y
-
-        if is_outer:
-            full_width += 2 * border_width * split_x
-            full_height += 2 * border_width * split_y
-            tile_width += 2 * border_width
-            tile_height += 2 * border_width
-
         try:
-            if "UVAS_Full_Image" in bpy.data.images:
-                bpy.data.images.remove(bpy.data.images["UVAS_Full_Image"])
-            
-            full_img = bpy.data.images.new("UVAS_Full_Image", width=full_width, height=full_height)
-            pixels = np.ones((full_height, full_width, 4), dtype=np.float32)
-
-            if scene.generate_mode == "FILL":
-                for y in range(split_y):
-                    for x in range(split_x):
-                        tile_x = x * tile_width
-                        tile_y = (split_y - 1 - y) * tile_height
-                        tile_pixels = np.ones((tile_height, tile_width, 4), dtype=np.float32)
-                        tile_pixels[:, :, 0] = random.random()
-                        tile_pixels[:, :, 1] = random.random()
-                        tile_pixels[:, :, 2] = random.random()
-                        pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = tile_pixels
-            elif scene.generate_mode == "GRID":
-                pixels[:, :, :] = 0.0
-                for y in range(split_y):
-                    for x in range(split_x):
-                        tile_x = x * tile_width
-                        tile_y = (split_y - 1 - y) * tile_height
-                        if is_outer:
-                            tile_x += border_width
-                            tile_y += border_width
-                            border_color = [1.0, 1.0, 1.0, 1.0]
-                            pixels[tile_y-border_width:tile_y+tile_height+border_width, tile_x-border_width:tile_x, :] = border_color
-                            pixels[tile_y-border_width:tile_y+tile_height+border_width, tile_x+tile_width:tile_x+tile_width+border_width, :] = border_color
-                            pixels[tile_y-border_width:tile_y, tile_x:tile_x+tile_width, :] = border_color
-                            pixels[tile_y+tile_height:tile_y+tile_height+border_width, tile_x:tile_x+tile_width, :] = border_color
-                        else:
-                            border_color = [1.0, 1.0, 1.0, 1.0]
-                            pixels[tile_y:tile_y+tile_height, tile_x:tile_x+border_width, :] = border_color
-                            pixels[tile_y:tile_y+tile_height, tile_x+tile_width-border_width:tile_x+tile_width, :] = border_color
-                            pixels[tile_y:tile_y+border_width, tile_x:tile_x+tile_width, :] = border_color
-                            pixels[tile_y+tile_height-border_width:tile_y+tile_height, tile_x:tile_x+tile_width, :] = border_color
-
-            pixels = np.flipud(pixels)
-            full_img.pixels[:] = pixels.ravel()
-            full_img.update()
+            full_img = _replace_image("UVAS_Full_Image", spec.width, spec.height)
+            # 行のストリップ単位で foreach_set 用のバッファへ直接書き込む（上下反転のコピーは不要）
+            pixels = spec.render(out=allocate_buffer(spec.width, spec.height))
+            pixel_cache.write(full_img, pixels, keep=True)
             UVAS_OT_SetTileIndex.try_generate_preview(full_img)
 
             # Set generated image as scene.image_reference for OPERATION panel
@@ -88,12 +65,77 @@ class UVAS_OT_GenerateFullImage(bpy.types.Operator):
                 if area.type == 'IMAGE_EDITOR':
                     area.spaces.active.image = full_img
 
-            self.report({'INFO'}, f"Generated full image: {full_width}x{full_height}")
+            self.report({'INFO'}, f"Generated full image: {spec.width}x{spec.height}")
             return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"Error generating full image: {str(e)}")
             return {'CANCELLED'}
 
+class UVAS_OT_GenerateNumberedGrid(bpy.types.Operator):
+    bl_idname = "uvas.generate_numbered_grid"
+    bl_label = "Generate Numbered Grid"
+    bl_description = "Generate the template image and label every tile with the stamp template using the built-in bitmap font"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        try:
+            split_x = int(scene.x_split)
+            split_y = int(scene.y_split)
+            spec = _atlas_spec(scene, split_x, split_y)
+            indices = np.arange(1, split_x * split_y + 1)
+            labels = format_labels(getattr(scene, "text_stamp_template", "{index}"), indices, split_x, indices.size)
+        except Exception as e:
+            self.report({'ERROR'}, f"Invalid settings: {str(e)}")
+            return {'CANCELLED'}
+
+        try:
+            full_img = _replace_image("UVAS_Full_Image", spec.width, spec.height)
+            pixels = spec.render(out=allocate_buffer(spec.width, spec.height))
+            # 全タイルを一度に集め、背景に応じた白か黒の文字を NumPy だけで描いて書き戻す
+            TileGrid(pixels, split_x, split_y).transform_tiles(indices, lambda block: stamp_labels(block, labels))
+            pixel_cache.write(full_img, pixels, keep=True)
+            UVAS_OT_SetTileIndex.try_generate_preview(full_img)
+
+            scene.image_reference = full_img
+
+            for area in context.screen.areas:
+                if area.type == 'IMAGE_EDITOR':
+                    area.spaces.active.image = full_img
+
+            self.report({'INFO'}, f"Generated numbered grid: {spec.width}x{spec.height}, {indices.size} labels")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Error generating numbered grid: {str(e)}")
+            return {'CANCELLED'}
+
+class UVAS_OT_GenerateFullImageToFile(bpy.types.Operator):
+    bl_idname = "uvas.generate_full_image_to_file"
+    bl_label = "Generate Full Image to File"
+    bl_description = "Stream the generated template straight to a PNG/EXR file in the output directory without creating a Blender image"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        scene = context.scene
+        file_format = getattr(scene, "generate_file_format", "PNG")
+        if file_format not in available_formats():
+            self.report({'ERROR'}, f"{file_format} output requires OpenImageIO, which is not available")
+            return {'CANCELLED'}
+        try:
+            spec = _atlas_spec(scene, int(scene.x_split), int(scene.y_split))
+        except Exception as e:
+            self.report({'ERROR'}, f"Invalid settings: {str(e)}")
+            return {'CANCELLED'}
+
+        try:
+            filepath = get_output_filepath(scene, "UVAS_Full_Image", file_format.lower())
+            write_atlas_file(spec, filepath, file_format)
+            self.report({'INFO'}, f"Wrote {spec.width}x{spec.height} template to {filepath}")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Error writing template file: {str(e)}")
+            return {'CANCELLED'}
+
 class UVAS_OT_GenerateSingleTile(bpy.types.Operator):
     bl_idname = "uvas.generate_single_tile"
     bl_label = "Generate Single Tile"
@@ -103,50 +145,15 @@ class UVAS_OT_GenerateSingleTile(bpy.types.Operator):
     def execute(self, context):
         scene = context.scene
         try:
-            resolution_x = int(scene.resolution_x)
-            resolution_y = int(scene.resolution_y)
-            border_width = int(scene.border_width) if scene.generate_mode == "GRID" else 0
-            is_outer = scene.grid_border_type == "OUTER" if scene.generate_mode == "GRID" else False
+            spec = _atlas_spec(scene, 1, 1)
         except Exception as e:
             self.report({'ERROR'}, f"Invalid settings: {str(e)}")
             return {'CANCELLED'}
 
-        tile_width = resolution_x
-        tile_height = resolution_y
-
-        if is_outer:
-            tile_width += 2 * border_width
-            tile_height += 2 * border_width
-
         try:
-            if "UVAS_Single_Tile" in bpy.data.images:
-                bpy.data.images.remove(bpy.data.images["UVAS_Single_Tile"])
-            
-            tile_img = bpy.data.images.new("UVAS_Single_Tile", width=tile_width, height=tile_height)
-            pixels = np.ones((tile_height, tile_width, 4), dtype=np.float32)
-
-            if scene.generate_mode == "FILL":
-                pixels[:, :, 0] = random.random()
-                pixels[:, :, 1] = random.random()
-                pixels[:, :, 2] = random.random()
-            elif scene.generate_mode == "GRID":
-                pixels[:, :, :] = 0.0
-                if is_outer:
-                    border_color = [1.0, 1.0, 1.0, 1.0]
-                    pixels[0:border_width, :, :] = border_color
-                    pixels[tile_height-border_width:tile_height, :, :] = border_color
-                    pixels[:, 0:border_width, :] = border_color
-                    pixels[:, tile_width-border_width:tile_width, :] = border_color
-                else:
-                    border_color = [1.0, 1.0, 1.0, 1.0]
-                    pixels[0:border_width, :, :] = border_color
-                    pixels[tile_height-border_width:tile_height, :, :] = border_color
-                    pixels[:, 0:border_width, :] = border_color
-                    pixels[:, tile_width-border_width:tile_width, :] = border_color
-
-            pixels = np.flipud(pixels)
-            tile_img.pixels[:] = pixels.ravel()
-            tile_img.update()
+            tile_img = _replace_image("UVAS_Single_Tile", spec.width, spec.height)
+            pixels = spec.render(out=allocate_buffer(spec.width, spec.height))
+            pixel_cache.write(tile_img, pixels, keep=True)
             UVAS_OT_SetTileIndex.try_generate_preview(tile_img)
 
             # Set generated image as scene.image_reference for OPERATION panel
@@ -156,12 +163,48 @@ class UVAS_OT_GenerateSingleTile(bpy.types.Operator):
                 if area.type == 'IMAGE_EDITOR':
                     area.spaces.active.image = tile_img
 
-            self.report({'INFO'}, f"Generated single tile: {tile_width}x{tile_height}")
+            self.report({'INFO'}, f"Generated single tile: {spec.width}x{spec.height}")
             return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"Error generating single tile: {str(e)}")
             return {'CANCELLED'}
 
+def plan_frame_import(scene, frame_count, width, height):
+    """取り込むフレームの並べ方を決め、(split_x, split_y, タイル幅, タイル高さ, 使うフレームの range, Resampler か None) を返す
+
+    自動レイアウトでは、間引き後の全フレームが最大サイズと VRAM 予算に収まるグリッドと縮小率を選び、
+    シーンの分割数もそれに合わせる。手動ではフレームが足りなければ ValueError
+    """
+    step = frame_step(scene.frame_reduction_ratio, scene.reduce_frames)
+    if getattr(scene, "auto_layout", False):
+        frames = selected_frames(frame_count, step)
+        layout = choose_layout(len(frames), width, height, int(scene.auto_layout_max_size),
+                               scene.auto_layout_vram_mb * 1024 * 1024)
+        scene.x_split = layout.split_x
+        scene.y_split = layout.split_y
+        resampler = Resampler(width, height, layout.tile_width, layout.tile_height) if layout.resized else None
+        return layout.split_x, layout.split_y, layout.tile_width, layout.tile_height, frames, resampler
+
+    split_x = int(scene.x_split)
+    split_y = int(scene.y_split)
+    total_tiles = split_x * split_y
+    if frame_count < total_tiles:
+        raise ValueError(f"Source has fewer frames ({frame_count}) than required tiles ({total_tiles})! Enable Auto Layout to fit the grid automatically")
+    return split_x, split_y, width, height, selected_frames(frame_count, step, limit=total_tiles), None
+
+def frame_placer(grid, resampler):
+    """パイプラインのワーカーが呼ぶ、フレームをタイルに書き込む関数（縮小が必要なら縮小しながら）"""
+    if resampler is not None:
+        return lambda slot, frame: resampler.place(grid.tile(slot), frame)
+    return lambda slot, frame: place_frame(grid.tile(slot), frame)
+
+def oversize_warning(scene, width, height):
+    """アトラスが最大テクスチャサイズを超える場合の警告文（超えなければ空）"""
+    max_size = int(getattr(scene, "auto_layout_max_size", "16384"))
+    if max(width, height) > max_size:
+        return f"Atlas {width}x{height} exceeds the {max_size}px texture limit; enable Auto Layout to downscale"
+    return ""
+
 class UVAS_OT_ImportAnimatedImageToTiles(bpy.types.Operator):
     bl_idname = "uvas.import_animated_image_to_tiles"
     bl_label = "Import Animated Image to Tiles"
@@ -179,71 +222,147 @@ class UVAS_OT_ImportAnimatedImageToTiles(bpy.types.Operator):
             self.report({'ERROR'}, "Invalid or missing file path for GIF/APNG!")
             return {'CANCELLED'}
 
+        info = anim_info_cache.get(filepath)
+        if info.error:
+            self.report({'ERROR'}, f"Error reading image info: {info.error}")
+            return {'CANCELLED'}
+        if not info.is_animated:
+            self.report({'ERROR'}, "Selected image is not an animated GIF/APNG!")
+            return {'CANCELLED'}
+
+        try:
+            split_x, split_y, tile_width, tile_height, frames, resampler = plan_frame_import(scene, info.frame_count, info.width, info.height)
+        except ValueError as e:
+            self.report({'WARNING'}, str(e))
+            return {'CANCELLED'}
+        full_width = tile_width * split_x
+        full_height = tile_height * split_y
+        step = frame_step(scene.frame_reduction_ratio, scene.reduce_frames)
+
         try:
             with Image.open(filepath) as pil_img:
-                if not hasattr(pil_img, 'is_animated') or not pil_img.is_animated:
-                    self.report({'ERROR'}, "Selected image is not an animated GIF/APNG!")
-                    return {'CANCELLED'}
+                # アトラスは一枚だけ確保し、各フレームは変換しながら上下反転した位置へ直接書き込む
+                pixels = allocate_buffer(full_width, full_height, fill=0.0)
+                grid = TileGrid(pixels, split_x, split_y)
+                # デコードは専用スレッドで順に進め、変換・縮小と配置はタイルごとにスレッドプールで並列に行う
+                decoded = iter_animated_frames(pil_img, step, limit=len(frames), frame_count=info.frame_count)
+                source = ((import_slot(position, split_x, split_y), frame) for position, (_, frame) in enumerate(decoded))
+                placed = run_pipeline(source, frame_placer(grid, resampler), workers=getattr(scene, "import_threads", 0))
+
+            full_img = _replace_image("UVAS_Animated_Tiles", full_width, full_height)
+            pixel_cache.write(full_img, pixels, keep=True)
+            UVAS_OT_SetTileIndex.try_generate_preview(full_img)
 
-                frame_count = pil_img.n_frames
-                width, height = pil_img.size
-                split_x = int(scene.x_split)
-                split_y = int(scene.y_split)
-                total_tiles = split_x * split_y
-                reduce_frames = scene.reduce_frames
-                frame_ratio = scene.frame_reduction_ratio if reduce_frames else "1/1"
-                ratio_map = {"1/2": 2, "1/4": 4, "1/8": 8, "1/1": 1}
-                frame_step = ratio_map.get(frame_ratio, 1)
-
-                if frame_count < total_tiles:
-                    self.report({'WARNING'}, f"Image has fewer frames ({frame_count}) than required tiles ({total_tiles})!")
-                    return {'CANCELLED'}
+            for area in context.screen.areas:
+                if area.type == 'IMAGE_EDITOR':
+                    area.spaces.active.image = full_img
 
-                tile_width = width
-                tile_height = height
-                full_width = width * split_x
-                full_height = height * split_y
-
-                if "UVAS_Animated_Tiles" in bpy.data.images:
-                    bpy.data.images.remove(bpy.data.images["UVAS_Animated_Tiles"])
-                
-                full_img = bpy.data.images.new("UVAS_Animated_Tiles", width=full_width, height=full_height)
-                pixels = np.zeros((full_height, full_width, 4), dtype=np.float32)
-
-                frame_index = 0
-                for y in range(split_y):
-                    for x in range(split_x):
-                        if frame_index >= frame_count:
-                            break
-                        pil_img.seek(frame_index)
-                        frame = pil_img.convert('RGBA')
-                        frame_array = np.array(frame, dtype=np.float32) / 255.0
-                        tile_x = x * tile_width
-                        tile_y = (split_y - 1 - y) * tile_height
-                        pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = frame_array
-                        frame_index += frame_step
-
-                pixels = np.flipud(pixels)
-                full_img.pixels[:] = pixels.ravel()
-                full_img.update()
-                UVAS_OT_SetTileIndex.try_generate_preview(full_img)
-
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = full_img
-
-                self.report({'INFO'}, f"Imported animated image to tiles: {full_width}x{full_height}")
-                return {'FINISHED'}
+            warning = oversize_warning(scene, full_width, full_height)
+            if warning:
+                self.report({'WARNING'}, warning)
+            self.report({'INFO'}, f"Imported {placed} frames to tiles: {full_width}x{full_height}")
+            return {'FINISHED'}
         except Exception as e:
             self.report({'ERROR'}, f"Error importing animated image: {str(e)}")
             return {'CANCELLED'}
 
+def frame_source(scene):
+    """シーンの設定から連番のファイル一覧か動画のパスを決め、(ファイルのリスト, 動画のパス) を返す"""
+    source_type = scene.frame_source_type
+    if source_type == "FILES":
+        if not scene.frame_source_path:
+            raise ValueError("No folder or glob pattern set")
+        return expand_frame_paths(bpy.path.abspath(scene.frame_source_path)), None
+    datablock = scene.frame_source_image if source_type == "IMAGE" else scene.frame_source_clip
+    if datablock is None:
+        raise ValueError("No image or movie clip selected")
+    filepath = bpy.path.abspath(datablock.filepath)
+    if datablock.source == 'MOVIE':
+        return [], filepath
+    if datablock.source == 'SEQUENCE':
+        return sequence_paths(filepath), None
+    return ([filepath] if os.path.isfile(filepath) else []), None
+
+class UVAS_OT_ImportFrameSequenceToTiles(bpy.types.Operator):
+    bl_idname = "uvas.import_frame_sequence_to_tiles"
+    bl_label = "Import Frame Sequence to Tiles"
+    bl_description = "Import a folder or glob of frames, an image sequence or a movie clip into the tile grid"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        try:
+            paths, movie_path = frame_source(scene)
+        except Exception as e:
+            self.report({'ERROR'}, f"Invalid frame source: {str(e)}")
+            return {'CANCELLED'}
+
+        workers = getattr(scene, "import_threads", 0)
+        prefetch = getattr(scene, "import_prefetch", 0)
+
+        try:
+            reader = MovieReader(movie_path) if movie_path else None
+            try:
+                frame_count = reader.frame_count if reader else len(paths)
+                if frame_count == 0:
+                    self.report({'ERROR'}, "No frames found")
+                    return {'CANCELLED'}
+                width, height = (reader.width, reader.height) if reader else frame_size(paths[0])
+                try:
+                    split_x, split_y, tile_width, tile_height, frames, resampler = plan_frame_import(scene, frame_count, width, height)
+                except ValueError as e:
+                    self.report({'WARNING'}, str(e))
+                    return {'CANCELLED'}
+
+                full_width = tile_width * split_x
+                full_height = tile_height * split_y
+                pixels = allocate_buffer(full_width, full_height, fill=0.0)
+                grid = TileGrid(pixels, split_x, split_y)
+                placer = frame_placer(grid, resampler)
+
+                if reader:
+                    # 動画は前から順にしかデコードできないため、読み込みは一本のスレッドで行い縮小と配置を並列にする
+                    source = ((import_slot(position, split_x, split_y), frame) for position, (_, frame) in enumerate(reader.iter_frames(frames)))
+                    handle = placer
+                else:
+                    # ファイルは独立して読めるので、読み込み・縮小・配置をまとめてスレッドプールで並列に行う
+                    source = ((import_slot(position, split_x, split_y), paths[index]) for position, index in enumerate(frames))
+                    handle = lambda slot, path: placer(slot, load_frame(path))
+                placed = run_pipeline(source, handle, workers=workers, queue_size=prefetch)
+            finally:
+                if reader:
+                    reader.close()
+
+            full_img = _replace_image("UVAS_Sequence_Tiles", full_width, full_height)
+            pixel_cache.write(full_img, pixels, keep=True)
+            UVAS_OT_SetTileIndex.try_generate_preview(full_img)
+            scene.image_reference = full_img
+
+            for area in context.screen.areas:
+                if area.type == 'IMAGE_EDITOR':
+                    area.spaces.active.image = full_img
+
+            warning = oversize_warning(scene, full_width, full_height)
+            if warning:
+                self.report({'WARNING'}, warning)
+            self.report({'INFO'}, f"Imported {placed} frames to tiles: {full_width}x{full_height}")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Error importing frame sequence: {str(e)}")
+            return {'CANCELLED'}
+
 def register():
     bpy.utils.register_class(UVAS_OT_GenerateFullImage)
+    bpy.utils.register_class(UVAS_OT_GenerateNumberedGrid)
+    bpy.utils.register_class(UVAS_OT_GenerateFullImageToFile)
     bpy.utils.register_class(UVAS_OT_GenerateSingleTile)
     bpy.utils.register_class(UVAS_OT_ImportAnimatedImageToTiles)
+    bpy.utils.register_class(UVAS_OT_ImportFrameSequenceToTiles)
 
 def unregister():
+    bpy.utils.unregister_class(UVAS_OT_ImportFrameSequenceToTiles)
     bpy.utils.unregister_class(UVAS_OT_ImportAnimatedImageToTiles)
     bpy.utils.unregister_class(UVAS_OT_GenerateSingleTile)
+    bpy.utils.unregister_class(UVAS_OT_GenerateFullImageToFile)
+    bpy.utils.unregister_class(UVAS_OT_GenerateNumberedGrid)
     bpy.utils.unregister_class(UVAS_OT_GenerateFullImage)
\ No newline at end of file
@@ -5,6 +5,9 @@ import numpy as np
 import os
 import logging
 from .tile.generation import UVAS_OT_SetTileIndex
+from ..pixel_cache import pixel_cache
+from ..cold_storage import cold_storage, collect_scene
+from ..core.tile_engine import TileGrid
 
 # デバッグ用ログ設定
 logging.basicConfig(level=logging.DEBUG)
@@ -21,6 +24,7 @@ class UVAS_OT_CleanUnusedImages(bpy.types.Operator):
         for img in bpy.data.images:
             if img.users == 0:
                 logger.debug(f"Removing unused image: {img.name}")
+                pixel_cache.discard(img)
                 bpy.data.images.remove(img)
                 removed_count += 1
         self.report({'INFO'}, f"Removed {removed_count} unused images.")
@@ -42,7 +46,7 @@ class UVAS_OT_ExportGeneratedImages(bpy.types.Operator):
 
         exported_count = 0
         for img in bpy.data.images:
-            if img.name.startswith(("UVAS_Full_Image", "UVAS_Single_Tile", "UVAS_Tile_", "UVAS_Patched", "UVAS_EDITED")):
+            if img.name.startswith(("UVAS_Full_Image", "UVAS_Single_Tile", "UVAS_Tile_", "UVAS_Patched", "UVAS_EDITED", "UVAS_Dedup_", "UVAS_Sprites_")):
                 base_name = img.name.replace("UVAS_", "").replace("_", "_").lower() + ".png"
                 output_path = os.path.join(output_dir, base_name)
                 counter = 1
@@ -51,6 +55,8 @@ class UVAS_OT_ExportGeneratedImages(bpy.types.Operator):
                     output_path = os.path.join(output_dir, f"{name_parts[0]}.{str(counter).zfill(3)}.png")
                     counter += 1
                 
+                # 冷蔵中の画像は 1x1 に縮んでいるため、保存前に元に戻す
+                cold_storage.ensure_resident(img)
                 img.filepath_raw = output_path
                 img.file_format = 'PNG'
                 img.save()
@@ -71,6 +77,10 @@ class UVAS_OT_SelectImage(bpy.types.Operator):
     def execute(self, context):
         if self.image_name in bpy.data.images:
             img = bpy.data.images[self.image_name]
+            thawed = cold_storage.is_cold(img)
+            cold_storage.ensure_resident(img)
+            if thawed:
+                UVAS_OT_SetTileIndex.try_generate_preview(img)
             for area in context.screen.areas:
                 if area.type == 'IMAGE_EDITOR':
                     area.spaces.active.image = img
@@ -92,6 +102,7 @@ class UVAS_OT_DeleteImage(bpy.types.Operator):
     def execute(self, context):
         if self.image_name in bpy.data.images:
             logger.debug(f"Deleting image: {self.image_name}")
+            pixel_cache.discard(bpy.data.images[self.image_name])
             bpy.data.images.remove(bpy.data.images[self.image_name])
             self.report({'INFO'}, f"Deleted image: {self.image_name}")
             logger.debug(f"Deleted image: {self.image_name}")
@@ -160,22 +171,21 @@ class UVAS_OT_NegateImage(bpy.types.Operator):
             return {'CANCELLED'}
 
         # 外部画像をメモリにコピー（非破壊性維持）
+        # ピクセルは元画像から読み込み、編集結果として一度だけ書き込む
         if ref_img.filepath and not ref_img.is_dirty:
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=width, height=height)
-            new_img.pixels[:] = ref_img.pixels[:]
-            new_img.update()
             scene.image_reference = new_img
         else:
             new_img = ref_img
 
         try:
             # ピクセルデータを取得し、RGBを反転（アルファは保持）
-            pixels = np.array(new_img.pixels[:]).reshape(height, width, 4)
+            pixels = pixel_cache.get(ref_img, copy=True, dtype=np.float32)
             pixels[:, :, :3] = 1.0 - pixels[:, :, :3]  # RGBを反転
-            new_img.pixels[:] = pixels.ravel()
-            new_img.update()
+            pixel_cache.write(new_img, pixels, keep=True, derived_from=ref_img)
             UVAS_OT_SetTileIndex.try_generate_preview(new_img)
 
             for area in context.screen.areas:
@@ -212,26 +222,25 @@ class UVAS_OT_GrayscaleImage(bpy.types.Operator):
             return {'CANCELLED'}
 
         # 外部画像をメモリにコピー（非破壊性維持）
+        # ピクセルは元画像から読み込み、編集結果として一度だけ書き込む
         if ref_img.filepath and not ref_img.is_dirty:
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=width, height=height)
-            new_img.pixels[:] = ref_img.pixels[:]
-            new_img.update()
             scene.image_reference = new_img
         else:
             new_img = ref_img
 
         try:
             # ピクセルデータを取得し、グレースケールに変換（輝度計算）
-            pixels = np.array(new_img.pixels[:]).reshape(height, width, 4)
+            pixels = pixel_cache.get(ref_img, copy=True, dtype=np.float32)
             # 輝度 = 0.299*R + 0.587*G + 0.114*B
             gray = 0.299 * pixels[:, :, 0] + 0.587 * pixels[:, :, 1] + 0.114 * pixels[:, :, 2]
             pixels[:, :, 0] = gray  # R
             pixels[:, :, 1] = gray  # G
             pixels[:, :, 2] = gray  # B
-            new_img.pixels[:] = pixels.ravel()
-            new_img.update()
+            pixel_cache.write(new_img, pixels, keep=True, derived_from=ref_img)
             UVAS_OT_SetTileIndex.try_generate_preview(new_img)
 
             for area in context.screen.areas:
@@ -268,12 +277,12 @@ class UVAS_OT_RotateImage(bpy.types.Operator):
             return {'CANCELLED'}
 
         # 外部画像をメモリにコピー（非破壊性維持）
+        # ピクセルは元画像から読み込み、編集結果として一度だけ書き込む
         if ref_img.filepath and not ref_img.is_dirty:
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=width, height=height)
-            new_img.pixels[:] = ref_img.pixels[:]
-            new_img.update()
             scene.image_reference = new_img
         else:
             new_img = ref_img
@@ -291,17 +300,20 @@ class UVAS_OT_RotateImage(bpy.types.Operator):
                 rotation_direction = "180 degrees"
 
             # ピクセルデータを取得し、画像全体を回転
-            pixels = np.array(new_img.pixels[:]).reshape(height, width, 4)
-            rotated_pixels = np.rot90(pixels, k=rotation_k)
+            pixels = pixel_cache.get(ref_img)
+            rotated_pixels = np.ascontiguousarray(np.rot90(pixels, k=rotation_k))
             new_height, new_width = rotated_pixels.shape[:2]
             
+            # 元画像が UVAS_EDITED_IMAGE 自身なら下で削除されるため、検証済みかどうかは削除前に調べておく
+            source_finite = pixel_cache.is_known_finite(ref_img)
+
             # 新しい画像サイズで更新
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=new_width, height=new_height)
-            new_img.pixels[:] = rotated_pixels.ravel()
-            new_img.update()
             scene.image_reference = new_img
+            pixel_cache.write(new_img, rotated_pixels, keep=True, source_finite=source_finite)
             UVAS_OT_SetTileIndex.try_generate_preview(new_img)
 
             for area in context.screen.areas:
@@ -338,12 +350,12 @@ class UVAS_OT_FlipImage(bpy.types.Operator):
             return {'CANCELLED'}
 
         # 外部画像をメモリにコピー（非破壊性維持）
+        # ピクセルは元画像から読み込み、編集結果として一度だけ書き込む
         if ref_img.filepath and not ref_img.is_dirty:
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=width, height=height)
-            new_img.pixels[:] = ref_img.pixels[:]
-            new_img.update()
             scene.image_reference = new_img
         else:
             new_img = ref_img
@@ -358,12 +370,11 @@ class UVAS_OT_FlipImage(bpy.types.Operator):
                 flip_description = "up to down" if scene.flip_direction == "Y_TO_-Y" else "down to up"
 
             # ピクセルデータを取得し、画像全体をフリップ
-            pixels = np.array(new_img.pixels[:]).reshape(height, width, 4)
-            flipped_pixels = np.flip(pixels, axis=axis)
+            pixels = pixel_cache.get(ref_img)
+            flipped_pixels = np.ascontiguousarray(np.flip(pixels, axis=axis))
             
             # 新しい画像で更新
-            new_img.pixels[:] = flipped_pixels.ravel()
-            new_img.update()
+            pixel_cache.write(new_img, flipped_pixels, keep=True, derived_from=ref_img)
             UVAS_OT_SetTileIndex.try_generate_preview(new_img)
 
             for area in context.screen.areas:
@@ -400,44 +411,26 @@ class UVAS_OT_MirrorImage(bpy.types.Operator):
             return {'CANCELLED'}
 
         # 外部画像をメモリにコピー（非破壊性維持）
+        # ピクセルは元画像から読み込み、編集結果として一度だけ書き込む
         if ref_img.filepath and not ref_img.is_dirty:
             if "UVAS_EDITED_IMAGE" in bpy.data.images:
+                pixel_cache.discard(bpy.data.images["UVAS_EDITED_IMAGE"])
                 bpy.data.images.remove(bpy.data.images["UVAS_EDITED_IMAGE"])
             new_img = bpy.data.images.new("UVAS_EDITED_IMAGE", width=width, height=height)
-            new_img.pixels[:] = ref_img.pixels[:]
-            new_img.update()
             scene.image_reference = new_img
         else:
             new_img = ref_img
 
         try:
             # ピクセルデータを取得
-            pixels = np.array(new_img.pixels[:]).reshape(height, width, 4)
-            new_pixels = pixels.copy()
-
-            # ミラー方向に基づく処理（中央を基準に半分をコピー）
-            mid_x = width // 2
-            mid_y = height // 2
-            if scene.mirror_direction == "LEFT_TO_RIGHT":
-                # 左半分を右にミラーコピー
-                new_pixels[:, mid_x:] = np.flip(new_pixels[:, :mid_x], axis=1)
-                mirror_description = "left to right"
-            elif scene.mirror_direction == "RIGHT_TO_LEFT":
-                # 右半分を左にミラーコピー
-                new_pixels[:, :mid_x] = np.flip(new_pixels[:, mid_x:], axis=1)
-                mirror_description = "right to left"
-            elif scene.mirror_direction == "TOP_TO_BOTTOM":
-                # 上半分を下にミラーコピー
-                new_pixels[mid_y:, :] = np.flip(new_pixels[:mid_y, :], axis=0)
-                mirror_description = "top to bottom"
-            else:  # BOTTOM_TO_TOP
-                # 下半分を上にミラーコピー
-                new_pixels[:mid_y, :] = np.flip(new_pixels[mid_y:, :], axis=0)
-                mirror_description = "bottom to top"
+            new_pixels = pixel_cache.get(ref_img, copy=True)
+
+            # ミラー方向に基づく処理（画像全体を 1 タイルとして中央を基準に半分をコピー）
+            TileGrid(new_pixels, 1, 1).mirror(1, scene.mirror_direction)
+            mirror_description = scene.mirror_direction.lower().replace("_", " ")
 
             # 新しい画像で更新
-            new_img.pixels[:] = new_pixels.ravel()
-            new_img.update()
+            pixel_cache.write(new_img, new_pixels, keep=True, derived_from=ref_img)
             UVAS_OT_SetTileIndex.try_generate_preview(new_img)
 
             for area in context.screen.areas:
@@ -452,6 +445,42 @@ class UVAS_OT_MirrorImage(bpy.types.Operator):
             logger.error(f"Error during MIRROR: {str(e)}")
             return {'CANCELLED'}
 
+class UVAS_OT_FreezeInactiveImages(bpy.types.Operator):
+    bl_idname = "uvas.freeze_inactive_images"
+    bl_label = "Freeze Inactive Images"
+    bl_description = "Compress the pixels of UVAS images that are not referenced anywhere and shrink their datablocks"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        try:
+            frozen = collect_scene(context.scene, force=True)
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to freeze images: {str(e)}")
+            logger.error(f"Failed to freeze images: {str(e)}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Moved {frozen} images to cold storage")
+        logger.debug(f"Froze {frozen} images")
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
+class UVAS_OT_ThawAllImages(bpy.types.Operator):
+    bl_idname = "uvas.thaw_all_images"
+    bl_label = "Thaw All Images"
+    bl_description = "Restore every image in cold storage to its full size"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        count = cold_storage.count
+        try:
+            cold_storage.thaw_all()
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to thaw images: {str(e)}")
+            logger.error(f"Failed to thaw images: {str(e)}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Restored {count} images from cold storage")
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
 def register():
     bpy.utils.register_class(UVAS_OT_CleanUnusedImages)
     bpy.utils.register_class(UVAS_OT_ExportGeneratedImages)
@@ -463,9 +492,13 @@ def register():
     bpy.utils.register_class(UVAS_OT_RotateImage)
     bpy.utils.register_class(UVAS_OT_FlipImage)
     bpy.utils.register_class(UVAS_OT_MirrorImage)
+    bpy.utils.register_class(UVAS_OT_FreezeInactiveImages)
+    bpy.utils.register_class(UVAS_OT_ThawAllImages)
     logger.debug("Registered management operators")
 
 def unregister():
+    bpy.utils.unregister_class(UVAS_OT_ThawAllImages)
+    bpy.utils.unregister_class(UVAS_OT_FreezeInactiveImages)
     bpy.utils.unregister_class(UVAS_OT_MirrorImage)
     bpy.utils.unregister_class(UVAS_OT_FlipImage)
     bpy.utils.unregister_class(UVAS_OT_RotateImage)
@@ -1,13 +1,22 @@
-from .generation import register as register_generation
-from .editing import register as register_editing
-from .management import register as register_management
+from .generation import register as register_generation, unregister as unregister_generation
+from .editing import register as register_editing, unregister as unregister_editing
+from .management import register as register_management, unregister as unregister_management
+from .queue import register as register_queue, unregister as unregister_queue
+from .selection import register as register_selection, unregister as unregister_selection
+from .history import register as register_history, unregister as unregister_history
 
 def register():
     register_generation()
     register_editing()
     register_management()
+    register_queue()
+    register_selection()
+    register_history()
 
 def unregister():
-    register_management()
-    register_editing()
-    register_generation()
\ No newline at end of file
+    unregister_history()
+    unregister_selection()
+    unregister_queue()
+    unregister_management()
+    unregister_editing()
+    unregister_generation()
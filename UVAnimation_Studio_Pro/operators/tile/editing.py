@@ -3,10 +3,13 @@
 import bpy
 import numpy as np
 import logging
-import os
-from PIL import Image, ImageDraw, ImageFont
-from .utils import ImageManager
+from .utils import ImageManager, render_text_tile, render_text_tiles
 from .generation import UVAS_OT_SetTileIndex
+from ...pixel_cache import pixel_cache
+from ...pixel_io import convert_pixels
+from ...core.tile_engine import TileGrid
+from ...core.tile_selection import TileSelection
+from ...core.text_stamp import format_labels
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
@@ -34,62 +37,21 @@ class UVAS_OT_ApplyMirror(bpy.types.Operator):
 
         try:
             ref_img = scene.image_reference
-            TILE_SPLIT_X = int(scene.x_split)
-            TILE_SPLIT_Y = int(scene.y_split)
-            tile_width = ref_img.size[0] // TILE_SPLIT_X
-            tile_height = ref_img.size[1] // TILE_SPLIT_Y
             if ref_img.size == (0, 0):
                 raise ValueError("Reference image has zero size")
-            expected_size = ref_img.size[0] * ref_img.size[1] * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
-                raise ValueError("Pixel data contains invalid values (NaN or Inf)")
-
-            # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-            exclude_names = [ref_img.name] if ref_img else []
-            self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
-
-            self._image_manager.edited_image_counter += 1
-            unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-            edited_img = self._image_manager.create_image(unique_name, ref_img.size[0], ref_img.size[1], pixel_array, use_fake_user=True)
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, int(scene.x_split), int(scene.y_split), record=True)
 
+            grid.mirror(index, scene.mirror_direction)
+            tile_region = grid.tile_region(index)
+            mirror_description = scene.mirror_direction.lower().replace("_", " ")
             index = index - 1
-            tile_x = (index % TILE_SPLIT_X) * tile_width
-            tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-            base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(ref_img.size[1], ref_img.size[0], 4)
-            tile_pixels = base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
-
-            mid_x = tile_width // 2
-            mid_y = tile_height // 2
-            if scene.mirror_direction == "LEFT_TO_RIGHT":
-                tile_pixels[:, mid_x:] = np.flip(tile_pixels[:, :mid_x], axis=1)
-                mirror_description = "left to right"
-            elif scene.mirror_direction == "RIGHT_TO_LEFT":
-                tile_pixels[:, :mid_x] = np.flip(tile_pixels[:, mid_x:], axis=1)
-                mirror_description = "right to left"
-            elif scene.mirror_direction == "TOP_TO_BOTTOM":
-                tile_pixels[mid_y:, :] = np.flip(tile_pixels[:mid_y, :], axis=0)
-                mirror_description = "top to bottom"
-            else:
-                tile_pixels[:mid_y, :] = np.flip(tile_pixels[mid_y:, :], axis=0)
-                mirror_description = "bottom to top"
 
-            base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = tile_pixels
-            edited_img.pixels[:] = base_pixels.ravel()
-            edited_img.update()
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=[tile_region], grid=grid, label=f"Mirror tile {index + 1}")
             UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
-
-            scene.image_reference = edited_img
             # Update reference preview
             if scene.image_reference:
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = scene.image_reference
-                        area.tag_redraw()
                 context.area.tag_redraw()
                 bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
 
@@ -128,89 +90,34 @@ class UVAS_OT_ApplyText(bpy.types.Operator):
             return {'CANCELLED'}
 
         try:
-            TILE_SPLIT_X = int(scene.x_split)
-            TILE_SPLIT_Y = int(scene.y_split)
-            TILE_RESOLUTION_X = ref_img.size[0]
-            TILE_RESOLUTION_Y = ref_img.size[1]
-            tile_width = TILE_RESOLUTION_X // TILE_SPLIT_X
-            tile_height = TILE_RESOLUTION_Y // TILE_SPLIT_Y
-            if tile_width <= 0 or tile_height <= 0:
-                raise ValueError(f"Invalid tile dimensions: {tile_width}x{tile_height}")
-            expected_size = TILE_RESOLUTION_X * TILE_RESOLUTION_Y * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-
-            # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-            exclude_names = [ref_img.name] if ref_img else []
-            self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
-
-            self._image_manager.edited_image_counter += 1
-            unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-            edited_img = self._image_manager.create_image(unique_name, TILE_RESOLUTION_X, TILE_RESOLUTION_Y, pixel_array, use_fake_user=True)
-
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, int(scene.x_split), int(scene.y_split), record=True)
+            tile_width = grid.tile_width
+            tile_height = grid.tile_height
+            tile_region = grid.tile_region(index)
+            # PIL での描画は作業精度に関わらず float32 から行う
+            tile_pixels = convert_pixels(grid.tile(index), np.float32)
             index = index - 1
-            tile_x = (index % TILE_SPLIT_X) * tile_width
-            tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-            base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(TILE_RESOLUTION_Y, TILE_RESOLUTION_X, 4)
-            tile_pixels = base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
-
-            tile_pixels_pil = np.flipud(tile_pixels)
-            tile_pixels_uint8 = (tile_pixels_pil * 255).astype(np.uint8)
-            tile_img = Image.fromarray(tile_pixels_uint8, mode='RGBA')
-            draw = ImageDraw.Draw(tile_img)
-
-            font = None
-            font_size = max(8, min(scene.text_font_size, 72))
-            if scene.text_font and os.path.exists(bpy.path.abspath(scene.text_font)):
-                font_path = bpy.path.abspath(scene.text_font)
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                except Exception as e:
-                    logger.warning(f"Failed to load custom font '{font_path}': {str(e)}")
-            
-            if font is None:
-                try:
-                    font = ImageFont.truetype("cour.ttf", font_size)
-                except Exception as e:
-                    logger.warning(f"Failed to load Courier font: {str(e)}")
-                    font = ImageFont.load_default()
 
             text = scene.text_content if scene.text_content else str(index + 1)
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            text_x = (tile_width - text_width) // 2 + scene.text_offset_x
-            text_y = (tile_height - text_height) // 2 - scene.text_offset_y
-            draw.text((text_x, text_y), text, fill=(255, 255, 255, 255), font=font)
-
-            new_tile_pixels = np.array(tile_img, dtype=np.float32) / 255.0
-            new_tile_pixels = np.flipud(new_tile_pixels)
-            base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = new_tile_pixels
+            new_tile_pixels = render_text_tile(tile_pixels, text, scene)
+            grid.patch(index + 1, convert_pixels(new_tile_pixels, base_pixels.dtype))
 
             # テキストプレビューを更新（UVAS_TEXT_PREVIEW を使用）
             preview_img_name = "UVAS_TEXT_PREVIEW"
-            exclude_names = [ref_img.name, unique_name]
+            exclude_names = [ref_img.name]
             self._image_manager.cleanup_by_prefix("UVAS_TEXT_PREVIEW_", exclude_names=exclude_names)
-            preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, new_tile_pixels.ravel())
+            preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, new_tile_pixels)
 
             scene.text_preview = preview_img
             scene.text_preview_index = index + 1
             UVAS_OT_SetTileIndex.try_generate_preview(preview_img)
 
-            edited_img.pixels[:] = base_pixels.ravel()
-            edited_img.update()
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=[tile_region], grid=grid, label=f"Text on tile {index + 1}")
             UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
-
-            scene.image_reference = edited_img
             # Update reference preview
             if scene.image_reference:
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = edited_img
-                        area.tag_redraw()
                 context.area.tag_redraw()
                 bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
 
@@ -251,23 +158,11 @@ class UVAS_OT_ApplyTextSetting(bpy.types.Operator):
                 self.report({'ERROR'}, "No reference image for text preview")
                 return {'CANCELLED'}
 
-            TILE_SPLIT_X = int(scene.x_split)
-            TILE_SPLIT_Y = int(scene.y_split)
-            tile_width = ref_img.size[0] // TILE_SPLIT_X
-            tile_height = ref_img.size[1] // TILE_SPLIT_Y
-            if tile_width <= 0 or tile_height <= 0:
-                raise ValueError(f"Invalid tile dimensions: {tile_width}x{tile_height}")
-            expected_size = ref_img.size[0] * ref_img.size[1] * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-
+            grid = TileGrid(pixel_cache.get(ref_img), int(scene.x_split), int(scene.y_split))
+            tile_width = grid.tile_width
+            tile_height = grid.tile_height
+            tile_pixels = convert_pixels(grid.tile(index), np.float32)
             index = index - 1
-            tile_x = (index % TILE_SPLIT_X) * tile_width
-            tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-            ref_pixels = pixel_array.reshape(ref_img.size[1], ref_img.size[0], 4)
-            tile_pixels = ref_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
 
             preview_img_name = "UVAS_TEXT_PREVIEW"
             exclude_names = [ref_img.name, "UVAS_EDITED_IMAGE"]
@@ -275,44 +170,14 @@ class UVAS_OT_ApplyTextSetting(bpy.types.Operator):
             # 旧形式の UVAS_TEXT_PREVIEW_{index} と既存の UVAS_TEXT_PREVIEW をクリーンアップ
             self._image_manager.cleanup_by_prefix("UVAS_TEXT_PREVIEW_", exclude_names=exclude_names)
             self._image_manager.cleanup_by_prefix("UVAS_TEXT_PREVIEW", exclude_names=exclude_names)
-            preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, tile_pixels.ravel())
+            preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, tile_pixels)
 
             scene.text_preview = preview_img
             scene.text_preview_index = index + 1
 
-            tile_pixels_pil = np.flipud(tile_pixels)
-            tile_pixels_uint8 = (tile_pixels_pil * 255).astype(np.uint8)
-            tile_img = Image.fromarray(tile_pixels_uint8, mode='RGBA')
-            draw = ImageDraw.Draw(tile_img)
-
-            font = None
-            font_size = max(8, min(scene.text_font_size, 72))
-            if scene.text_font and os.path.exists(bpy.path.abspath(scene.text_font)):
-                font_path = bpy.path.abspath(scene.text_font)
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                except Exception as e:
-                    logger.warning(f"Failed to load custom font '{font_path}': {str(e)}")
-            
-            if font is None:
-                try:
-                    font = ImageFont.truetype("cour.ttf", font_size)
-                except Exception as e:
-                    logger.warning(f"Failed to load Courier font: {str(e)}")
-                    font = ImageFont.load_default()
-
             text = scene.text_content if scene.text_content else str(index + 1)
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            text_x = (tile_width - text_width) // 2 + scene.text_offset_x
-            text_y = (tile_height - text_height) // 2 - scene.text_offset_y
-            draw.text((text_x, text_y), text, fill=(255, 255, 255, 255), font=font)
-
-            new_tile_pixels = np.array(tile_img, dtype=np.float32) / 255.0
-            new_tile_pixels = np.flipud(new_tile_pixels)
-            preview_img.pixels[:] = new_tile_pixels.ravel()
-            preview_img.update()
+            new_tile_pixels = render_text_tile(tile_pixels, text, scene)
+            pixel_cache.write(preview_img, new_tile_pixels)
             UVAS_OT_SetTileIndex.try_generate_preview(preview_img)
 
             self.report({'INFO'}, f"Generated text preview for tile index {index + 1}. Check panel for preview.")
@@ -324,12 +189,68 @@ class UVAS_OT_ApplyTextSetting(bpy.types.Operator):
             logger.error(f"Failed to generate text preview: {str(e)}, index={index + 1}")
             return {'CANCELLED'}
 
+class UVAS_OT_StampTextTiles(bpy.types.Operator):
+    bl_idname = "uvas.stamp_text_tiles"
+    bl_label = "Stamp Text on Tiles"
+    bl_description = "Draw a text template such as {index} or {row},{col} on every selected tile (or all tiles) in one edit"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        return scene.operation_mode == "TILE" and scene.tile_operation_mode == "INSERT_TEXT" and scene.image_reference is not None
+
+    def execute(self, context):
+        scene = context.scene
+        ref_img = scene.image_reference
+        if not self.poll(context):
+            self.report({'ERROR'}, "Invalid state for text stamping")
+            return {'CANCELLED'}
+
+        try:
+            split_x = int(scene.x_split)
+            split_y = int(scene.y_split)
+            if scene.text_stamp_scope == "SELECTION":
+                indices = TileSelection.from_hex(scene.tile_selection_mask, split_x, split_y).indices()
+            else:
+                indices = np.arange(1, split_x * split_y + 1)
+            if not indices.size:
+                self.report({'WARNING'}, "No tiles selected")
+                return {'CANCELLED'}
+            labels = format_labels(scene.text_stamp_template, indices, split_x, split_x * split_y)
+        except Exception as e:
+            self.report({'ERROR'}, f"Invalid text template: {str(e)}")
+            return {'CANCELLED'}
+
+        try:
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, split_x, split_y, record=True)
+            # 対象タイルを一度に集めて並列に描画し、一度で書き戻す
+            grid.transform_tiles(indices, lambda block: convert_pixels(
+                render_text_tiles(convert_pixels(block, np.float32), labels, scene), base_pixels.dtype, consume=True))
+
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=[grid.tile_region(int(i)) for i in indices], grid=grid, label=f"Text on {indices.size} tiles")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            context.area.tag_redraw()
+            bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
+
+            self.report({'INFO'}, f"Stamped text on {indices.size} tiles")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Error stamping text: {str(e)}")
+            logger.error(f"Error stamping text: {str(e)}")
+            return {'CANCELLED'}
+
 def register():
     bpy.utils.register_class(UVAS_OT_ApplyMirror)
     bpy.utils.register_class(UVAS_OT_ApplyText)
     bpy.utils.register_class(UVAS_OT_ApplyTextSetting)
+    bpy.utils.register_class(UVAS_OT_StampTextTiles)
 
 def unregister():
+    bpy.utils.unregister_class(UVAS_OT_StampTextTiles)
     bpy.utils.unregister_class(UVAS_OT_ApplyTextSetting)
     bpy.utils.unregister_class(UVAS_OT_ApplyText)
     bpy.utils.unregister_class(UVAS_OT_ApplyMirror)
\ No newline at end of file
@@ -3,12 +3,11 @@
 import bpy
 import numpy as np
 import logging
-import os
-from PIL import Image, ImageDraw, ImageFont
-import hashlib
-import random
-import time
-from .utils import ImageManager
+from .utils import ImageManager, render_text_tile
+from ...pixel_cache import pixel_cache
+from ...pixel_io import convert_pixels
+from ...core.tile_engine import TileGrid
+from ...core.tile_selection import TileSelection
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
@@ -40,12 +39,13 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
             if width <= 0 or height <= 0:
                 logger.warning(f"Invalid image dimensions: {width}x{height}")
                 return False
-            expected_size = width * height * 4
-            pixel_array = np.array(image.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                logger.error(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
+            try:
+                # 検証済みの世代であれば読み込みも走査も行わない
+                is_finite = pixel_cache.check_finite(image)
+            except ValueError as e:
+                logger.error(str(e))
                 return False
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
+            if not is_finite:
                 logger.warning("Pixel data contains invalid values (NaN or Inf)")
                 return False
             image.preview_ensure()
@@ -54,6 +54,29 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
             logger.warning(f"Preview generation failed for '{image.name if image else 'None'}': {str(e)}")
             return False
 
+    @staticmethod
+    def transform_params(scene, tile_width, tile_height):
+        """回転/反転の設定から (種類, rot90 の k または反転軸, 説明) を返す"""
+        if scene.rotate_flip_mode == "ROTATE":
+            if tile_width != tile_height:
+                return "ROTATE", 2, "rotated by 180 degrees"
+            if scene.rotate_direction == "90":
+                return "ROTATE", -1, "rotated by 90 degrees"
+            if scene.rotate_direction == "-90":
+                return "ROTATE", 1, "rotated by -90 degrees"
+            return "ROTATE", 2, "rotated by 180 degrees"
+        if scene.flip_direction in ["-X_TO_X", "X_TO_-X"]:
+            flip_description = "left to right" if scene.flip_direction == "-X_TO_X" else "right to left"
+            return "FLIP", 1, f"flipped {flip_description}"
+        flip_description = "up to down" if scene.flip_direction == "Y_TO_-Y" else "down to up"
+        return "FLIP", 0, f"flipped {flip_description}"
+
+    @staticmethod
+    def load_pixels(image, copy=False, sanitize=False):
+        """キャッシュ経由で画像の (H, W, 4) バッファを取得し、編集世代ごとに一度だけ検証。copy=True で編集用のコピーを返す"""
+        pixel_array = pixel_cache.get(image, copy=copy)
+        return pixel_cache.validate(image, pixel_array, sanitize=sanitize)
+
     def execute(self, context):
         scene = context.scene
         mode = scene.tile_operation_mode if scene.operation_mode == "TILE" else None
@@ -76,18 +99,28 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
             TILE_RESOLUTION_Y = ref_img.size[1]
             if TILE_RESOLUTION_X <= 0 or TILE_RESOLUTION_Y <= 0:
                 raise ValueError(f"Invalid image size: {TILE_RESOLUTION_X}x{TILE_RESOLUTION_Y}")
-            expected_size = TILE_RESOLUTION_X * TILE_RESOLUTION_Y * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
-                raise ValueError("Pixel data contains invalid values (NaN or Inf)")
+            # 選択だけのモードではピクセルを読み込まない
 
             tile_width = TILE_RESOLUTION_X // TILE_SPLIT_X
             tile_height = TILE_RESOLUTION_Y // TILE_SPLIT_Y
             if tile_width <= 0 or tile_height <= 0:
                 raise ValueError(f"Invalid tile dimensions: {tile_width}x{tile_height}")
 
+            # 複数選択が有効なら、クリックはビットマスクの切り替えだけを行う
+            if getattr(scene, 'multi_select', False) and mode in ["ROTATE_AND_FLIP", "MIRROR"]:
+                selection = TileSelection.from_hex(scene.tile_selection_mask, TILE_SPLIT_X, TILE_SPLIT_Y)
+                selection.toggle(self.index)
+                scene.tile_selection_mask = selection.to_hex()
+                scene.selection_anchor_index = scene.last_clicked_index
+                scene.last_clicked_index = self.index
+                self.report({'INFO'}, f"{selection.count} tiles selected")
+                context.area.tag_redraw()
+                return {'FINISHED'}
+
+            # キューが有効なら、クリックで即時適用するモードも編集を積むだけにする
+            if getattr(scene, 'queue_tile_operations', False) and mode in ["PATCH", "ROTATE_AND_FLIP"]:
+                return bpy.ops.uvas.queue_tile_operation(index=self.index)
+
             if mode == "SWAP":
                 if scene.swap_first_index == -1:
                     scene.swap_first_index = self.index
@@ -107,35 +140,22 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
                     self.report({'ERROR'}, "No tile referenced for patching!")
                     return {'CANCELLED'}
 
-                # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-                exclude_names = [ref_img.name] if ref_img else []
-                self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
-
-                self._image_manager.edited_image_counter += 1
-                unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-                edited_img = self._image_manager.create_image(unique_name, TILE_RESOLUTION_X, TILE_RESOLUTION_Y, pixel_array, use_fake_user=True)
                 tile_img = scene.tile_reference
                 if tile_img.size[0] != tile_width or tile_img.size[1] != tile_height:
                     self.report({'WARNING'}, f"Tile size mismatch: expected {tile_width}x{tile_height}, got {tile_img.size[0]}x{tile_img.size[1]}")
                     return {'CANCELLED'}
 
                 index = self.index - 1
-                tile_x = (index % TILE_SPLIT_X) * tile_width
-                tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-                base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(TILE_RESOLUTION_Y, TILE_RESOLUTION_X, 4)
-                tile_pixels = np.array(tile_img.pixels[:], dtype=np.float32).reshape(tile_height, tile_width, 4)
-                base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = tile_pixels
-                edited_img.pixels[:] = base_pixels.ravel()
-                edited_img.update()
-                UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
 
-                scene.image_reference = edited_img
+                # 読み込んだバッファを直接編集し、新しい画像へは一度だけ書き込む
+                base_pixels = self._image_manager.begin_edit(scene, ref_img)
+                grid = TileGrid(base_pixels, TILE_SPLIT_X, TILE_SPLIT_Y, record=True)
+                grid.patch(self.index, UVAS_OT_SetTileIndex.load_pixels(tile_img, sanitize=scene.sanitize_pixels))
+                tile_region = grid.tile_region(self.index)
+
+                edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=[tile_region], grid=grid, label=f"Patch tile {self.index}")
+                UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = scene.image_reference
-                        area.tag_redraw()
                 self.report({'INFO'}, f"Patched tile at index {index + 1}")
                 scene.last_clicked_index = index + 1
                 context.area.tag_redraw()
@@ -153,58 +173,21 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
                 return {'FINISHED'}
 
             elif mode == "ROTATE_AND_FLIP":
-                # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-                exclude_names = [ref_img.name] if ref_img else []
-                self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
+                index = self.index - 1
 
-                self._image_manager.edited_image_counter += 1
-                unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-                edited_img = self._image_manager.create_image(unique_name, TILE_RESOLUTION_X, TILE_RESOLUTION_Y, pixel_array, use_fake_user=True)
+                base_pixels = self._image_manager.begin_edit(scene, ref_img)
+                grid = TileGrid(base_pixels, TILE_SPLIT_X, TILE_SPLIT_Y, record=True)
+                tile_region = grid.tile_region(self.index)
 
-                index = self.index - 1
-                tile_x = (index % TILE_SPLIT_X) * tile_width
-                tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-                base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(TILE_RESOLUTION_Y, TILE_RESOLUTION_X, 4)
-                tile_pixels = base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
-
-                if scene.rotate_flip_mode == "ROTATE":
-                    if tile_width != tile_height:
-                        rotation_k = 2
-                        rotation_direction = "180 degrees"
-                    else:
-                        if scene.rotate_direction == "90":
-                            rotation_k = -1
-                            rotation_direction = "90 degrees"
-                        elif scene.rotate_direction == "-90":
-                            rotation_k = 1
-                            rotation_direction = "-90 degrees"
-                        else:
-                            rotation_k = 2
-                            rotation_direction = "180 degrees"
-                    transformed_pixels = np.rot90(tile_pixels, k=rotation_k)
-                    transform_description = f"rotated by {rotation_direction}"
+                transform, value, transform_description = UVAS_OT_SetTileIndex.transform_params(scene, tile_width, tile_height)
+                if transform == "ROTATE":
+                    grid.rotate(self.index, value)
                 else:
-                    if scene.flip_direction in ["-X_TO_X", "X_TO_-X"]:
-                        axis = 1
-                        flip_description = "left to right" if scene.flip_direction == "-X_TO_X" else "right to left"
-                    else:
-                        axis = 0
-                        flip_description = "up to down" if scene.flip_direction == "Y_TO_-Y" else "down to up"
-                    transformed_pixels = np.flip(tile_pixels, axis=axis)
-                    transform_description = f"flipped {flip_description}"
-
-                base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = transformed_pixels
-                edited_img.pixels[:] = base_pixels.ravel()
-                edited_img.update()
-                UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+                    grid.flip(self.index, value)
 
-                scene.image_reference = edited_img
+                edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=[tile_region], grid=grid, label=f"Tile {self.index} {transform_description}")
+                UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = scene.image_reference
-                        area.tag_redraw()
                 self.report({'INFO'}, f"Tile at index {index + 1} {transform_description}")
                 scene.last_clicked_index = index + 1
                 context.area.tag_redraw()
@@ -231,55 +214,22 @@ class UVAS_OT_SetTileIndex(bpy.types.Operator):
                     self.report({'INFO'}, f"Deselected tile index {self.index}")
                 else:
                     scene.last_clicked_index = self.index
-                    index = self.index - 1
-                    tile_x = (index % TILE_SPLIT_X) * tile_width
-                    tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-                    ref_pixels = pixel_array.reshape(TILE_RESOLUTION_Y, TILE_RESOLUTION_X, 4)
-                    tile_pixels = ref_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
+                    pixel_array = UVAS_OT_SetTileIndex.load_pixels(ref_img, sanitize=scene.sanitize_pixels)
+                    grid = TileGrid(pixel_array, TILE_SPLIT_X, TILE_SPLIT_Y)
+                    tile_pixels = convert_pixels(grid.tile(self.index), np.float32)
 
                     preview_img_name = "UVAS_TEXT_PREVIEW"
                     exclude_names = [ref_img.name, "UVAS_EDITED_IMAGE"]
 
                     self._image_manager.cleanup_by_prefix("UVAS_TEXT_PREVIEW_", exclude_names=exclude_names)
                     self._image_manager.cleanup_by_prefix("UVAS_TEXT_PREVIEW", exclude_names=exclude_names)
-                    preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, tile_pixels.ravel())
+                    preview_img = self._image_manager.create_image(preview_img_name, tile_width, tile_height, tile_pixels)
                     scene.text_preview = preview_img
                     scene.text_preview_index = self.index
 
-                    tile_pixels_pil = np.flipud(tile_pixels)
-                    tile_pixels_uint8 = (tile_pixels_pil * 255).astype(np.uint8)
-                    tile_img = Image.fromarray(tile_pixels_uint8, mode='RGBA')
-                    draw = ImageDraw.Draw(tile_img)
-
-                    font = None
-                    font_size = max(8, min(scene.text_font_size, 72))
-                    if scene.text_font and os.path.exists(bpy.path.abspath(scene.text_font)):
-                        font_path = bpy.path.abspath(scene.text_font)
-                        try:
-                            font = ImageFont.truetype(font_path, font_size)
-                        except Exception as e:
-                            logger.warning(f"Failed to load custom font '{font_path}': {str(e)}")
-                    
-                    if font is None:
-                        try:
-                            font = ImageFont.truetype("cour.ttf", font_size)
-                        except Exception as e:
-                            logger.warning(f"Failed to load Courier font: {str(e)}")
-                            font = ImageFont.load_default()
-
                     text = scene.text_content if scene.text_content else str(self.index)
-                    bbox = draw.textbbox((0, 0), text, font=font)
-                    text_width = bbox[2] - bbox[0]
-                    text_height = bbox[3] - bbox[1]
-                    text_x = (tile_width - text_width) // 2 + scene.text_offset_x
-                    text_y = (tile_height - text_height) // 2 - scene.text_offset_y
-                    draw.text((text_x, text_y), text, fill=(255, 255, 255, 255), font=font)
-
-                    new_tile_pixels = np.array(tile_img, dtype=np.float32) / 255.0
-                    new_tile_pixels = np.flipud(new_tile_pixels)
-                    preview_img.pixels[:] = new_tile_pixels.ravel()
-                    preview_img.update()
+                    new_tile_pixels = render_text_tile(tile_pixels, text, scene)
+                    pixel_cache.write(preview_img, new_tile_pixels)
                     UVAS_OT_SetTileIndex.try_generate_preview(preview_img)
 
                     self.report({'INFO'}, f"Selected tile index {self.index} for text insertion")
@@ -336,21 +286,12 @@ class UVAS_OT_ApplyExtract(bpy.types.Operator):
             tile_height = ref_img.size[1] // TILE_SPLIT_Y
             if ref_img.size == (0, 0):
                 raise ValueError("Reference image has zero size")
-            expected_size = ref_img.size[0] * ref_img.size[1] * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
-                raise ValueError("Pixel data contains invalid values (NaN or Inf)")
+            pixel_array = UVAS_OT_SetTileIndex.load_pixels(ref_img, sanitize=scene.sanitize_pixels)
 
+            tile_pixels = TileGrid(pixel_array, TILE_SPLIT_X, TILE_SPLIT_Y).tile(index)
             index = index - 1
-            tile_x = (index % TILE_SPLIT_X) * tile_width
-            tile_y = (TILE_SPLIT_Y - 1 - (index // TILE_SPLIT_X)) * tile_height
-
-            ref_pixels = pixel_array.reshape(ref_img.size[1], ref_img.size[0], 4)
-            tile_pixels = ref_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
 
-            cropped_img = self._image_manager.create_image(f"UVAS_Tile_{index + 1}", tile_width, tile_height, tile_pixels.ravel(), use_fake_user=True)
+            cropped_img = self._image_manager.create_image(f"UVAS_Tile_{index + 1}", tile_width, tile_height, tile_pixels, use_fake_user=True)
             cropped_img.update()
             UVAS_OT_SetTileIndex.try_generate_preview(cropped_img)
 
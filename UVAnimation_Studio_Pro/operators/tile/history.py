@@ -0,0 +1,109 @@
+# operators/tile/history.py
+# -*- coding: utf-8 -*-
+import bpy
+import logging
+from bpy.app.handlers import persistent
+from .generation import UVAS_OT_SetTileIndex
+from ...pixel_cache import pixel_cache
+from ...core.tile_history import tile_history
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def sync_history_settings(scene):
+    """シーンの履歴設定を履歴に反映"""
+    budget_mb = getattr(scene, "history_budget_mb", 256)
+    tile_history.configure(budget_mb * 1024 * 1024, getattr(scene, "history_compress", False))
+
+def _apply_history(operator, context, undo):
+    """履歴の先頭の操作を対象画像上で元に戻す/やり直す"""
+    target = tile_history.undo_target() if undo else tile_history.redo_target()
+    img = bpy.data.images.get(target)
+    if img is None:
+        tile_history.drop_target(target)
+        operator.report({'ERROR'}, f"Image '{target}' no longer exists; its history was discarded")
+        return {'CANCELLED'}
+
+    try:
+        # 対象画像のバッファを所有権ごと受け取り、変更されたタイルだけを入れ替える
+        pixels = pixel_cache.take(img)
+        label, regions = tile_history.undo(pixels) if undo else tile_history.redo(pixels)
+        pixel_cache.write(img, pixels, keep=True, derived_from=img, dirty_regions=regions)
+        if img.preview:
+            img.preview.reload()
+        UVAS_OT_SetTileIndex.try_generate_preview(img)
+
+        scene = context.scene
+        scene.image_reference = img
+        for area in context.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.spaces.active.image = img
+                area.tag_redraw()
+        operator.report({'INFO'}, f"{'Undid' if undo else 'Redid'}: {label}")
+        return {'FINISHED'}
+    except Exception as e:
+        operator.report({'ERROR'}, f"Tile history failed: {str(e)}")
+        logger.error(f"Tile history failed: {str(e)}")
+        return {'CANCELLED'}
+
+class UVAS_OT_TileUndo(bpy.types.Operator):
+    bl_idname = "uvas.tile_undo"
+    bl_label = "Undo Tile Edit"
+    bl_description = "Restore the tiles changed by the last tile operation"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return tile_history.undo_count > 0
+
+    def execute(self, context):
+        return _apply_history(self, context, undo=True)
+
+class UVAS_OT_TileRedo(bpy.types.Operator):
+    bl_idname = "uvas.tile_redo"
+    bl_label = "Redo Tile Edit"
+    bl_description = "Re-apply the last undone tile operation"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return tile_history.redo_count > 0
+
+    def execute(self, context):
+        return _apply_history(self, context, undo=False)
+
+class UVAS_OT_ClearTileHistory(bpy.types.Operator):
+    bl_idname = "uvas.clear_tile_history"
+    bl_label = "Clear Tile History"
+    bl_description = "Discard the tile undo/redo history"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        tile_history.clear()
+        self.report({'INFO'}, "Tile history cleared")
+        return {'FINISHED'}
+
+@persistent
+def _on_global_undo_or_load(*args):
+    # グローバルアンドゥやファイル読み込みで画像の内容が入れ替わるため履歴は使えない
+    tile_history.clear()
+    if bpy.context.scene:
+        sync_history_settings(bpy.context.scene)
+
+def register():
+    bpy.utils.register_class(UVAS_OT_TileUndo)
+    bpy.utils.register_class(UVAS_OT_TileRedo)
+    bpy.utils.register_class(UVAS_OT_ClearTileHistory)
+    bpy.app.handlers.undo_post.append(_on_global_undo_or_load)
+    bpy.app.handlers.redo_post.append(_on_global_undo_or_load)
+    bpy.app.handlers.load_post.append(_on_global_undo_or_load)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(_on_global_undo_or_load)
+    bpy.app.handlers.redo_post.remove(_on_global_undo_or_load)
+    bpy.app.handlers.undo_post.remove(_on_global_undo_or_load)
+    bpy.utils.unregister_class(UVAS_OT_ClearTileHistory)
+    bpy.utils.unregister_class(UVAS_OT_TileRedo)
+    bpy.utils.unregister_class(UVAS_OT_TileUndo)
+    tile_history.clear()
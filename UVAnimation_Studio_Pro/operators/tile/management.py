@@ -1,16 +1,30 @@
 # operators/tile/management.py
 # -*- coding: utf-8 -*-
 import bpy
-import numpy as np
 import logging
-import random
 from .utils import ImageManager
 from .generation import UVAS_OT_SetTileIndex
+from ...core.tile_engine import TileGrid, rect_indices, build_order
+from ...core.tile_dedup import TileDedupIndex, format_remap
+from ...core.sprite_pack import SpriteSheet
+from ...node import UVAS_UVAnimationCoordinatesNode, FRAME_REMAP_KEY, REMAP_SPLIT_KEY, SPRITE_RECTS_KEY, SPRITE_OFFSETS_KEY, SPRITE_FRAME_KEY
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def retarget_uv_nodes(old_img, new_img):
+    """old_img を再生している UV アニメーションノードを new_img に切り替え、切り替えた数を返す"""
+    retargeted = 0
+    for material in bpy.data.materials:
+        if not material.use_nodes or not material.node_tree:
+            continue
+        for node in material.node_tree.nodes:
+            if isinstance(node, UVAS_UVAnimationCoordinatesNode) and node.image == old_img:
+                node.image = new_img
+                retargeted += 1
+    return retargeted
+
 class UVAS_OT_ApplySwap(bpy.types.Operator):
     bl_idname = "uvas.apply_swap"
     bl_label = "Apply Swap"
@@ -35,56 +49,21 @@ class UVAS_OT_ApplySwap(bpy.types.Operator):
 
         try:
             ref_img = scene.image_reference
-            TILE_SPLIT_X = int(scene.x_split)
-            TILE_SPLIT_Y = int(scene.y_split)
-            tile_width = ref_img.size[0] // TILE_SPLIT_X
-            tile_height = ref_img.size[1] // TILE_SPLIT_Y
             if ref_img.size == (0, 0):
                 raise ValueError("Reference image has zero size")
-            expected_size = ref_img.size[0] * ref_img.size[1] * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
-                raise ValueError("Pixel data contains invalid values (NaN or Inf)")
-
-            # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-            exclude_names = [ref_img.name] if ref_img else []
-            self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
-
-            self._image_manager.edited_image_counter += 1
-            unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-            edited_img = self._image_manager.create_image(unique_name, ref_img.size[0], ref_img.size[1], pixel_array, use_fake_user=True)
-
-            first_index = first_index - 1
-            second_index = second_index - 1
-
-            first_tile_x = (first_index % TILE_SPLIT_X) * tile_width
-            first_tile_y = (TILE_SPLIT_Y - 1 - (first_index // TILE_SPLIT_X)) * tile_height
-            second_tile_x = (second_index % TILE_SPLIT_X) * tile_width
-            second_tile_y = (TILE_SPLIT_Y - 1 - (second_index // TILE_SPLIT_X)) * tile_height
-
-            base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(ref_img.size[1], ref_img.size[0], 4)
-            temp_pixels = base_pixels[first_tile_y:first_tile_y+tile_height, first_tile_x:first_tile_x+tile_width, :].copy()
-            base_pixels[first_tile_y:first_tile_y+tile_height, first_tile_x:first_tile_x+tile_width, :] = \
-                base_pixels[second_tile_y:second_tile_y+tile_height, second_tile_x:second_tile_x+tile_width, :]
-            base_pixels[second_tile_y:second_tile_y+tile_height, second_tile_x:second_tile_x+tile_width, :] = temp_pixels
-
-            edited_img.pixels[:] = base_pixels.ravel()
-            edited_img.update()
-            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, int(scene.x_split), int(scene.y_split), record=True)
+            grid.swap(first_index, second_index)
 
-            scene.image_reference = edited_img
+            # 検証済みのタイルを並べ替えただけなので再走査は不要
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=(), grid=grid, label=f"Swap tiles {first_index} and {second_index}")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
             if scene.image_reference:
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = scene.image_reference
-                        area.tag_redraw()
                 context.area.tag_redraw()
                 bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
 
-            self.report({'INFO'}, f"Swapped tiles between index {first_index + 1} and {second_index + 1}")
+            self.report({'INFO'}, f"Swapped tiles between index {first_index} and {second_index}")
             scene.swap_first_index = -1
             scene.swap_second_index = -1
 
@@ -118,80 +97,24 @@ class UVAS_OT_ApplyShuffle(bpy.types.Operator):
 
         try:
             ref_img = scene.image_reference
-            TILE_SPLIT_X = int(scene.x_split)
-            TILE_SPLIT_Y = int(scene.y_split)
-            tile_width = ref_img.size[0] // TILE_SPLIT_X
-            tile_height = ref_img.size[1] // TILE_SPLIT_Y
             if ref_img.size == (0, 0):
                 raise ValueError("Reference image has zero size")
-            expected_size = ref_img.size[0] * ref_img.size[1] * 4
-            pixel_array = np.array(ref_img.pixels[:], dtype=np.float32)
-            if pixel_array.size != expected_size:
-                raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {pixel_array.size}")
-            if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
-                raise ValueError("Pixel data contains invalid values (NaN or Inf)")
-
-            # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
-            exclude_names = [ref_img.name] if ref_img else []
-            self._image_manager.cleanup_edited_images(exclude_names=exclude_names)
-
-            self._image_manager.edited_image_counter += 1
-            unique_name = f"UVAS_EDITED_IMAGE_{self._image_manager.edited_image_counter}"
-            edited_img = self._image_manager.create_image(unique_name, ref_img.size[0], ref_img.size[1], pixel_array, use_fake_user=True)
-
-            first_index = first_index - 1
-            second_index = second_index - 1
-
-            # 選択範囲内の全タイルインデックスを取得
-            first_x = first_index % TILE_SPLIT_X
-            first_y = first_index // TILE_SPLIT_X
-            second_x = second_index % TILE_SPLIT_X
-            second_y = second_index // TILE_SPLIT_X
-            min_x = min(first_x, second_x)
-            max_x = max(first_x, second_x)
-            min_y = min(first_y, second_y)
-            max_y = max(first_y, second_y)
-
-            tile_indices = []
-            for y in range(min_y, max_y + 1):
-                for x in range(min_x, max_x + 1):
-                    idx = y * TILE_SPLIT_X + x
-                    if 0 <= idx < (TILE_SPLIT_X * TILE_SPLIT_Y):
-                        tile_indices.append(idx)
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            TILE_SPLIT_X = int(scene.x_split)
+            TILE_SPLIT_Y = int(scene.y_split)
 
+            # 選択範囲内の全タイルインデックスを取得し、一括で並べ替える
+            tile_indices = rect_indices(first_index, second_index, TILE_SPLIT_X, TILE_SPLIT_Y)
             logger.info(f"Shuffling {len(tile_indices)} tiles in selected range")
-            shuffled_indices = tile_indices.copy()
-            random.shuffle(shuffled_indices)
-
-            base_pixels = np.array(edited_img.pixels[:], dtype=np.float32).reshape(ref_img.size[1], ref_img.size[0], 4)
-            temp_tiles = []
-
-            # タイルデータを取得
-            for idx in tile_indices:
-                tile_x = (idx % TILE_SPLIT_X) * tile_width
-                tile_y = (TILE_SPLIT_Y - 1 - (idx // TILE_SPLIT_X)) * tile_height
-                tile_pixels = base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :].copy()
-                temp_tiles.append(tile_pixels)
-
-            # シャッフルされた順序でタイルを配置
-            for i, original_tile in enumerate(temp_tiles):
-                new_idx = shuffled_indices[i]
-                tile_x = (new_idx % TILE_SPLIT_X) * tile_width
-                tile_y = (TILE_SPLIT_Y - 1 - (new_idx // TILE_SPLIT_X)) * tile_height
-                base_pixels[tile_y:tile_y+tile_height, tile_x:tile_x+tile_width, :] = original_tile
-
-            edited_img.pixels[:] = base_pixels.ravel()
-            edited_img.update()
-            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            grid = TileGrid(base_pixels, TILE_SPLIT_X, TILE_SPLIT_Y, record=True)
+            grid.shuffle(tile_indices)
 
-            scene.image_reference = edited_img
+            # 検証済みのタイルを並べ替えただけなので再走査は不要
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=(), grid=grid, label=f"Shuffle {len(tile_indices)} tiles")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
             # Update reference preview
             if scene.image_reference:
                 UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
-                for area in context.screen.areas:
-                    if area.type == 'IMAGE_EDITOR':
-                        area.spaces.active.image = scene.image_reference
-                        area.tag_redraw()
                 context.area.tag_redraw()
                 bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
 
@@ -203,6 +126,163 @@ class UVAS_OT_ApplyShuffle(bpy.types.Operator):
             logger.error(f"Shuffle operation failed: {str(e)}")
             return {'CANCELLED'}
 
+class UVAS_OT_ReorderTiles(bpy.types.Operator):
+    bl_idname = "uvas.reorder_tiles"
+    bl_label = "Reorder Tiles"
+    bl_description = "Reorder all tiles by a permutation (reverse, transpose, interleave or a typed order)"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        return scene.operation_mode == "TILE" and scene.tile_operation_mode == "REORDER" and scene.image_reference is not None
+
+    def execute(self, context):
+        scene = context.scene
+        if not self.poll(context):
+            self.report({'ERROR'}, "Invalid state for reorder operation")
+            return {'CANCELLED'}
+
+        try:
+            ref_img = scene.image_reference
+            if ref_img.size == (0, 0):
+                raise ValueError("Reference image has zero size")
+            TILE_SPLIT_X = int(scene.x_split)
+            TILE_SPLIT_Y = int(scene.y_split)
+            order = build_order(scene.reorder_mode, TILE_SPLIT_X, TILE_SPLIT_Y, scene.reorder_custom_order)
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, TILE_SPLIT_X, TILE_SPLIT_Y, record=True)
+            moved = grid.permute(order)
+            if not moved.size:
+                self.report({'INFO'}, "Tile order unchanged")
+                return {'CANCELLED'}
+
+            # 検証済みのタイルを並べ替えただけなので再走査は不要
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=(), grid=grid, label=f"Reorder tiles ({scene.reorder_mode.lower()})")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            if scene.image_reference:
+                UVAS_OT_SetTileIndex.try_generate_preview(scene.image_reference)
+                context.area.tag_redraw()
+                bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
+
+            self.report({'INFO'}, f"Reordered {moved.size} tiles ({scene.reorder_mode.lower()})")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Reorder operation failed: {str(e)}")
+            logger.error(f"Reorder operation failed: {str(e)}")
+            return {'CANCELLED'}
+
+class UVAS_OT_DeduplicateTiles(bpy.types.Operator):
+    bl_idname = "uvas.deduplicate_tiles"
+    bl_label = "Deduplicate Tiles"
+    bl_description = "Build a compacted atlas with only unique tiles and a frame remap table for UV animation nodes"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.image_reference is not None
+
+    def execute(self, context):
+        scene = context.scene
+        ref_img = scene.image_reference
+
+        try:
+            if ref_img.size[0] <= 0 or ref_img.size[1] <= 0:
+                raise ValueError("Reference image has zero size")
+            # 読み取りのみなので、キャッシュのバッファをコピーせずに使う
+            pixels = UVAS_OT_SetTileIndex.load_pixels(ref_img, sanitize=scene.sanitize_pixels)
+            grid = TileGrid(pixels, int(scene.x_split), int(scene.y_split))
+            index = TileDedupIndex(grid, tolerance=scene.dedup_tolerance)
+            if not index.duplicate_count:
+                self.report({'INFO'}, f"No duplicate tiles found in {grid.tile_count} tiles")
+                return {'CANCELLED'}
+
+            atlas_pixels, split_x, split_y = index.build_atlas()
+            height, width = atlas_pixels.shape[:2]
+            # 検証済みのタイルを並べ直しただけなので再走査は不要
+            dedup_img = self._image_manager.create_image(f"UVAS_Dedup_{ref_img.name}", width, height, atlas_pixels, use_fake_user=True, validate=False)
+            dedup_img[FRAME_REMAP_KEY] = format_remap(index.remap)
+            dedup_img[REMAP_SPLIT_KEY] = (split_x, split_y)
+            UVAS_OT_SetTileIndex.try_generate_preview(dedup_img)
+
+            # 元のアトラスを再生しているノードを、重複を取り除いたアトラスと対応表に切り替える
+            retargeted = retarget_uv_nodes(ref_img, dedup_img)
+
+            for area in context.screen.areas:
+                if area.type == 'IMAGE_EDITOR':
+                    area.spaces.active.image = dedup_img
+            context.area.tag_redraw()
+
+            message = f"{grid.tile_count} tiles -> {index.unique_count} unique ({split_x}x{split_y} atlas)"
+            if retargeted:
+                message += f", updated {retargeted} UV animation nodes"
+            self.report({'INFO'}, message)
+            logger.info(message)
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Deduplication failed: {str(e)}")
+            logger.error(f"Deduplication failed: {str(e)}")
+            return {'CANCELLED'}
+
+class UVAS_OT_PackSprites(bpy.types.Operator):
+    bl_idname = "uvas.pack_sprites"
+    bl_label = "Pack Trimmed Sprites"
+    bl_description = "Trim the transparent border of every tile and pack the sprites into a smaller atlas with a per-frame offset table"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.image_reference is not None
+
+    def execute(self, context):
+        scene = context.scene
+        ref_img = scene.image_reference
+
+        try:
+            if ref_img.size[0] <= 0 or ref_img.size[1] <= 0:
+                raise ValueError("Reference image has zero size")
+            if SPRITE_RECTS_KEY in ref_img:
+                raise ValueError("The image is already a packed sprite atlas")
+            pixels = UVAS_OT_SetTileIndex.load_pixels(ref_img, sanitize=scene.sanitize_pixels)
+            grid = TileGrid(pixels, int(scene.x_split), int(scene.y_split))
+            sheet = SpriteSheet(grid, threshold=scene.sprite_alpha_threshold, padding=scene.sprite_padding)
+            if sheet.width * sheet.height >= sheet.source_pixels:
+                self.report({'INFO'}, "Trimming would not make the atlas smaller")
+                return {'CANCELLED'}
+
+            # 検証済みのタイルから切り出しただけなので再走査は不要
+            sprite_img = self._image_manager.create_image(f"UVAS_Sprites_{ref_img.name}", sheet.width, sheet.height, sheet.pixels, use_fake_user=True, validate=False)
+            sprite_img[SPRITE_RECTS_KEY] = [int(v) for v in sheet.rects.ravel()]
+            sprite_img[SPRITE_OFFSETS_KEY] = [int(v) for v in sheet.offsets.ravel()]
+            sprite_img[SPRITE_FRAME_KEY] = (sheet.tile_width, sheet.tile_height, sheet.split_x, sheet.split_y)
+            # 重複を取り除いたアトラスから作った場合は、フレームの対応表を引き継ぐ
+            if FRAME_REMAP_KEY in ref_img:
+                sprite_img[FRAME_REMAP_KEY] = ref_img[FRAME_REMAP_KEY]
+            UVAS_OT_SetTileIndex.try_generate_preview(sprite_img)
+
+            retargeted = retarget_uv_nodes(ref_img, sprite_img)
+            for area in context.screen.areas:
+                if area.type == 'IMAGE_EDITOR':
+                    area.spaces.active.image = sprite_img
+            context.area.tag_redraw()
+
+            message = f"Packed {grid.tile_count} sprites into {sheet.width}x{sheet.height} ({sheet.ratio:.1f}x smaller)"
+            if retargeted:
+                message += f", updated {retargeted} UV animation nodes"
+            self.report({'INFO'}, message)
+            logger.info(message)
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Sprite packing failed: {str(e)}")
+            logger.error(f"Sprite packing failed: {str(e)}")
+            return {'CANCELLED'}
+
 class UVAS_OT_ClearTextFont(bpy.types.Operator):
     bl_idname = "uvas.clear_text_font"
     bl_label = "Clear Text Font"
@@ -218,9 +298,15 @@ class UVAS_OT_ClearTextFont(bpy.types.Operator):
 def register():
     bpy.utils.register_class(UVAS_OT_ApplySwap)
     bpy.utils.register_class(UVAS_OT_ApplyShuffle)
+    bpy.utils.register_class(UVAS_OT_ReorderTiles)
+    bpy.utils.register_class(UVAS_OT_DeduplicateTiles)
+    bpy.utils.register_class(UVAS_OT_PackSprites)
     bpy.utils.register_class(UVAS_OT_ClearTextFont)
 
 def unregister():
     bpy.utils.unregister_class(UVAS_OT_ClearTextFont)
+    bpy.utils.unregister_class(UVAS_OT_PackSprites)
+    bpy.utils.unregister_class(UVAS_OT_DeduplicateTiles)
+    bpy.utils.unregister_class(UVAS_OT_ReorderTiles)
     bpy.utils.unregister_class(UVAS_OT_ApplyShuffle)
     bpy.utils.unregister_class(UVAS_OT_ApplySwap)
\ No newline at end of file
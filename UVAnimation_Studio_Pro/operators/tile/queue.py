@@ -0,0 +1,211 @@
+# operators/tile/queue.py
+# -*- coding: utf-8 -*-
+import bpy
+import numpy as np
+import logging
+from .utils import ImageManager, render_text_tile
+from .generation import UVAS_OT_SetTileIndex
+from ...pixel_io import convert_pixels
+from ...core.tile_engine import TileGrid, rect_indices, build_order, parse_order
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _reset_selection(scene):
+    """タイル選択状態をリセット"""
+    scene.swap_first_index = -1
+    scene.swap_second_index = -1
+    scene.shuffle_second_index = -1
+    scene.last_clicked_index = 0
+
+class UVAS_OT_QueueTileOperation(bpy.types.Operator):
+    bl_idname = "uvas.queue_tile_operation"
+    bl_label = "Add to Queue"
+    bl_description = "Stage the current tile operation on the selected tile(s) instead of applying it immediately"
+    bl_options = {'REGISTER'}
+
+    index: bpy.props.IntProperty(name="Tile Index", default=0, description="Tile to stage (0 uses the current selection)")
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        return scene.operation_mode == "TILE" and scene.tile_operation_mode != "EXTRACT" and scene.image_reference is not None
+
+    def execute(self, context):
+        scene = context.scene
+        mode = scene.tile_operation_mode
+        index = self.index if self.index > 0 else scene.last_clicked_index
+        ref_img = scene.image_reference
+
+        try:
+            tile_width = ref_img.size[0] // int(scene.x_split)
+            tile_height = ref_img.size[1] // int(scene.y_split)
+            if tile_width <= 0 or tile_height <= 0:
+                raise ValueError(f"Invalid tile dimensions: {tile_width}x{tile_height}")
+
+            if mode == "SWAP":
+                if scene.swap_first_index <= 0 or scene.swap_second_index <= 0:
+                    self.report({'WARNING'}, "Select two tiles for swapping")
+                    return {'CANCELLED'}
+                item = scene.tile_op_queue.add()
+                item.op_type = "SWAP"
+                item.index = scene.swap_first_index
+                item.second_index = scene.swap_second_index
+                item.label = f"Swap {item.index} <-> {item.second_index}"
+            elif mode == "SHUFFLE":
+                if scene.swap_first_index <= 0 or scene.shuffle_second_index <= 0:
+                    self.report({'WARNING'}, "Select two tiles for shuffling")
+                    return {'CANCELLED'}
+                item = scene.tile_op_queue.add()
+                item.op_type = "SHUFFLE"
+                item.index = scene.swap_first_index
+                item.second_index = scene.shuffle_second_index
+                item.label = f"Shuffle {item.index}..{item.second_index}"
+            elif mode == "REORDER":
+                order = build_order(scene.reorder_mode, int(scene.x_split), int(scene.y_split), scene.reorder_custom_order)
+                item = scene.tile_op_queue.add()
+                item.op_type = "REORDER"
+                item.text = ",".join(str(i) for i in order)
+                item.label = f"Reorder ({scene.reorder_mode.lower()})"
+            else:
+                if index <= 0:
+                    self.report({'WARNING'}, "Select a tile to queue")
+                    return {'CANCELLED'}
+                if mode == "PATCH" and not scene.tile_reference:
+                    self.report({'ERROR'}, "No tile image referenced for patching!")
+                    return {'CANCELLED'}
+                item = scene.tile_op_queue.add()
+                item.index = index
+                if mode == "ROTATE_AND_FLIP":
+                    transform, value, transform_description = UVAS_OT_SetTileIndex.transform_params(scene, tile_width, tile_height)
+                    item.op_type = transform
+                    item.value = value
+                    item.label = f"Tile {index} {transform_description}"
+                elif mode == "MIRROR":
+                    item.op_type = "MIRROR"
+                    item.direction = scene.mirror_direction
+                    item.label = f"Tile {index} mirrored {scene.mirror_direction.lower().replace('_', ' ')}"
+                elif mode == "PATCH":
+                    item.op_type = "PATCH"
+                    item.tile_image = scene.tile_reference
+                    item.label = f"Tile {index} patched from {scene.tile_reference.name}"
+                else:
+                    item.op_type = "INSERT_TEXT"
+                    item.text = scene.text_content if scene.text_content else str(index)
+                    item.label = f"Tile {index} text '{item.text}'"
+
+            _reset_selection(scene)
+            self.report({'INFO'}, f"Queued: {item.label} ({len(scene.tile_op_queue)} pending)")
+            context.area.tag_redraw()
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to queue operation: {str(e)}")
+            logger.error(f"Failed to queue operation: {str(e)}")
+            return {'CANCELLED'}
+
+class UVAS_OT_RemoveQueuedOperation(bpy.types.Operator):
+    bl_idname = "uvas.remove_queued_operation"
+    bl_label = "Remove Queued Operation"
+    bl_description = "Remove an operation from the tile operation queue"
+    bl_options = {'REGISTER'}
+
+    queue_index: bpy.props.IntProperty(name="Queue Index", default=0)
+
+    def execute(self, context):
+        scene = context.scene
+        if not 0 <= self.queue_index < len(scene.tile_op_queue):
+            self.report({'ERROR'}, f"Invalid queue index: {self.queue_index}")
+            return {'CANCELLED'}
+        scene.tile_op_queue.remove(self.queue_index)
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
+class UVAS_OT_ClearTileQueue(bpy.types.Operator):
+    bl_idname = "uvas.clear_tile_queue"
+    bl_label = "Clear Queue"
+    bl_description = "Discard all staged tile operations"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        scene = context.scene
+        count = len(scene.tile_op_queue)
+        scene.tile_op_queue.clear()
+        self.report({'INFO'}, f"Cleared {count} queued operations")
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
+class UVAS_OT_CommitTileQueue(bpy.types.Operator):
+    bl_idname = "uvas.commit_tile_queue"
+    bl_label = "Commit"
+    bl_description = "Apply all staged tile operations in order with a single image write-back"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        return scene.image_reference is not None and len(scene.tile_op_queue) > 0
+
+    def execute(self, context):
+        scene = context.scene
+        ref_img = scene.image_reference
+
+        try:
+            # 読み込み・変更・書き込みを一度ずつにし、途中で失敗しても画像には書き込まない
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, int(scene.x_split), int(scene.y_split), record=True)
+            dirty_regions = []
+
+            for item in scene.tile_op_queue:
+                if item.op_type == "ROTATE":
+                    grid.rotate(item.index, item.value)
+                elif item.op_type == "FLIP":
+                    grid.flip(item.index, item.value)
+                elif item.op_type == "MIRROR":
+                    grid.mirror(item.index, item.direction)
+                elif item.op_type == "SWAP":
+                    grid.swap(item.index, item.second_index)
+                elif item.op_type == "SHUFFLE":
+                    grid.shuffle(rect_indices(item.index, item.second_index, grid.split_x, grid.split_y))
+                elif item.op_type == "REORDER":
+                    grid.permute(parse_order(item.text, grid.tile_count))
+                elif item.op_type == "PATCH":
+                    if not item.tile_image:
+                        raise ValueError(f"Tile image for '{item.label}' no longer exists")
+                    grid.patch(item.index, UVAS_OT_SetTileIndex.load_pixels(item.tile_image, sanitize=scene.sanitize_pixels))
+                    dirty_regions.append(grid.tile_region(item.index))
+                else:
+                    # PIL での描画は作業精度に関わらず float32 から行う
+                    tile_pixels = convert_pixels(grid.tile(item.index), np.float32)
+                    grid.patch(item.index, convert_pixels(render_text_tile(tile_pixels, item.text, scene), base_pixels.dtype))
+                    dirty_regions.append(grid.tile_region(item.index))
+
+            # 並べ替え・回転は検証済みの値の移動なので、新しく書き込んだタイルだけ再検査する
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=dirty_regions, grid=grid, label=f"Commit {len(scene.tile_op_queue)} queued operations")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            context.area.tag_redraw()
+            bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
+
+            count = len(scene.tile_op_queue)
+            scene.tile_op_queue.clear()
+            _reset_selection(scene)
+            self.report({'INFO'}, f"Committed {count} queued tile operations")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Commit failed: {str(e)}")
+            logger.error(f"Commit failed: {str(e)}")
+            return {'CANCELLED'}
+
+def register():
+    bpy.utils.register_class(UVAS_OT_QueueTileOperation)
+    bpy.utils.register_class(UVAS_OT_RemoveQueuedOperation)
+    bpy.utils.register_class(UVAS_OT_ClearTileQueue)
+    bpy.utils.register_class(UVAS_OT_CommitTileQueue)
+
+def unregister():
+    bpy.utils.unregister_class(UVAS_OT_CommitTileQueue)
+    bpy.utils.unregister_class(UVAS_OT_ClearTileQueue)
+    bpy.utils.unregister_class(UVAS_OT_RemoveQueuedOperation)
+    bpy.utils.unregister_class(UVAS_OT_QueueTileOperation)
@@ -0,0 +1,160 @@
+# operators/tile/selection.py
+# -*- coding: utf-8 -*-
+import bpy
+import logging
+from .utils import ImageManager
+from .generation import UVAS_OT_SetTileIndex
+from ...core.tile_engine import TileGrid
+from ...core.tile_selection import TileSelection
+from ...core.tile_picker import page_count
+from ...node import UVAS_UVAnimationCoordinatesNode
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_selection(scene):
+    """シーンに保存された複数選択を復元"""
+    return TileSelection.from_hex(scene.tile_selection_mask, int(scene.x_split), int(scene.y_split))
+
+def set_selection(scene, selection):
+    """複数選択をシーンに保存"""
+    scene.tile_selection_mask = selection.to_hex()
+
+class UVAS_OT_SelectTiles(bpy.types.Operator):
+    bl_idname = "uvas.select_tiles"
+    bl_label = "Select Tiles"
+    bl_description = "Change the multi-tile selection"
+    bl_options = {'REGISTER'}
+
+    action: bpy.props.EnumProperty(
+        name="Action",
+        items=[
+            ("ALL", "All", "Select all tiles"),
+            ("NONE", "None", "Deselect all tiles"),
+            ("INVERT", "Invert", "Invert the selection"),
+            ("ROW", "Row", "Select the row of the last clicked tile"),
+            ("COLUMN", "Column", "Select the column of the last clicked tile"),
+            ("BOX", "Box", "Select the rectangle between the last two clicked tiles")
+        ],
+        default="ALL"
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        selection = get_selection(scene)
+        last_index = scene.last_clicked_index
+        anchor_index = scene.selection_anchor_index
+
+        if self.action in ["ROW", "COLUMN", "BOX"] and last_index <= 0:
+            self.report({'WARNING'}, "Click a tile first")
+            return {'CANCELLED'}
+
+        if self.action == "ALL":
+            selection.select_all()
+        elif self.action == "NONE":
+            selection.clear()
+        elif self.action == "INVERT":
+            selection.invert()
+        elif self.action == "ROW":
+            selection.select_row(last_index)
+        elif self.action == "COLUMN":
+            selection.select_column(last_index)
+        else:
+            selection.select_box(anchor_index if anchor_index > 0 else last_index, last_index)
+
+        set_selection(scene, selection)
+        self.report({'INFO'}, f"{selection.count} tiles selected")
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
+class UVAS_OT_ApplyToSelection(bpy.types.Operator):
+    bl_idname = "uvas.apply_to_selection"
+    bl_label = "Apply to Selection"
+    bl_description = "Apply the current rotate, flip or mirror setting to every selected tile at once"
+    bl_options = {'REGISTER'}
+
+    _image_manager = ImageManager()
+
+    @classmethod
+    def poll(cls, context):
+        scene = context.scene
+        return scene.operation_mode == "TILE" and scene.tile_operation_mode in ["ROTATE_AND_FLIP", "MIRROR"] and scene.image_reference is not None and scene.tile_selection_mask != ""
+
+    def execute(self, context):
+        scene = context.scene
+        if not self.poll(context):
+            self.report({'ERROR'}, "Invalid state for selection operation")
+            return {'CANCELLED'}
+
+        try:
+            ref_img = scene.image_reference
+            if ref_img.size == (0, 0):
+                raise ValueError("Reference image has zero size")
+            indices = get_selection(scene).indices()
+            if not indices.size:
+                self.report({'WARNING'}, "No tiles selected")
+                return {'CANCELLED'}
+
+            base_pixels = self._image_manager.begin_edit(scene, ref_img)
+            grid = TileGrid(base_pixels, int(scene.x_split), int(scene.y_split), record=True)
+            if scene.tile_operation_mode == "MIRROR":
+                grid.mirror_tiles(indices, scene.mirror_direction)
+                description = f"mirrored {scene.mirror_direction.lower().replace('_', ' ')}"
+            else:
+                transform, value, description = UVAS_OT_SetTileIndex.transform_params(scene, grid.tile_width, grid.tile_height)
+                if transform == "ROTATE":
+                    grid.rotate_tiles(indices, value)
+                else:
+                    grid.flip_tiles(indices, value)
+
+            # 検証済みのピクセルを移動しただけなので再走査は不要
+            edited_img = self._image_manager.commit_edit(context, ref_img, base_pixels, dirty_regions=(), grid=grid, label=f"{indices.size} tiles {description}")
+            UVAS_OT_SetTileIndex.try_generate_preview(edited_img)
+            context.area.tag_redraw()
+            bpy.ops.wm.redraw_timer(type='DRAW', iterations=1)
+
+            self.report({'INFO'}, f"{indices.size} tiles {description}")
+            return {'FINISHED'}
+        except Exception as e:
+            self.report({'ERROR'}, f"Selection operation failed: {str(e)}")
+            logger.error(f"Selection operation failed: {str(e)}")
+            return {'CANCELLED'}
+
+class UVAS_OT_TilePickerPage(bpy.types.Operator):
+    bl_idname = "uvas.tile_picker_page"
+    bl_label = "Change Tile Page"
+    bl_description = "Show another page of the tile picker"
+    bl_options = {'REGISTER'}
+
+    dx: bpy.props.IntProperty(name="Columns", default=0)
+    dy: bpy.props.IntProperty(name="Rows", default=0)
+    node_name: bpy.props.StringProperty(name="Node Name", default="", description="UV animation node to page instead of the scene picker")
+
+    def execute(self, context):
+        if self.node_name:
+            tree = getattr(context.space_data, "node_tree", None)
+            node = tree.nodes.get(self.node_name) if tree else None
+            if not node or not isinstance(node, UVAS_UVAnimationCoordinatesNode):
+                self.report({'ERROR'}, "Node not found or invalid")
+                return {'CANCELLED'}
+            pages_x, pages_y = node.page_counts()
+            node.page_x = min(max(0, node.page_x + self.dx), pages_x - 1)
+            node.page_y = min(max(0, node.page_y + self.dy), pages_y - 1)
+        else:
+            scene = context.scene
+            page_size = scene.tile_page_size
+            scene.tile_page_x = min(max(0, scene.tile_page_x + self.dx), page_count(int(scene.x_split), page_size) - 1)
+            scene.tile_page_y = min(max(0, scene.tile_page_y + self.dy), page_count(int(scene.y_split), page_size) - 1)
+        context.area.tag_redraw()
+        return {'FINISHED'}
+
+def register():
+    bpy.utils.register_class(UVAS_OT_SelectTiles)
+    bpy.utils.register_class(UVAS_OT_ApplyToSelection)
+    bpy.utils.register_class(UVAS_OT_TilePickerPage)
+
+def unregister():
+    bpy.utils.unregister_class(UVAS_OT_TilePickerPage)
+    bpy.utils.unregister_class(UVAS_OT_ApplyToSelection)
+    bpy.utils.unregister_class(UVAS_OT_SelectTiles)
@@ -3,19 +3,103 @@
 import bpy
 import numpy as np
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ...pixel_cache import pixel_cache
+from ...font_cache import font_cache, text_mask_cache
+from ...pixel_io import all_finite
+from ...core.tile_history import tile_history
+from ...core.bitmap_font import stamp_labels, GLYPH_HEIGHT
+from ...core.text_composite import composite_mask
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# インプレース編集の作業画像に付ける、元画像名を保持するカスタムプロパティ
+WORKING_SOURCE_KEY = "uvas_working_source"
+
+def is_working_image(img):
+    """インプレース編集用の作業画像か"""
+    return img is not None and img.get(WORKING_SOURCE_KEY) is not None
+
+def text_style(scene):
+    """シーンのフォント設定から (フォント, オフセット X, オフセット Y) を返す"""
+    font_size = max(8, min(scene.text_font_size, 72))
+    font_path = bpy.path.abspath(scene.text_font) if scene.text_font else ""
+    return font_cache.get(font_path, font_size), scene.text_offset_x, scene.text_offset_y
+
+def text_paint(scene):
+    """シーンの文字色 (R, G, B) と不透明度"""
+    return tuple(getattr(scene, "text_color", (1.0, 1.0, 1.0))), getattr(scene, "text_opacity", 1.0)
+
+def draw_text_tile(tile_pixels, text, font, offset_x=0, offset_y=0, color=(1.0, 1.0, 1.0), opacity=1.0):
+    """float32 のタイル（下の行から格納）にテキストを中央揃えで重ねた新しい配列を返す
+
+    文字はキャッシュした L モードのマスクとして一度だけ描き、float のまま合成する（量子化も上下反転のコピーもしない）
+    """
+    tile_height, tile_width = tile_pixels.shape[:2]
+    mask, bbox = text_mask_cache.get(text, font)
+    text_x = (tile_width - (bbox[2] - bbox[0])) // 2 + offset_x
+    text_y = (tile_height - (bbox[3] - bbox[1])) // 2 - offset_y
+    result = np.array(tile_pixels, dtype=np.float32)
+    return composite_mask(result, mask, text_x + bbox[0], text_y + bbox[1], color, opacity)
+
+def uses_bitmap_font(scene):
+    """TrueType フォントが指定されていなければ、PIL を通さず内蔵のビットマップフォントで描く"""
+    return not scene.text_font
+
+def bitmap_text_tiles(tiles, texts, scene):
+    """内蔵のビットマップフォントで (n, tile_h, tile_w, 4) のタイル群に文字を描いた新しい配列を返す"""
+    scale = max(1, round(max(8, min(scene.text_font_size, 72)) / GLYPH_HEIGHT))
+    color, opacity = text_paint(scene)
+    return stamp_labels(np.array(tiles, dtype=np.float32), list(texts), color=color, opacity=opacity,
+                        scale=scale, offset=(scene.text_offset_x, scene.text_offset_y))
+
+def render_text_tile(tile_pixels, text, scene):
+    """float32 のタイル（下の行から格納）にシーンのフォント設定でテキストを描画した新しい配列を返す"""
+    if uses_bitmap_font(scene):
+        return bitmap_text_tiles(tile_pixels[None], [text], scene)[0]
+    font, offset_x, offset_y = text_style(scene)
+    return draw_text_tile(tile_pixels, text, font, offset_x, offset_y, *text_paint(scene))
+
+def render_text_tiles(tiles, texts, scene, max_workers=None):
+    """(n, tile_h, tile_w, 4) の float32 タイル群に texts をそれぞれ描画し、同じ形の新しい配列を返す
+
+    PIL はマスクの描画中に GIL を解放するため、スレッドプールでタイルごとに並列に描く。
+    FreeType のフォントはスレッド間で共有できないので、スレッドごとに複製を使う
+    """
+    if uses_bitmap_font(scene):
+        return bitmap_text_tiles(tiles, texts, scene)
+    font, offset_x, offset_y = text_style(scene)
+    color, opacity = text_paint(scene)
+    local = threading.local()
+
+    def worker_font():
+        if not hasattr(local, "font"):
+            variant = getattr(font, "font_variant", None)
+            local.font = variant() if variant is not None else font
+        return local.font
+
+    def render(i):
+        return draw_text_tile(tiles[i], texts[i], worker_font(), offset_x, offset_y, color, opacity)
+
+    result = np.empty(tiles.shape, dtype=np.float32)
+    workers = max_workers or min(len(texts), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for i, tile in enumerate(pool.map(render, range(len(texts)))):
+            result[i] = tile
+    return result
+
 class ImageManager:
     """UVAS_Full_Image, UVAS_EDITED_IMAGE, UVAS_TEXT_PREVIEW のライフサイクルを管理"""
     def __init__(self):
         self.images = {}  # 名前 -> bpy.types.Image のマッピング
         self.edited_image_counter = 0  # 編集済み画像のカウンター
 
-    def create_image(self, name, width, height, pixels=None, use_fake_user=False):
-        """新しい画像を作成し、既存の同名画像を安全に削除"""
+    def create_image(self, name, width, height, pixels=None, use_fake_user=False, validate=True):
+        """新しい画像を作成し、既存の同名画像を安全に削除（検証済みのバッファは validate=False で再走査を省略）"""
         try:
             if name in bpy.data.images:
                 img_to_remove = bpy.data.images[name]
@@ -23,6 +107,7 @@ class ImageManager:
                     if scene.get('image_reference') and scene.image_reference == img_to_remove:
                         logger.warning(f"Image '{name}' is referenced by scene.image_reference, skipping removal")
                         return img_to_remove
+                pixel_cache.discard(img_to_remove)
                 bpy.data.images.remove(img_to_remove)
 
             img = bpy.data.images.new(name, width=width, height=height)
@@ -31,14 +116,15 @@ class ImageManager:
 
             expected_size = width * height * 4
             if pixels is not None:
-                pixel_array = np.array(pixels, copy=True, dtype=np.float32)
+                # 呼び出し元のバッファをそのまま渡す（作業精度からの変換は書き込み時のみ）
+                pixel_array = np.asarray(pixels)
                 if pixel_array.size != expected_size:
                     raise ValueError(f"Pixel data size mismatch: expected {expected_size}, got {pixel_array.size}")
-                if np.any(np.isnan(pixel_array)) or np.any(np.isinf(pixel_array)):
+                if validate and not all_finite(pixel_array):
                     raise ValueError("Pixel data contains invalid values (NaN or Inf)")
-                img.pixels[:] = pixel_array.ravel()
+                pixel_cache.write(img, pixel_array, update=False)
             else:
-                img.pixels[:] = np.zeros(expected_size, dtype=np.float32)
+                pixel_cache.write(img, np.zeros(expected_size, dtype=np.float32), update=False)
 
             img.update()
             self.images[name] = img
@@ -47,15 +133,72 @@ class ImageManager:
             logger.error(f"Error creating image '{name}': {str(e)}")
             raise
 
+    def get_working_image(self, ref_img):
+        """ref_img に対応する既存の作業画像を返す（なければ None）"""
+        if is_working_image(ref_img):
+            return ref_img
+        img = bpy.data.images.get(f"UVAS_WORKING_{ref_img.name}")
+        if img is not None and img.get(WORKING_SOURCE_KEY) == ref_img.name and tuple(img.size) == tuple(ref_img.size):
+            return img
+        return None
+
+    def begin_edit(self, scene, ref_img):
+        """編集用の (H, W, 4) バッファを返す
+
+        インプレース編集で ref_img が作業画像なら、キャッシュのバッファを所有権ごと受け取り複製しない。
+        それ以外はキャッシュのコピーを一つだけ作る（どちらも全体サイズの追加バッファは高々一つ）
+        """
+        if getattr(scene, 'edit_in_place', False) and is_working_image(ref_img):
+            pixels = pixel_cache.take(ref_img)
+        else:
+            pixels = pixel_cache.get(ref_img, copy=True)
+        return pixel_cache.validate(ref_img, pixels, sanitize=getattr(scene, 'sanitize_pixels', False))
+
+    def commit_edit(self, context, ref_img, pixels, dirty_regions=(), grid=None, label=""):
+        """begin_edit で得たバッファを書き込み、参照画像を結果に切り替えて返す
+
+        インプレース編集では元画像ごとに一つの作業画像を使い回し、新しいデータブロックを作らない。
+        grid が変更前のタイルを記録していれば、それをタイル単位の履歴に積む
+        """
+        scene = context.scene
+        width, height = ref_img.size
+        if getattr(scene, 'edit_in_place', False):
+            edited_img = self.get_working_image(ref_img)
+            if edited_img is not None:
+                pixel_cache.write(edited_img, pixels, keep=True, derived_from=ref_img, dirty_regions=dirty_regions)
+                if edited_img.preview:
+                    edited_img.preview.reload()
+            else:
+                edited_img = self.create_image(f"UVAS_WORKING_{ref_img.name}", width, height, pixels, use_fake_user=True, validate=False)
+                edited_img[WORKING_SOURCE_KEY] = ref_img.name
+                pixel_cache.store(edited_img, pixels, derived_from=ref_img, dirty_regions=dirty_regions)
+        else:
+            # 古いUVAS_EDITED_IMAGE_*をクリーンアップ（現在のimage_referenceを除外）
+            self.cleanup_edited_images(exclude_names=[ref_img.name])
+            self.edited_image_counter += 1
+            unique_name = f"UVAS_EDITED_IMAGE_{self.edited_image_counter}"
+            edited_img = self.create_image(unique_name, width, height, pixels, use_fake_user=True, validate=False)
+            pixel_cache.store(edited_img, pixels, derived_from=ref_img, dirty_regions=dirty_regions)
+
+        if grid is not None:
+            tile_history.push(edited_img.name, grid.touched_tiles(), edited_img.size, label=label, source=ref_img.name)
+
+        scene.image_reference = edited_img
+        for area in context.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.spaces.active.image = edited_img
+                area.tag_redraw()
+        return edited_img
+
     def get_image(self, name):
         """指定された名前の画像を取得、存在しない場合は None を返す"""
         img = self.images.get(name)
         if img and name in bpy.data.images:
             try:
                 expected_size = img.size[0] * img.size[1] * 4
-                pixel_array = img.pixels[:]
-                if len(pixel_array) != expected_size:
-                    logger.warning(f"Image '{name}' has invalid pixel data size: expected {expected_size}, got {len(pixel_array)}")
+                actual_size = len(img.pixels)
+                if actual_size != expected_size:
+                    logger.warning(f"Image '{name}' has invalid pixel data size: expected {expected_size}, got {actual_size}")
                     return None
                 return img
             except Exception:
@@ -73,6 +216,7 @@ class ImageManager:
                 try:
                     if name in bpy.data.images:
                         img = self.images[name]
+                        pixel_cache.discard(img)
                         bpy.data.images.remove(img)
                         del self.images[name]
                     else:
@@ -90,6 +234,7 @@ class ImageManager:
                 try:
                     if name in bpy.data.images:
                         img = self.images[name]
+                        pixel_cache.discard(img)
                         bpy.data.images.remove(img)
                         del self.images[name]
                     else:
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 import bpy
 import time
-from ..node import UVAS_UVAnimationCoordinatesNode
+from ..node import UVAS_UVAnimationCoordinatesNode, SPRITE_RECTS_KEY
 from ..utils import ensure_animation_data
 
 class UVAS_OT_UVAnimPlay(bpy.types.Operator):
@@ -120,6 +120,17 @@ class UVAS_OT_InsertKeyframeUV(bpy.types.Operator):
                         kf.handle_left_type = kf.handle_right_type = "VECTOR"
                     break
 
+        # 切り詰めたスプライトはフレームごとに切り抜き範囲も変わるため、段階補間でキーを打つ
+        if node.image and SPRITE_RECTS_KEY in node.image:
+            for socket in node.clip_sockets():
+                socket.keyframe_insert(data_path="default_value", frame=frame)
+                fcurve = fcurves.find(f'nodes["{socket.node.name}"].inputs[1].default_value')
+                if fcurve:
+                    for kf in fcurve.keyframe_points:
+                        if kf.co.x == frame:
+                            kf.interpolation = "CONSTANT"
+                            break
+
         context.area.tag_redraw()
         return {'FINISHED'}
 
@@ -150,6 +161,11 @@ class UVAS_OT_DeleteKeyframeUV(bpy.types.Operator):
         frame = context.scene.frame_current
         success_x = mapping.inputs["Location"].keyframe_delete(data_path="default_value", index=0, frame=frame)
         success_y = mapping.inputs["Location"].keyframe_delete(data_path="default_value", index=1, frame=frame)
+        for socket in node.clip_sockets():
+            try:
+                socket.keyframe_delete(data_path="default_value", frame=frame)
+            except RuntimeError:
+                pass
 
         bpy.context.view_layer.update()
         for area in context.screen.areas:
@@ -200,8 +216,7 @@ class UVAS_OT_SetUVIndex(bpy.types.Operator):
         if not node or not isinstance(node, UVAS_UVAnimationCoordinatesNode):
             self.report({'ERROR'}, "Node not found or invalid")
             return {'CANCELLED'}
-        max_index = node.split_x * node.split_y
-        node.uv_index = min(max(1, self.new_index), max_index)
+        node.uv_index = min(max(1, self.new_index), node.frame_count())
         return {'FINISHED'}
 
 class UVAS_OT_ReplaceWithUVAnim(bpy.types.Operator):
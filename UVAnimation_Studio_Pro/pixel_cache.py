@@ -0,0 +1,277 @@
+# pixel_cache.py
+# -*- coding: utf-8 -*-
+import bpy
+import logging
+from collections import OrderedDict
+from bpy.app.handlers import persistent
+import numpy as np
+from .pixel_io import read_pixels, write_pixels, convert_pixels, all_finite, sanitize_pixels, WORKING_DTYPES
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# キャッシュ全体で保持するピクセルバッファの上限（バイト）
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+def image_key(img):
+    """セッション内で画像を一意に識別するキーを返す"""
+    session_uid = getattr(img, "session_uid", None)
+    return session_uid if session_uid is not None else img.name_full
+
+class _CacheEntry:
+    """デコード済みバッファと、それが有効な編集世代の組"""
+    __slots__ = ("generation", "size", "filepath", "pixels", "self_written")
+
+    def __init__(self, generation, size, filepath, pixels, self_written):
+        self.generation = generation
+        self.size = size
+        self.filepath = filepath
+        self.pixels = pixels
+        self.self_written = self_written
+
+class PixelCache:
+    """画像ごとのデコード済みバッファを作業精度・編集世代付きで保持"""
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, working_dtype=np.float32):
+        self.max_bytes = max_bytes
+        self.working_dtype = np.dtype(working_dtype)
+        self._entries = OrderedDict()  # キー -> _CacheEntry（LRU 順）
+        self._generations = {}  # キー -> 編集カウンター
+        self._finite = {}  # キー -> NaN/Inf を含まないと確認済みの編集世代
+        self._bytes = 0
+        # 読み書きの直前と破棄の際に呼ぶ関数（冷蔵中の画像を扱うために cold_storage が設定する）
+        self.access_hook = None
+        self.discard_hook = None
+
+    def _accessed(self, img):
+        if self.access_hook is not None:
+            self.access_hook(img)
+
+    def generation(self, img):
+        """画像の現在の編集世代を返す"""
+        return self._generations.get(image_key(img), 0)
+
+    def bump(self, img):
+        """編集カウンターを進め、既存のバッファを無効化"""
+        key = image_key(img)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._drop(key)
+        return self._generations[key]
+
+    def set_working_dtype(self, dtype):
+        """作業精度を切り替え、異なる精度で保持しているバッファを破棄"""
+        dtype = np.dtype(dtype)
+        if dtype == self.working_dtype:
+            return
+        self.working_dtype = dtype
+        self._entries.clear()
+        self._bytes = 0
+
+    def get(self, img, copy=False, dtype=None):
+        """画像のバッファを作業精度で返す。最新世代がキャッシュされていれば読み込みを省略
+
+        dtype を指定した場合は、その精度に変換したコピーを返す
+        """
+        self._accessed(img)
+        key = image_key(img)
+        entry = self._entries.get(key)
+        if entry is not None and self._is_current(key, entry, img):
+            self._entries.move_to_end(key)
+            pixels = entry.pixels
+        else:
+            # float32 の読み込みバッファは変換後に不要になるため作業領域として使う
+            pixels = convert_pixels(read_pixels(img), self.working_dtype, consume=True)
+            self._put(key, img, pixels, self_written=False)
+
+        if dtype is not None and np.dtype(dtype) != pixels.dtype:
+            return convert_pixels(pixels, dtype)
+        # キャッシュ内のバッファは読み取り専用のため、編集用にはコピーを返す
+        return pixels.copy() if copy else pixels
+
+    def take(self, img):
+        """最新世代のバッファを所有権ごと取り出す（書き込み可能。キャッシュからは外れるため、途中で失敗しても次回は画像から読み直す）"""
+        self._accessed(img)
+        key = image_key(img)
+        entry = self._entries.get(key)
+        if entry is None or not self._is_current(key, entry, img):
+            return convert_pixels(read_pixels(img), self.working_dtype, consume=True)
+        self._drop(key)
+        pixels = entry.pixels
+        try:
+            pixels.flags.writeable = True
+        except ValueError:
+            pixels = pixels.copy()
+        return pixels
+
+    def store(self, img, pixels, derived_from=None, dirty_regions=None, source_finite=None):
+        """自前で書き込んだ内容をバッファの所有権ごと登録（世代を進める）
+
+        derived_from の画像が検証済みなら、dirty_regions（書き込んだ領域のスライス）だけを再検査する
+        元画像を書き込み前に削除する場合は、削除前に調べた is_known_finite の結果を source_finite で渡す
+        """
+        if source_finite is None:
+            source_finite = derived_from is not None and self.is_known_finite(derived_from)
+        key = image_key(img)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._put(key, img, pixels, self_written=True)
+        if source_finite and all(all_finite(pixels[region]) for region in (dirty_regions or ())):
+            self._finite[key] = self._generations[key]
+
+    def write(self, img, pixels, keep=False, update=True, derived_from=None, dirty_regions=None, source_finite=None):
+        """画像に書き込み、keep=True ならそのバッファを最新世代として保持"""
+        self._accessed(img)
+        write_pixels(img, pixels, update=update)
+        if keep:
+            self.store(img, pixels, derived_from=derived_from, dirty_regions=dirty_regions, source_finite=source_finite)
+        else:
+            self.bump(img)
+
+    def is_known_finite(self, img):
+        """現在の編集世代で NaN/Inf を含まないことが確認済みか"""
+        key = image_key(img)
+        return self._finite.get(key, -1) == self._generations.get(key, 0)
+
+    def check_finite(self, img, pixels=None):
+        """NaN/Inf を含まないか判定。結果は編集世代ごとに記録し、再走査しない"""
+        if self.is_known_finite(img):
+            return True
+        if pixels is None:
+            pixels = self.get(img)
+        if not all_finite(pixels):
+            return False
+        key = image_key(img)
+        self._finite[key] = self._generations.get(key, 0)
+        return True
+
+    def validate(self, img, pixels, sanitize=False):
+        """画像のバッファを検証し、sanitize=True なら不正値をその場で置き換える"""
+        if self.check_finite(img, pixels):
+            return pixels
+        if not sanitize:
+            raise ValueError("Pixel data contains invalid values (NaN or Inf)")
+        if not pixels.flags.writeable:
+            pixels = pixels.copy()
+        logger.warning(f"Sanitized NaN/Inf values in '{img.name}'")
+        return sanitize_pixels(pixels)
+
+    def discard(self, img):
+        """削除される画像のバッファと編集カウンターを破棄"""
+        if self.discard_hook is not None:
+            self.discard_hook(img)
+        key = image_key(img)
+        self._drop(key)
+        self._generations.pop(key, None)
+        self._finite.pop(key, None)
+
+    def invalidate_key(self, key):
+        """キーを指定してキャッシュを破棄"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._drop(key)
+
+    def clear(self):
+        """すべてのバッファを破棄"""
+        self._entries.clear()
+        self._generations.clear()
+        self._finite.clear()
+        self._bytes = 0
+
+    def validate_all(self):
+        """サイズやファイルパスが変わった画像のバッファを破棄"""
+        images = {image_key(img): img for img in bpy.data.images}
+        for key in list(self._entries.keys()):
+            img = images.get(key)
+            entry = self._entries[key]
+            if img is None or tuple(img.size) != entry.size or img.filepath != entry.filepath:
+                self.invalidate_key(key)
+
+    def on_image_updated(self, img):
+        """外部からの画像更新通知。自前の書き込み直後の通知は一度だけ読み飛ばす"""
+        key = image_key(img)
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        if entry.self_written:
+            entry.self_written = False
+            return
+        self.invalidate_key(key)
+
+    def _is_current(self, key, entry, img):
+        return (entry.generation == self._generations.get(key, 0)
+                and entry.size == tuple(img.size)
+                and entry.filepath == img.filepath)
+
+    def _put(self, key, img, pixels, self_written):
+        self._drop(key)
+        pixels = convert_pixels(pixels, self.working_dtype)
+        pixels.flags.writeable = False
+        entry = _CacheEntry(self._generations.get(key, 0), tuple(img.size), img.filepath, pixels, self_written)
+        self._entries[key] = entry
+        self._bytes += pixels.nbytes
+        self._evict()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.pixels.nbytes
+
+    def _evict(self):
+        # 直近に使われたエントリは一つ残す
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.pixels.nbytes
+            logger.debug(f"Evicted pixel cache entry {key} ({entry.pixels.nbytes} bytes)")
+
+pixel_cache = PixelCache()
+
+_msgbus_owner = object()
+
+def _on_image_rna_changed():
+    pixel_cache.validate_all()
+
+def _subscribe_msgbus():
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    for prop in ("filepath", "source"):
+        bpy.msgbus.subscribe_rna(
+            key=(bpy.types.Image, prop),
+            owner=_msgbus_owner,
+            args=(),
+            notify=_on_image_rna_changed,
+        )
+
+@persistent
+def _on_depsgraph_update_post(scene, depsgraph):
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Image):
+            pixel_cache.on_image_updated(update.id)
+
+@persistent
+def _on_undo_redo(*args):
+    # グローバルアンドゥは画像バッファを復元するため全世代を無効化
+    pixel_cache.clear()
+
+def sync_working_precision(scene):
+    """シーンの作業精度設定をキャッシュに反映"""
+    precision = getattr(scene, "working_precision", "FLOAT32")
+    pixel_cache.set_working_dtype(WORKING_DTYPES.get(precision, np.float32))
+
+@persistent
+def _on_load_post(*args):
+    pixel_cache.clear()
+    if bpy.context.scene:
+        sync_working_precision(bpy.context.scene)
+    _subscribe_msgbus()
+
+def register():
+    _subscribe_msgbus()
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update_post)
+    bpy.app.handlers.undo_post.append(_on_undo_redo)
+    bpy.app.handlers.redo_post.append(_on_undo_redo)
+    bpy.app.handlers.load_post.append(_on_load_post)
+
+def unregister():
+    bpy.app.handlers.load_post.remove(_on_load_post)
+    bpy.app.handlers.redo_post.remove(_on_undo_redo)
+    bpy.app.handlers.undo_post.remove(_on_undo_redo)
+    bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update_post)
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    pixel_cache.clear()
@@ -0,0 +1,88 @@
+# pixel_io.py
+# -*- coding: utf-8 -*-
+import numpy as np
+import logging
+
+# ログ設定（INFOレベル以上）
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 作業バッファの精度設定と NumPy dtype の対応
+WORKING_DTYPES = {
+    "FLOAT32": np.float32,
+    "FLOAT16": np.float16,
+    "UINT8": np.uint8,
+}
+
+# uint8 -> float32 変換用の 256 要素ルックアップテーブル
+UINT8_TO_FLOAT32 = np.arange(256, dtype=np.float32) / 255.0
+
+def pixel_count(img):
+    """画像のピクセル配列の要素数（幅 x 高さ x 4）を返す"""
+    width, height = img.size
+    return width * height * 4
+
+def allocate_buffer(width, height, fill=None):
+    """foreach_get/foreach_set に直接渡せる float32 の (H, W, 4) バッファを確保"""
+    if fill is None:
+        return np.empty((height, width, 4), dtype=np.float32)
+    return np.full((height, width, 4), fill, dtype=np.float32)
+
+def read_pixels(img, out=None):
+    """画像のピクセルを Python リストを経由せず float32 の (H, W, 4) 配列に読み込む"""
+    width, height = img.size
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid image size: {width}x{height}")
+    expected_size = width * height * 4
+    actual_size = len(img.pixels)
+    if actual_size != expected_size:
+        raise ValueError(f"Invalid pixel data size: expected {expected_size}, got {actual_size}")
+
+    if out is None:
+        out = allocate_buffer(width, height)
+    elif out.dtype != np.float32 or not out.flags.c_contiguous or out.size != expected_size:
+        raise ValueError("Output buffer must be a C-contiguous float32 array of matching size")
+
+    img.pixels.foreach_get(out.reshape(-1))
+    return out.reshape(height, width, 4)
+
+def convert_pixels(pixels, dtype, consume=False):
+    """ピクセル配列を作業精度へ変換（uint8 は 0..255 に量子化）。consume=True なら入力を作業領域として破壊してよい"""
+    dtype = np.dtype(dtype)
+    if pixels.dtype == dtype:
+        return pixels
+    if dtype == np.uint8:
+        if consume and pixels.dtype == np.float32 and pixels.flags.writeable:
+            scaled = np.multiply(pixels, 255.0, out=pixels)
+        else:
+            scaled = np.multiply(pixels, 255.0, dtype=np.float32)
+        np.clip(scaled, 0.0, 255.0, out=scaled)
+        np.rint(scaled, out=scaled)
+        return scaled.astype(np.uint8)
+    if pixels.dtype == np.uint8:
+        converted = UINT8_TO_FLOAT32[pixels]
+        return converted if dtype == np.float32 else converted.astype(dtype)
+    return pixels.astype(dtype)
+
+def write_pixels(img, pixels, update=True):
+    """作業精度の配列を float32 に変換し、Python リストを経由せず画像に書き込む"""
+    expected_size = pixel_count(img)
+    # float32 かつ連続メモリであればコピーは発生しない
+    buffer = np.ascontiguousarray(convert_pixels(pixels, np.float32))
+    if buffer.size != expected_size:
+        raise ValueError(f"Pixel data size mismatch: expected {expected_size}, got {buffer.size}")
+    img.pixels.foreach_set(buffer.reshape(-1))
+    if update:
+        img.update()
+
+def all_finite(pixels):
+    """NaN/Inf を含まないか判定（float64 で累積し、真偽値の一時配列を作らない）"""
+    if not np.issubdtype(pixels.dtype, np.floating):
+        return True
+    # 有限値の総和は float64 では溢れないため、総和が非有限なら NaN/Inf を含む
+    return bool(np.isfinite(np.sum(pixels, dtype=np.float64)))
+
+def sanitize_pixels(pixels):
+    """NaN/Inf をその場で置き換える（NaN と -Inf は 0.0、+Inf は 1.0）"""
+    np.nan_to_num(pixels, copy=False, nan=0.0, posinf=1.0, neginf=0.0)
+    return pixels
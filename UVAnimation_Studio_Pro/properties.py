@@ -2,18 +2,35 @@
 # -*- coding: utf-8 -*-
 import bpy
 import logging
+from bpy.app.handlers import persistent
+from .pixel_io import WORKING_DTYPES
+from .pixel_cache import pixel_cache
+from .core.tile_history import tile_history
+from .cold_storage import cold_storage
+from .anim_metadata import anim_info_cache
+from .core.tile_picker import MAX_SPLIT, DEFAULT_PAGE_SIZE
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# 以前の分割数 EnumProperty の項目。.blend には値ではなく項目の番号が保存されている
+LEGACY_SPLIT_VALUES = (1, 2, 4, 6, 8)
+# 分割数を IntProperty の値として保存していることを示す版数
+SPLIT_STORAGE_VERSION = 1
+
 def update_image_reference(self, context):
     if self.image_reference:
+        # 参照された画像が冷蔵中なら元に戻す
+        cold_storage.ensure_resident(self.image_reference)
         for area in context.screen.areas:
             if area.type == 'IMAGE_EDITOR':
                 area.spaces.active.image = self.image_reference
 
 def update_gif_image_reference(self, context):
     if self.gif_image_reference:
+        # パネルが開かれる前にフレーム数などの読み込みを始めておく
+        if self.gif_image_reference.filepath:
+            anim_info_cache.request(bpy.path.abspath(self.gif_image_reference.filepath))
         for area in context.screen.areas:
             if area.type == 'IMAGE_EDITOR':
                 area.spaces.active.image = self.gif_image_reference
@@ -37,8 +54,78 @@ def update_tile_operation_mode(self, context):
     self.last_clicked_index = 0
     context.area.tag_redraw()
 
+def update_split(self, context):
+    self.split_storage_version = SPLIT_STORAGE_VERSION
+    # 分割数が変わるとタイル番号の意味が変わるため、選択とページを戻す
+    self.tile_selection_mask = ""
+    self.selection_anchor_index = 0
+    self.tile_page_x = 0
+    self.tile_page_y = 0
+    update_tile_operation_mode(self, context)
+
+def migrate_legacy_splits(scene):
+    """以前の EnumProperty で保存された分割数（項目の番号）を分割数の値に直す。直したら True"""
+    if scene.get("split_storage_version", 0) >= SPLIT_STORAGE_VERSION:
+        return False
+    migrated = False
+    for name in ("x_split", "y_split"):
+        stored = scene.get(name)
+        if stored is None:
+            continue
+        # update を呼ばないよう保存値を直接書き換える（読み込み中は context.area がない）
+        scene[name] = LEGACY_SPLIT_VALUES[min(max(int(stored), 0), len(LEGACY_SPLIT_VALUES) - 1)]
+        migrated = True
+    scene["split_storage_version"] = SPLIT_STORAGE_VERSION
+    return migrated
+
+def migrate_all_scenes():
+    for scene in bpy.data.scenes:
+        if migrate_legacy_splits(scene):
+            logger.info(f"Migrated legacy tile splits of scene '{scene.name}' to {scene.x_split}x{scene.y_split}")
+
+@persistent
+def _on_load_post(*args):
+    migrate_all_scenes()
+
+def _migrate_open_file():
+    # アドオンを有効にした時点で開いているファイルも変換する（register 中は bpy.data に触れないためタイマーで行う）
+    migrate_all_scenes()
+    return None
+
+def update_working_precision(self, context):
+    pixel_cache.set_working_dtype(WORKING_DTYPES[self.working_precision])
+    # 履歴のタイルは以前の精度で保存されているため破棄
+    tile_history.clear()
+
+def update_history_settings(self, context):
+    tile_history.configure(self.history_budget_mb * 1024 * 1024, self.history_compress)
+
+class UVAS_QueuedTileOp(bpy.types.PropertyGroup):
+    """キューに積まれたタイル操作（積んだ時点の設定を保持）"""
+    op_type: bpy.props.EnumProperty(
+        name="Operation",
+        items=[
+            ("ROTATE", "Rotate", "Rotate a tile"),
+            ("FLIP", "Flip", "Flip a tile"),
+            ("MIRROR", "Mirror", "Mirror a tile"),
+            ("PATCH", "Patch", "Patch a tile from an image"),
+            ("SWAP", "Swap", "Swap two tiles"),
+            ("SHUFFLE", "Shuffle", "Shuffle tiles in a rectangular range"),
+            ("REORDER", "Reorder", "Reorder all tiles by a permutation"),
+            ("INSERT_TEXT", "Insert Text", "Insert text into a tile")
+        ],
+        default="ROTATE"
+    )
+    index: bpy.props.IntProperty(name="Tile Index", default=0)
+    second_index: bpy.props.IntProperty(name="Second Tile Index", default=0)
+    value: bpy.props.IntProperty(name="Value", default=0, description="np.rot90 k for rotations, axis for flips")
+    direction: bpy.props.StringProperty(name="Direction", default="")
+    text: bpy.props.StringProperty(name="Text", default="")
+    tile_image: bpy.props.PointerProperty(name="Tile Image", type=bpy.types.Image)
+    label: bpy.props.StringProperty(name="Label", default="")
+
 def get_resolution_items(self, context):
-    base_resolutions = [8, 16, 32, 64, 128, 256, 512, 1024]
+    base_resolutions = [8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384]
     items = []
     border_width = int(getattr(self, 'border_width', '1'))
     x_split = int(getattr(self, 'x_split', '1'))
@@ -56,6 +143,7 @@ def get_resolution_items(self, context):
     return items
 
 def register():
+    bpy.utils.register_class(UVAS_QueuedTileOp)
     bpy.types.Scene.resolution_x = bpy.props.EnumProperty(
         name="Resolution X",
         items=get_resolution_items,
@@ -66,6 +154,33 @@ def register():
         items=get_resolution_items,
         default=5
     )
+    bpy.types.Scene.use_custom_resolution = bpy.props.BoolProperty(
+        name="Custom Resolution",
+        default=False,
+        description="Use an arbitrary resolution instead of the preset sizes"
+    )
+    bpy.types.Scene.custom_resolution_x = bpy.props.IntProperty(
+        name="Custom Resolution X",
+        default=1920,
+        min=1,
+        max=16384,
+        description="Template width in pixels (does not need to be a power of two)"
+    )
+    bpy.types.Scene.custom_resolution_y = bpy.props.IntProperty(
+        name="Custom Resolution Y",
+        default=1080,
+        min=1,
+        max=16384,
+        description="Template height in pixels (does not need to be a power of two)"
+    )
+    bpy.types.Scene.generate_file_format = bpy.props.EnumProperty(
+        name="File Format",
+        items=[
+            ("PNG", "PNG", "8-bit RGBA PNG"),
+            ("EXR", "OpenEXR", "Half float RGBA EXR (requires OpenImageIO)")
+        ],
+        default="PNG"
+    )
     bpy.types.Scene.gif_resolution_x = bpy.props.IntProperty(
         name="GIF Resolution X",
         default=256,
@@ -76,15 +191,44 @@ def register():
         default=256,
         min=1
     )
-    bpy.types.Scene.x_split = bpy.props.EnumProperty(
+    bpy.types.Scene.x_split = bpy.props.IntProperty(
         name="X Split",
-        items=[("1", "1", ""), ("2", "2", ""), ("4", "4", ""), ("6", "6", ""), ("8", "8", "")],
-        default="4"
+        default=4,
+        min=1,
+        max=MAX_SPLIT,
+        description="Number of tile columns",
+        update=update_split
     )
-    bpy.types.Scene.y_split = bpy.props.EnumProperty(
+    bpy.types.Scene.y_split = bpy.props.IntProperty(
         name="Y Split",
-        items=[("1", "1", ""), ("2", "2", ""), ("4", "4", ""), ("6", "6", ""), ("8", "8", "")],
-        default="4"
+        default=4,
+        min=1,
+        max=MAX_SPLIT,
+        description="Number of tile rows",
+        update=update_split
+    )
+    bpy.types.Scene.split_storage_version = bpy.props.IntProperty(
+        name="Split Storage Version",
+        default=0,
+        options={'HIDDEN'},
+        description="Format version of the stored tile splits, used to migrate files saved with the old split menu"
+    )
+    bpy.types.Scene.tile_page_size = bpy.props.IntProperty(
+        name="Cells per Page",
+        default=DEFAULT_PAGE_SIZE,
+        min=2,
+        max=16,
+        description="Rows and columns of the tile picker shown at once; larger grids are paged"
+    )
+    bpy.types.Scene.tile_page_x = bpy.props.IntProperty(
+        name="Tile Page X",
+        default=0,
+        min=0
+    )
+    bpy.types.Scene.tile_page_y = bpy.props.IntProperty(
+        name="Tile Page Y",
+        default=0,
+        min=0
     )
     bpy.types.Scene.image_reference = bpy.props.PointerProperty(
         name="Image Reference",
@@ -127,6 +271,7 @@ def register():
             ("PATCH", "Patch", "Patch the tile onto the base image"),
             ("SWAP", "Swap", "Swap two tiles in the referenced image"),
             ("SHUFFLE", "Shuffle", "Randomly shuffle tiles in a rectangular range"),
+            ("REORDER", "Reorder", "Reorder all tiles by a permutation"),
             ("INSERT_TEXT", "Insert Text", "Insert text into the selected tile")
         ],
         default="EXTRACT",
@@ -170,6 +315,106 @@ def register():
         ],
         default="LEFT_TO_RIGHT"
     )
+    bpy.types.Scene.sanitize_pixels = bpy.props.BoolProperty(
+        name="Sanitize NaN/Inf",
+        default=False,
+        description="Replace NaN/Inf pixel values in place instead of cancelling tile operations"
+    )
+    bpy.types.Scene.edit_in_place = bpy.props.BoolProperty(
+        name="Edit In Place",
+        default=False,
+        description="Keep one working image per source atlas and modify it directly instead of creating a new edited image per operation"
+    )
+    bpy.types.Scene.working_precision = bpy.props.EnumProperty(
+        name="Working Precision",
+        items=[
+            ("FLOAT32", "Float32", "Keep edit buffers in full 32-bit float precision (HDR safe)"),
+            ("FLOAT16", "Float16", "Keep edit buffers in half precision (2x less memory)"),
+            ("UINT8", "8-bit", "Keep edit buffers as 8-bit integers for LDR atlases (4x less memory)")
+        ],
+        default="FLOAT32",
+        update=update_working_precision
+    )
+    bpy.types.Scene.multi_select = bpy.props.BoolProperty(
+        name="Multi-Select",
+        default=False,
+        description="Clicking tiles toggles a multi-tile selection for rotate, flip and mirror"
+    )
+    bpy.types.Scene.tile_selection_mask = bpy.props.StringProperty(
+        name="Tile Selection Mask",
+        default="",
+        description="Packed bitmask of selected tiles (hex)"
+    )
+    bpy.types.Scene.selection_anchor_index = bpy.props.IntProperty(
+        name="Selection Anchor Index",
+        default=0,
+        description="Previously clicked tile, used as the corner of box selection"
+    )
+    bpy.types.Scene.queue_tile_operations = bpy.props.BoolProperty(
+        name="Queue Operations",
+        default=False,
+        description="Stage tile operations and apply them together with Commit"
+    )
+    bpy.types.Scene.tile_op_queue = bpy.props.CollectionProperty(
+        name="Tile Operation Queue",
+        type=UVAS_QueuedTileOp
+    )
+    bpy.types.Scene.history_budget_mb = bpy.props.IntProperty(
+        name="History Budget (MB)",
+        default=256,
+        min=1,
+        max=16384,
+        description="Memory limit for the tile undo history; the oldest steps are dropped first",
+        update=update_history_settings
+    )
+    bpy.types.Scene.history_compress = bpy.props.BoolProperty(
+        name="Compress History",
+        default=False,
+        description="Store tile undo steps zlib-compressed (less memory, slower undo)",
+        update=update_history_settings
+    )
+    bpy.types.Scene.cold_storage_enabled = bpy.props.BoolProperty(
+        name="Cold Storage",
+        default=False,
+        description="Compress the pixels of inactive UVAS images in memory and shrink their datablocks until they are used again"
+    )
+    bpy.types.Scene.cold_storage_idle_minutes = bpy.props.IntProperty(
+        name="Idle Minutes",
+        default=5,
+        min=1,
+        max=1440,
+        description="Move UVAS images to cold storage after they have not been used for this many minutes"
+    )
+    bpy.types.Scene.cold_storage_budget_mb = bpy.props.IntProperty(
+        name="RAM Budget (MB)",
+        default=1024,
+        min=16,
+        max=65536,
+        description="Move the least recently used UVAS images to cold storage while their pixels exceed this budget"
+    )
+    bpy.types.Scene.dedup_tolerance = bpy.props.FloatProperty(
+        name="Duplicate Tolerance",
+        default=0.0,
+        min=0.0,
+        max=0.25,
+        precision=3,
+        description="Largest per-channel difference for two tiles to count as duplicates (0 = exact matches only)"
+    )
+    bpy.types.Scene.sprite_alpha_threshold = bpy.props.FloatProperty(
+        name="Alpha Threshold",
+        default=0.0,
+        min=0.0,
+        max=1.0,
+        precision=3,
+        description="Pixels with alpha at or below this value are trimmed as transparent"
+    )
+    bpy.types.Scene.sprite_padding = bpy.props.IntProperty(
+        name="Sprite Padding",
+        default=1,
+        min=0,
+        max=16,
+        description="Empty pixels between packed sprites to avoid bleeding with texture filtering"
+    )
     bpy.types.Scene.output_dir = bpy.props.StringProperty(
         name="Output Directory",
         subtype='DIR_PATH',
@@ -188,6 +433,21 @@ def register():
         name="Shuffle Second Index",
         default=-1
     )
+    bpy.types.Scene.reorder_mode = bpy.props.EnumProperty(
+        name="Reorder Mode",
+        items=[
+            ("REVERSE", "Reverse", "Reverse the tile order"),
+            ("TRANSPOSE", "Transpose", "Lay out tiles read column by column in row order"),
+            ("INTERLEAVE", "Interleave", "Alternate tiles from the first and second half"),
+            ("CUSTOM", "Custom", "Use a typed tile order such as '4,3,2,1' or '1-8,16-9'")
+        ],
+        default="REVERSE"
+    )
+    bpy.types.Scene.reorder_custom_order = bpy.props.StringProperty(
+        name="Custom Order",
+        default="",
+        description="Source tile for each position, comma separated; ranges like '8-1' are allowed"
+    )
     bpy.types.Scene.rotate_direction = bpy.props.EnumProperty(
         name="Rotate Direction",
         items=[
@@ -202,10 +462,69 @@ def register():
         type=bpy.types.Image,
         update=update_gif_image_reference
     )
+    bpy.types.Scene.frame_source_type = bpy.props.EnumProperty(
+        name="Frame Source",
+        items=[
+            ("FILES", "Files", "A folder of frames or a glob pattern such as //render/frame_*.png"),
+            ("IMAGE", "Image", "An image sequence or movie loaded as a Blender image"),
+            ("CLIP", "Movie Clip", "A movie clip datablock")
+        ],
+        default="FILES"
+    )
+    bpy.types.Scene.frame_source_path = bpy.props.StringProperty(
+        name="Frames",
+        default="",
+        description="Folder containing the frames, or a glob pattern (files are sorted in natural order)"
+    )
+    bpy.types.Scene.frame_source_image = bpy.props.PointerProperty(
+        name="Image Sequence",
+        type=bpy.types.Image
+    )
+    bpy.types.Scene.frame_source_clip = bpy.props.PointerProperty(
+        name="Movie Clip",
+        type=bpy.types.MovieClip
+    )
+    bpy.types.Scene.import_prefetch = bpy.props.IntProperty(
+        name="Prefetch Frames",
+        default=0,
+        min=0,
+        max=256,
+        description="Maximum number of frames queued ahead of the import workers (0 = twice the thread count)"
+    )
     bpy.types.Scene.reduce_frames = bpy.props.BoolProperty(
         name="Reduce Frames",
         default=False
     )
+    bpy.types.Scene.import_threads = bpy.props.IntProperty(
+        name="Import Threads",
+        default=0,
+        min=0,
+        max=64,
+        description="Worker threads that convert and place decoded frames (0 = one per CPU core minus the decoder)"
+    )
+    bpy.types.Scene.auto_layout = bpy.props.BoolProperty(
+        name="Auto Layout",
+        default=False,
+        description="Choose the tile grid from the frame count and downscale frames so the atlas fits the size and memory limits"
+    )
+    bpy.types.Scene.auto_layout_max_size = bpy.props.EnumProperty(
+        name="Max Atlas Size",
+        items=[
+            ("2048", "2048", "Largest atlas side of 2048 pixels"),
+            ("4096", "4096", "Largest atlas side of 4096 pixels"),
+            ("8192", "8192", "Largest atlas side of 8192 pixels"),
+            ("16384", "16384", "Largest atlas side of 16384 pixels"),
+        ],
+        default="4096",
+        description="Largest atlas width or height; also used to warn about oversized atlases in manual layout"
+    )
+    bpy.types.Scene.auto_layout_vram_mb = bpy.props.IntProperty(
+        name="Memory Budget (MB)",
+        default=0,
+        min=0,
+        max=65536,
+        description="Largest float RGBA atlas buffer in megabytes for Auto Layout (0 = no limit)"
+    )
     bpy.types.Scene.frame_reduction_ratio = bpy.props.EnumProperty(
         name="Frame Reduction Ratio",
         items=[
@@ -239,7 +558,8 @@ def register():
     bpy.types.Scene.text_font = bpy.props.StringProperty(
         name="Text Font",
         subtype='FILE_PATH',
-        default=""
+        default="",
+        description="TrueType font for text tools. Leave empty to use the built-in ASCII bitmap font"
     )
     bpy.types.Scene.text_font_size = bpy.props.IntProperty(
         name="Text Font Size",
@@ -265,14 +585,56 @@ def register():
         name="Text Content",
         default=""
     )
+    bpy.types.Scene.text_color = bpy.props.FloatVectorProperty(
+        name="Text Color",
+        subtype='COLOR',
+        size=3,
+        default=(1.0, 1.0, 1.0),
+        min=0.0,
+        soft_max=1.0,
+        description="Color of inserted text (values above 1 are kept on float images)"
+    )
+    bpy.types.Scene.text_opacity = bpy.props.FloatProperty(
+        name="Text Opacity",
+        subtype='FACTOR',
+        default=1.0,
+        min=0.0,
+        max=1.0
+    )
+    bpy.types.Scene.text_stamp_template = bpy.props.StringProperty(
+        name="Stamp Template",
+        default="{index}",
+        description="Text drawn on each tile. Fields: {index}, {row}, {col}, {count}, {frame} (e.g. {index:03d} or {row},{col})"
+    )
+    bpy.types.Scene.text_stamp_scope = bpy.props.EnumProperty(
+        name="Stamp Scope",
+        items=[
+            ("ALL", "All Tiles", "Stamp every tile"),
+            ("SELECTION", "Selection", "Stamp only the selected tiles")
+        ],
+        default="ALL"
+    )
+    bpy.app.handlers.load_post.append(_on_load_post)
+    bpy.app.timers.register(_migrate_open_file, first_interval=0.0)
 
 def unregister():
+    if bpy.app.timers.is_registered(_migrate_open_file):
+        bpy.app.timers.unregister(_migrate_open_file)
+    bpy.app.handlers.load_post.remove(_on_load_post)
     del bpy.types.Scene.resolution_x
     del bpy.types.Scene.resolution_y
+    del bpy.types.Scene.use_custom_resolution
+    del bpy.types.Scene.custom_resolution_x
+    del bpy.types.Scene.custom_resolution_y
+    del bpy.types.Scene.generate_file_format
     del bpy.types.Scene.gif_resolution_x
     del bpy.types.Scene.gif_resolution_y
     del bpy.types.Scene.x_split
     del bpy.types.Scene.y_split
+    del bpy.types.Scene.split_storage_version
+    del bpy.types.Scene.tile_page_size
+    del bpy.types.Scene.tile_page_x
+    del bpy.types.Scene.tile_page_y
     del bpy.types.Scene.image_reference
     del bpy.types.Scene.tile_reference
     del bpy.types.Scene.text_preview
@@ -284,14 +646,41 @@ def unregister():
     del bpy.types.Scene.rotate_flip_mode
     del bpy.types.Scene.flip_direction
     del bpy.types.Scene.mirror_direction
+    del bpy.types.Scene.sanitize_pixels
+    del bpy.types.Scene.edit_in_place
+    del bpy.types.Scene.working_precision
+    del bpy.types.Scene.multi_select
+    del bpy.types.Scene.tile_selection_mask
+    del bpy.types.Scene.selection_anchor_index
+    del bpy.types.Scene.queue_tile_operations
+    del bpy.types.Scene.tile_op_queue
+    del bpy.types.Scene.history_budget_mb
+    del bpy.types.Scene.history_compress
+    del bpy.types.Scene.cold_storage_enabled
+    del bpy.types.Scene.cold_storage_idle_minutes
+    del bpy.types.Scene.cold_storage_budget_mb
+    del bpy.types.Scene.dedup_tolerance
+    del bpy.types.Scene.sprite_alpha_threshold
+    del bpy.types.Scene.sprite_padding
     del bpy.types.Scene.output_dir
     del bpy.types.Scene.swap_first_index
     del bpy.types.Scene.swap_second_index
     del bpy.types.Scene.shuffle_second_index
+    del bpy.types.Scene.reorder_mode
+    del bpy.types.Scene.reorder_custom_order
     del bpy.types.Scene.rotate_direction
     del bpy.types.Scene.gif_image_reference
     del bpy.types.Scene.reduce_frames
     del bpy.types.Scene.frame_reduction_ratio
+    del bpy.types.Scene.import_threads
+    del bpy.types.Scene.auto_layout
+    del bpy.types.Scene.auto_layout_max_size
+    del bpy.types.Scene.auto_layout_vram_mb
+    del bpy.types.Scene.frame_source_type
+    del bpy.types.Scene.frame_source_path
+    del bpy.types.Scene.frame_source_image
+    del bpy.types.Scene.frame_source_clip
+    del bpy.types.Scene.import_prefetch
     del bpy.types.Scene.generate_mode
     del bpy.types.Scene.grid_border_type
     del bpy.types.Scene.border_width
@@ -299,4 +688,9 @@ def unregister():
     del bpy.types.Scene.text_font_size
     del bpy.types.Scene.text_offset_x
     del bpy.types.Scene.text_offset_y
-    del bpy.types.Scene.text_content
\ No newline at end of file
+    del bpy.types.Scene.text_content
+    del bpy.types.Scene.text_color
+    del bpy.types.Scene.text_opacity
+    del bpy.types.Scene.text_stamp_template
+    del bpy.types.Scene.text_stamp_scope
+    bpy.utils.unregister_class(UVAS_QueuedTileOp)
\ No newline at end of file
@@ -1,17 +1,25 @@
 # ui/panels.py
 # -*- coding: utf-8 -*-
 import bpy
-from PIL import Image
 import os
 import logging
 from ..node import UVAS_UVAnimationCoordinatesNode
 from ..operators.generate import UVAS_OT_ImportAnimatedImageToTiles
 from ..operators.tile.generation import UVAS_OT_SetTileIndex
+from ..core.tile_selection import TileSelection
+from ..core.tile_history import tile_history
+from ..cold_storage import cold_storage
+from ..anim_metadata import anim_info_cache
+from ..core.tile_picker import PickerMaskCache, page_window, page_count, DEFAULT_PAGE_SIZE
+from ..utils import draw_page_controls
 
 # ログ設定（INFOレベル以上）
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# タイルピッカーの押下状態のマスク（状態が変わるまで再利用）
+_picker_masks = PickerMaskCache()
+
 class UVAS_PT_TilePanel(bpy.types.Panel):
     bl_label = "UVAnimation Studio Pro"
     bl_space_type = 'IMAGE_EDITOR'
@@ -29,18 +37,27 @@ class UVAS_PT_TilePanel(bpy.types.Panel):
             row.prop(scene, "x_split", text="", expand=False)
         if hasattr(scene, 'y_split'):
             row.prop(scene, "y_split", text="", expand=False)
+        if hasattr(scene, 'tile_page_size') and (int(scene.x_split) > scene.tile_page_size or int(scene.y_split) > scene.tile_page_size):
+            layout.prop(scene, "tile_page_size", text="Cells per Page")
 
         try:
             split_x = int(getattr(scene, 'x_split', 1))
             split_y = int(getattr(scene, 'y_split', 1))
             if split_x > 0 and split_y > 0:
+                page_size = int(getattr(scene, 'tile_page_size', DEFAULT_PAGE_SIZE))
+                x0, x1, y0, y1 = page_window(split_x, split_y, getattr(scene, 'tile_page_x', 0), getattr(scene, 'tile_page_y', 0), page_size)
+                pages_x = page_count(split_x, page_size)
+                pages_y = page_count(split_y, page_size)
+                if pages_x > 1 or pages_y > 1:
+                    draw_page_controls(layout, x0 // page_size, pages_x, y0 // page_size, pages_y)
+
                 base_scale = 10.0
-                scale_x = base_scale / split_x
-                scale_y = base_scale / split_y
+                scale_x = base_scale / (x1 - x0)
+                scale_y = base_scale / (y1 - y0)
 
                 grid = layout.grid_flow(
                     row_major=True,
-                    columns=split_x,
+                    columns=x1 - x0,
                     even_columns=True,
                     even_rows=True,
                     align=True
@@ -48,39 +65,25 @@ class UVAS_PT_TilePanel(bpy.types.Panel):
                 grid.scale_x = scale_x
                 grid.scale_y = scale_y
 
-                for y in range(split_y):
-                    for x in range(split_x):
-                        cell_index = y * split_x + x + 1
-                        is_depressed = False
-                        if getattr(scene, 'operation_mode', 'TILE') == "TILE":
-                            if getattr(scene, 'tile_operation_mode', 'EXTRACT') in ["EXTRACT", "MIRROR", "INSERT_TEXT"]:
-                                is_depressed = (getattr(scene, 'last_clicked_index', 0) == cell_index)
-                            elif getattr(scene, 'tile_operation_mode', 'EXTRACT') == "SWAP":
-                                is_depressed = (getattr(scene, 'swap_first_index', -1) == cell_index or
-                                               getattr(scene, 'swap_second_index', -1) == cell_index)
-                            elif getattr(scene, 'tile_operation_mode', 'EXTRACT') == "SHUFFLE" and getattr(scene, 'swap_first_index', -1) != -1:
-                                if getattr(scene, 'shuffle_second_index', -1) == -1:
-                                    is_depressed = (getattr(scene, 'swap_first_index', -1) == cell_index)
-                                else:
-                                    first_index = getattr(scene, 'swap_first_index', -1) - 1
-                                    second_index = getattr(scene, 'shuffle_second_index', -1) - 1
-                                    first_x = first_index % split_x
-                                    first_y = split_y - 1 - (first_index // split_x)
-                                    second_x = second_index % split_x
-                                    second_y = split_y - 1 - (second_index // split_x)
-                                    min_x = min(first_x, second_x)
-                                    max_x = max(first_x, second_x)
-                                    min_y = min(first_y, second_y)
-                                    max_y = max(first_y, second_y)
-                                    curr_x = (cell_index - 1) % split_x
-                                    curr_y = split_y - 1 - ((cell_index - 1) // split_x)
-                                    if min_x <= curr_x <= max_x and min_y <= curr_y <= max_y:
-                                        is_depressed = True
+                mode = getattr(scene, 'tile_operation_mode', 'EXTRACT') if getattr(scene, 'operation_mode', 'TILE') == "TILE" else None
+                use_selection = getattr(scene, 'multi_select', False) and mode in ["ROTATE_AND_FLIP", "MIRROR"]
+                # 押下状態は選択状態が変わったときだけ作り直し、表示中のページのセルだけボタンにする
+                depressed = _picker_masks.get(
+                    mode, split_x, split_y,
+                    last_clicked=getattr(scene, 'last_clicked_index', 0),
+                    swap_first=getattr(scene, 'swap_first_index', -1),
+                    swap_second=getattr(scene, 'swap_second_index', -1),
+                    shuffle_second=getattr(scene, 'shuffle_second_index', -1),
+                    selection_hex=scene.tile_selection_mask if use_selection else None,
+                )
 
+                for y in range(y0, y1):
+                    for x in range(x0, x1):
+                        cell_index = y * split_x + x + 1
                         op = grid.operator(
                             "uvas.set_tile_index",
                             text=str(cell_index),
-                            depress=is_depressed
+                            depress=bool(depressed[y, x])
                         )
                         op.index = cell_index
         except Exception as e:
@@ -119,6 +122,13 @@ class UVAS_PT_Operations(bpy.types.Panel):
                         layout.label(text="Preview generation failed", icon='ERROR')
             else:
                 layout.label(text="Please select an image in Image Reference", icon='ERROR')
+        if hasattr(scene, 'sanitize_pixels'):
+            layout.prop(scene, "sanitize_pixels")
+        if hasattr(scene, 'edit_in_place'):
+            layout.prop(scene, "edit_in_place")
+        row = layout.row(align=True)
+        row.operator("uvas.tile_undo", text="Undo Tile Edit", icon='LOOP_BACK')
+        row.operator("uvas.tile_redo", text="Redo Tile Edit", icon='LOOP_FORWARDS')
 
         layout.label(text="Operation Mode")
         if hasattr(scene, 'operation_mode'):
@@ -128,6 +138,20 @@ class UVAS_PT_Operations(bpy.types.Panel):
             layout.label(text="Tile Operation Mode")
             if hasattr(scene, 'tile_operation_mode'):
                 layout.prop(scene, "tile_operation_mode", text="")
+            if hasattr(scene, 'multi_select') and getattr(scene, 'tile_operation_mode', 'EXTRACT') in ["ROTATE_AND_FLIP", "MIRROR"]:
+                layout.prop(scene, "multi_select")
+                if scene.multi_select:
+                    box = layout.box()
+                    row = box.row(align=True)
+                    row.operator("uvas.select_tiles", text="All").action = 'ALL'
+                    row.operator("uvas.select_tiles", text="None").action = 'NONE'
+                    row.operator("uvas.select_tiles", text="Invert").action = 'INVERT'
+                    row = box.row(align=True)
+                    row.operator("uvas.select_tiles", text="Row").action = 'ROW'
+                    row.operator("uvas.select_tiles", text="Column").action = 'COLUMN'
+                    row.operator("uvas.select_tiles", text="Box").action = 'BOX'
+                    count = TileSelection.from_hex(scene.tile_selection_mask, int(getattr(scene, 'x_split', 1)), int(getattr(scene, 'y_split', 1))).count
+                    box.operator("uvas.apply_to_selection", text=f"Apply to Selection ({count})", icon='MODIFIER')
             if getattr(scene, 'tile_operation_mode', 'EXTRACT') == "ROTATE_AND_FLIP" and getattr(scene, 'image_reference', None):
                 layout.label(text="Rotate or Flip Mode")
                 if hasattr(scene, 'rotate_flip_mode'):
@@ -193,6 +217,13 @@ class UVAS_PT_Operations(bpy.types.Panel):
                     layout.operator("uvas.apply_shuffle", text="Apply Shuffle", icon='FILE_REFRESH')
                 else:
                     layout.label(text="Select two tiles for shuffling", icon='INFO')
+            elif getattr(scene, 'tile_operation_mode', 'EXTRACT') == "REORDER":
+                layout.label(text="Reorder Mode")
+                if hasattr(scene, 'reorder_mode'):
+                    layout.prop(scene, "reorder_mode", text="")
+                if getattr(scene, 'reorder_mode', 'REVERSE') == "CUSTOM" and hasattr(scene, 'reorder_custom_order'):
+                    layout.prop(scene, "reorder_custom_order", text="")
+                layout.operator("uvas.reorder_tiles", text="Apply Reorder", icon='FILE_REFRESH')
             elif getattr(scene, 'tile_operation_mode', 'EXTRACT') == "INSERT_TEXT" and getattr(scene, 'image_reference', None):
                 layout.label(text="Text Content")
                 if hasattr(scene, 'text_content'):
@@ -205,12 +236,25 @@ class UVAS_PT_Operations(bpy.types.Panel):
                 layout.label(text="Font Size")
                 if hasattr(scene, 'text_font_size'):
                     layout.prop(scene, "text_font_size", text="")
+                row = layout.row(align=True)
+                if hasattr(scene, 'text_color'):
+                    row.prop(scene, "text_color", text="")
+                if hasattr(scene, 'text_opacity'):
+                    row.prop(scene, "text_opacity", text="Opacity")
                 layout.label(text="Text Offset (pixels)")
                 row = layout.row(align=True)
                 if hasattr(scene, 'text_offset_x'):
                     row.prop(scene, "text_offset_x", text="X")
                 if hasattr(scene, 'text_offset_y'):
                     row.prop(scene, "text_offset_y", text="Y")
+                box = layout.box()
+                box.label(text="Stamp Template")
+                if hasattr(scene, 'text_stamp_template'):
+                    box.prop(scene, "text_stamp_template", text="")
+                row = box.row(align=True)
+                if hasattr(scene, 'text_stamp_scope'):
+                    row.prop(scene, "text_stamp_scope", text="")
+                row.operator("uvas.stamp_text_tiles", text="Stamp", icon='SMALL_CAPS')
                 if getattr(scene, 'last_clicked_index', 0) > 0:
                     layout.operator("uvas.apply_text_setting", text="Preview Text", icon='VIEWZOOM')
                     layout.operator("uvas.apply_text", text="Apply Text", icon='MODIFIER')
@@ -237,6 +281,23 @@ class UVAS_PT_Operations(bpy.types.Panel):
             elif getattr(scene, 'tile_operation_mode', 'EXTRACT') == "INSERT_TEXT":
                 layout.label(text="Select an image first")
 
+            if hasattr(scene, 'queue_tile_operations') and getattr(scene, 'tile_operation_mode', 'EXTRACT') != "EXTRACT":
+                layout.prop(scene, "queue_tile_operations")
+                if scene.queue_tile_operations:
+                    box = layout.box()
+                    box.label(text=f"Operation Queue ({len(scene.tile_op_queue)})")
+                    if getattr(scene, 'tile_operation_mode', 'EXTRACT') in ["MIRROR", "INSERT_TEXT", "SWAP", "SHUFFLE", "REORDER"]:
+                        box.operator("uvas.queue_tile_operation", text="Add to Queue", icon='ADD').index = 0
+                    else:
+                        box.label(text="Click tiles to queue operations", icon='INFO')
+                    for i, item in enumerate(scene.tile_op_queue):
+                        row = box.row(align=True)
+                        row.label(text=f"{i + 1}. {item.label}")
+                        row.operator("uvas.remove_queued_operation", text="", icon='X').queue_index = i
+                    row = box.row(align=True)
+                    row.operator("uvas.commit_tile_queue", text="Commit", icon='CHECKMARK')
+                    row.operator("uvas.clear_tile_queue", text="Clear", icon='TRASH')
+
         elif getattr(scene, 'operation_mode', 'TILE') == "IMAGE":
             layout.label(text="Image Operation Mode")
             if hasattr(scene, 'image_operation_mode'):
@@ -293,15 +354,30 @@ class UVAS_PT_Generate(bpy.types.Panel):
             if hasattr(scene, 'border_width'):
                 layout.prop(scene, "border_width", text="")
 
-        row = layout.row()
-        row.label(text="Resolution X")
-        if hasattr(scene, 'resolution_x'):
-            row.prop(scene, "resolution_x", text="")
-        row = layout.row()
-        row.label(text="Resolution Y")
-        if hasattr(scene, 'resolution_y'):
-            row.prop(scene, "resolution_y", text="")
+        if hasattr(scene, 'use_custom_resolution'):
+            layout.prop(scene, "use_custom_resolution")
+        if getattr(scene, 'use_custom_resolution', False):
+            row = layout.row(align=True)
+            row.prop(scene, "custom_resolution_x", text="X")
+            row.prop(scene, "custom_resolution_y", text="Y")
+        else:
+            row = layout.row()
+            row.label(text="Resolution X")
+            if hasattr(scene, 'resolution_x'):
+                row.prop(scene, "resolution_x", text="")
+            row = layout.row()
+            row.label(text="Resolution Y")
+            if hasattr(scene, 'resolution_y'):
+                row.prop(scene, "resolution_y", text="")
         layout.operator("uvas.generate_full_image", icon='IMAGE')
+        row = layout.row(align=True)
+        if hasattr(scene, 'text_stamp_template'):
+            row.prop(scene, "text_stamp_template", text="")
+        row.operator("uvas.generate_numbered_grid", text="Numbered Grid", icon='LINENUMBERS_ON')
+        row = layout.row(align=True)
+        if hasattr(scene, 'generate_file_format'):
+            row.prop(scene, "generate_file_format", text="")
+        row.operator("uvas.generate_full_image_to_file", text="Generate to File", icon='FILE_IMAGE')
         layout.operator("uvas.generate_single_tile", icon='MESH_PLANE')
 
 class UVAS_PT_GifApng(bpy.types.Panel):
@@ -347,33 +423,58 @@ class UVAS_PT_GifApng(bpy.types.Panel):
 
             filepath = bpy.path.abspath(scene.gif_image_reference.filepath) if scene.gif_image_reference.filepath else None
             if filepath and os.path.exists(filepath):
-                try:
-                    with Image.open(filepath) as pil_img:
-                        if not hasattr(pil_img, 'is_animated') or not pil_img.is_animated:
-                            layout.label(text="Selected image is not an animated GIF/APNG", icon='ERROR')
-                        else:
-                            frame_count = pil_img.n_frames
-                            width, height = pil_img.size
-                            total_res_x = width * int(getattr(scene, 'x_split', 1))
-                            total_res_y = height * int(getattr(scene, 'y_split', 1))
-                            layout.label(text=f"Total Tiles: {int(getattr(scene, 'x_split', 1)) * int(getattr(scene, 'y_split', 1))}")
-                            row = layout.row(align=True)
-                            row.label(text=f"Image Frames: {frame_count}")
-                            if hasattr(scene, 'reduce_frames'):
-                                row.prop(scene, "reduce_frames", text="Reduce Frames")
-                            layout.label(text=f"Tile Resolution: {width}x{height}")
-                            layout.label(text=f"Total Resolution X: {total_res_x}")
-                            layout.label(text=f"Total Resolution Y: {total_res_y}")
-                            if getattr(scene, 'reduce_frames', False):
-                                if hasattr(scene, 'frame_reduction_ratio'):
-                                    layout.prop(scene, "frame_reduction_ratio", text="Frame Reduction Ratio")
-                except Exception as e:
-                    layout.label(text=f"Error reading image info: {str(e)}", icon='ERROR')
+                # フレーム数の走査は一度だけバックグラウンドで行い、以降の再描画ではキャッシュを使う
+                info = anim_info_cache.request(filepath)
+                if info is None:
+                    layout.label(text="Reading image info...", icon='TIME')
+                elif info.error:
+                    layout.label(text=f"Error reading image info: {info.error}", icon='ERROR')
+                elif not info.is_animated:
+                    layout.label(text="Selected image is not an animated GIF/APNG", icon='ERROR')
+                else:
+                    frame_count = info.frame_count
+                    width, height = info.width, info.height
+                    total_res_x = width * int(getattr(scene, 'x_split', 1))
+                    total_res_y = height * int(getattr(scene, 'y_split', 1))
+                    layout.label(text=f"Total Tiles: {int(getattr(scene, 'x_split', 1)) * int(getattr(scene, 'y_split', 1))}")
+                    row = layout.row(align=True)
+                    row.label(text=f"Image Frames: {frame_count}")
+                    if hasattr(scene, 'reduce_frames'):
+                        row.prop(scene, "reduce_frames", text="Reduce Frames")
+                    layout.label(text=f"Duration: {info.total_duration / 1000:.2f}s, Loop: {'Infinite' if info.loop == 0 else info.loop if info.loop is not None else 'Once'}")
+                    layout.label(text=f"Tile Resolution: {width}x{height}")
+                    layout.label(text=f"Total Resolution X: {total_res_x}")
+                    layout.label(text=f"Total Resolution Y: {total_res_y}")
+                    if getattr(scene, 'reduce_frames', False):
+                        if hasattr(scene, 'frame_reduction_ratio'):
+                            layout.prop(scene, "frame_reduction_ratio", text="Frame Reduction Ratio")
             else:
                 layout.label(text="Invalid or missing file path", icon='ERROR')
 
+        if hasattr(scene, 'import_threads'):
+            layout.prop(scene, "import_threads")
+        if hasattr(scene, 'auto_layout'):
+            box = layout.box()
+            box.prop(scene, "auto_layout")
+            row = box.row()
+            row.prop(scene, "auto_layout_max_size")
+            row.prop(scene, "auto_layout_vram_mb")
         layout.operator("uvas.import_animated_image_to_tiles", icon='FILE_MOVIE')
         layout.operator("uvas.export_animated_image_from_tiles", text="Export Animated Image from Tiles", icon='FILE_MOVIE')
+
+        box = layout.box()
+        box.label(text="Frame Sequence")
+        if hasattr(scene, 'frame_source_type'):
+            box.prop(scene, "frame_source_type", text="")
+            if scene.frame_source_type == "FILES":
+                box.prop(scene, "frame_source_path", text="")
+            elif scene.frame_source_type == "IMAGE":
+                box.template_ID(scene, "frame_source_image", open="image.open")
+            else:
+                box.template_ID(scene, "frame_source_clip", open="clip.open")
+        if hasattr(scene, 'import_prefetch'):
+            box.prop(scene, "import_prefetch")
+        box.operator("uvas.import_frame_sequence_to_tiles", icon='SEQUENCE')
         layout.label(text=f"Total Frames: {int(getattr(scene, 'x_split', 1)) * int(getattr(scene, 'y_split', 1))}")
         layout.label(text="GIF/APNG import overrides resolution based on image size and splits.")
 
@@ -392,6 +493,16 @@ class UVAS_PT_UVAnimation(bpy.types.Panel):
 
         if getattr(scene, 'image_reference', None):
             layout.operator("uvas.create_uv_animation_node", text="Create UV Animation Node", icon='NODE')
+            row = layout.row(align=True)
+            if hasattr(scene, 'dedup_tolerance'):
+                row.prop(scene, "dedup_tolerance", text="Tolerance")
+            row.operator("uvas.deduplicate_tiles", text="Deduplicate Tiles", icon='DUPLICATE')
+            row = layout.row(align=True)
+            if hasattr(scene, 'sprite_alpha_threshold'):
+                row.prop(scene, "sprite_alpha_threshold", text="Alpha")
+            if hasattr(scene, 'sprite_padding'):
+                row.prop(scene, "sprite_padding", text="Padding")
+            layout.operator("uvas.pack_sprites", text="Pack Trimmed Sprites", icon='IMAGE_RGB_ALPHA')
             layout.label(text="Select a UV Animation Node:")
             obj = context.active_object
             if obj and obj.active_material and obj.active_material.use_nodes:
@@ -436,7 +547,10 @@ class UVAS_PT_Management(bpy.types.Panel):
         if uvas_images:
             for img in uvas_images:
                 row = box.row(align=True)
-                if img.preview:
+                if cold_storage.is_cold(img):
+                    # 冷蔵中の画像はプレビュー生成で元に戻さないよう、アイコンだけ表示
+                    row.label(text="", icon='FREEZE')
+                elif img.preview:
                     row.template_icon(icon_value=img.preview.icon_id, scale=2.0)
                 else:
                     row.label(text="", icon='IMAGE')
@@ -456,6 +570,28 @@ class UVAS_PT_Management(bpy.types.Panel):
         else:
             box.label(text="No UVAS images in memory")
 
+        if hasattr(scene, 'working_precision'):
+            layout.prop(scene, "working_precision")
+
+        layout.label(text=f"Tile History: {tile_history.undo_count} steps, {tile_history.nbytes / (1024 * 1024):.1f} MB")
+        row = layout.row(align=True)
+        if hasattr(scene, 'history_budget_mb'):
+            row.prop(scene, "history_budget_mb", text="Budget (MB)")
+        if hasattr(scene, 'history_compress'):
+            row.prop(scene, "history_compress", text="Compress")
+        layout.operator("uvas.clear_tile_history", text="Clear Tile History", icon='TRASH')
+
+        if hasattr(scene, 'cold_storage_enabled'):
+            layout.prop(scene, "cold_storage_enabled")
+            if scene.cold_storage_enabled:
+                row = layout.row(align=True)
+                row.prop(scene, "cold_storage_idle_minutes", text="Idle (min)")
+                row.prop(scene, "cold_storage_budget_mb", text="Budget (MB)")
+            layout.label(text=f"Cold Storage: {cold_storage.count} images, {cold_storage.nbytes / (1024 * 1024):.1f} MB")
+            row = layout.row(align=True)
+            row.operator("uvas.freeze_inactive_images", text="Freeze Inactive", icon='FREEZE')
+            row.operator("uvas.thaw_all_images", text="Thaw All")
+
         layout.label(text="Output Directory")
         if hasattr(scene, 'output_dir'):
             layout.prop(scene, "output_dir", text="")
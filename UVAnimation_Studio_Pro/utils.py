@@ -18,4 +18,14 @@ def get_output_filepath(scene, filename, extension="png"):
     output_dir = bpy.path.abspath(scene.output_dir) if scene.output_dir else bpy.path.abspath("//")
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    return os.path.join(output_dir, f"{filename}.{extension}")
\ No newline at end of file
+    return os.path.join(output_dir, f"{filename}.{extension}")
+
+def draw_page_controls(layout, page_x, pages_x, page_y, pages_y, node_name=""):
+    """タイルピッカーのページ送りボタンと現在のページを表示"""
+    row = layout.row(align=True)
+    for icon, dx, dy in (('TRIA_LEFT', -1, 0), ('TRIA_RIGHT', 1, 0), ('TRIA_UP', 0, -1), ('TRIA_DOWN', 0, 1)):
+        op = row.operator("uvas.tile_picker_page", text="", icon=icon)
+        op.dx = dx
+        op.dy = dy
+        op.node_name = node_name
+    row.label(text=f"Page {page_x + 1}/{pages_x}, {page_y + 1}/{pages_y}")